@@ -18,38 +18,29 @@
     2단계: 각 기업의 2개년 영업이익 개별 조회
     3단계: 전년대비 부호 전환 기업 필터링
 
-의존성: requests (pip install requests)
+의존성: requests (pip install requests), 같은 폴더의 deepsearch_client.py
 """
 
 import sys
 import json
-import time
 
 try:
-    import requests
-    requests.packages.urllib3.disable_warnings()
-except ImportError:
-    print(json.dumps({'success': False, 'error': 'requests 라이브러리가 필요합니다: pip install requests'}, ensure_ascii=False))
+    from deepsearch_client import api_call as _client_call
+except ImportError as e:
+    if e.name == 'deepsearch_client':
+        error = '같은 폴더에 deepsearch_client.py 가 필요합니다 (스킬 scripts 폴더의 사본을 이 스크립트 옆에 두세요)'
+    else:
+        error = f'{e.name} 라이브러리가 필요합니다: pip install {e.name}'
+    print(json.dumps({'success': False, 'error': error}, ensure_ascii=False))
     sys.exit(1)
 
-URL_BASE = 'https://api.deepsearch.com/v1/compute?input='
-
 
 def api_call(api_key, query, max_retries=3):
-    """API 호출 (재시도 포함)."""
-    headers = {'Authorization': f'Basic {api_key}'}
-    url = f'{URL_BASE}{query}'
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=headers, verify=False, timeout=60)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(3)
-            else:
-                return {'success': False, 'error': str(e)}
-    return {'success': False, 'error': 'Max retries exceeded'}
+    """API 호출 (공용 커넥션 풀, 재시도 포함). 호출 간격은 공용 요청 제한기가 조절."""
+    try:
+        return _client_call(api_key, query, max_retries=max_retries, retry_delay=3)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
 
 
 def get_screening_list(api_key, direction, min_revenue):
@@ -184,9 +175,6 @@ def main():
             })
             print(f'  → {label}: {name} (2023: {format_value(result["2023"])} → 2024: {format_value(result["2024"])})', file=sys.stderr)
 
-        # API 부하 방지
-        time.sleep(0.5)
-
     # 결과 출력
     output = {
         'success': True,
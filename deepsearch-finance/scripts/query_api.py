@@ -3,151 +3,332 @@
 DeepSearch API 호출 스크립트 (공통)
 
 사용법:
-    python query_api.py <API_KEY> <QUERY>
+    python query_api.py <API_KEY> <QUERY> [--stream] [--max-pages N] [--max-docs N]
 
 예시:
     python query_api.py "KEY" 'DocumentSearch(["news"],["economy"],"삼성전자",count=10,page=1)'
     python query_api.py "KEY" '삼성전자 매출액 2020-2024'
+    python query_api.py "KEY" 'DocumentSearch(["news"],[],"반도체",count=100,page=1)' --stream --max-docs 300
 
-의존성: requests (pip install requests)
+DocumentSearch 쿼리에 fields= 가 없으면 결과 요약에 쓰는 필드만 요청합니다.
+다른 필드가 필요하면 쿼리에 fields=[...] 를 직접 지정하세요.
+결과가 5페이지를 넘고 쿼리에 기간(date_from/date_to 또는 created_at:[...])이 있으면
+기간을 나눠 조각별로 병렬 수집하므로 5페이지 제한 없이 전체 결과를 받습니다.
+--max-pages N 을 주면 페이지 수를 직접 제한하고(기간 분할 안 함), --max-docs N 은 문서 수를 제한합니다.
+--stream 은 페이지가 도착하는 대로 요약 문서를 한 줄에 하나씩(NDJSON) 출력하므로
+결과가 많아도 메모리를 쌓지 않고 바로 후속 처리를 시작할 수 있습니다 (진행 요약은 stderr).
+받은 페이지는 로컬 체크포인트에 저장되므로, 중간에 실패한 검색을 같은 명령으로 다시 실행하면
+이미 받은 페이지는 건너뛰고 실패한 페이지부터 이어받습니다 (DEEPSEARCH_CHECKPOINT=0 으로 끔).
+
+의존성: requests (pip install requests), 같은 폴더의 deepsearch_client.py
 """
 
 import sys
 import json
-import time
 import re
-from urllib.parse import quote
 
 try:
-    import requests
-    requests.packages.urllib3.disable_warnings()
-except ImportError:
-    print(json.dumps({'success': False, 'error': 'requests 라이브러리가 필요합니다: pip install requests'}, ensure_ascii=False))
+    from deepsearch_client import (auth_headers, build_url, fetch_json, with_fields, find_time_window,
+                                   plan_time_shards, search_all, get_checkpoint)
+except ImportError as e:
+    if e.name == 'deepsearch_client':
+        error = '같은 폴더에 deepsearch_client.py 가 필요합니다 (스킬 scripts 폴더의 사본을 이 스크립트 옆에 두세요)'
+    else:
+        error = f'{e.name} 라이브러리가 필요합니다: pip install {e.name}'
+    print(json.dumps({'success': False, 'error': error}, ensure_ascii=False))
     sys.exit(1)
 
-URL_BASE = 'https://api.deepsearch.com/v1/compute?input='
-
 
 def make_request(url, headers, max_retries=3, retry_delay=5):
-    """API 요청. 실패 시 재시도."""
-    attempt = 0
-    last_error = None
-    while attempt < max_retries:
-        try:
-            resp = requests.get(url, headers=headers, verify=False, timeout=60)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            last_error = e
-            attempt += 1
-            if attempt < max_retries:
-                print(f"[retry {attempt}/{max_retries}] {str(e)[:200]}", file=sys.stderr)
-                time.sleep(retry_delay)
-    raise Exception(f"Max retries exceeded: {last_error}")
+    """API 요청 (공용 커넥션 풀, 디스크 응답 캐시). 실패 시 재시도. 4xx 클라이언트 에러는 즉시 실패."""
+    return fetch_json(url, headers, max_retries=max_retries, retry_delay=retry_delay)
 
 
-def execute_query(api_key, query):
-    """DeepSearch API 쿼리 실행."""
-    headers = {'Authorization': f'Basic {api_key}'}
-    clean_query = query.replace('\n', '').strip()
-    url = f'{URL_BASE}{quote(clean_query, safe="")}'
+# handle_doc_search 요약에 쓰는 필드 (DocumentSearch 에 fields 가 없으면 자동 추가)
+# uid_str 는 요약에 넣지 않지만 기간 조각 경계에서 겹쳐 받은 문서의 중복 제거에 필요
+DOC_SUMMARY_FIELDS = ['uid_str', 'title', 'publisher', 'created_at', 'category', 'section', 'content',
+                      'content_url', 'securities', 'polarity', 'esg']
 
-    response_data = make_request(url, headers)
+
+def first_response(clean_query, headers):
+    """
+    첫 요청을 보내고 {'pod': 결과 pod} 또는 {'result': 최종 결과 dict}를 반환.
+
+    실패했거나 결과 pod 이 없으면 'result' 에 바로 출력할 결과를 담는다.
+    """
+    response_data = make_request(build_url(clean_query), headers)
 
     if not response_data.get('success', False):
         exceptions = response_data.get('data', {}).get('exceptions', [])
-        return {'success': False, 'error': exceptions or 'API 요청 실패', 'query': clean_query}
+        return {'result': {'success': False, 'error': exceptions or 'API 요청 실패', 'query': clean_query}}
 
     pods = response_data.get('data', {}).get('pods', [])
     if len(pods) < 2:
-        return {'success': True, 'query': clean_query, 'pods': pods}
-
-    result_pod = pods[1]
-    pod_class = result_pod.get('class', '')
+        return {'result': {'success': True, 'query': clean_query, 'pods': pods}}
+    return {'pod': pods[1]}
 
-    if pod_class == 'Result:DocumentSearchResult':
-        return handle_doc_search(result_pod, clean_query, headers)
 
+def pod_result(result_pod, clean_query):
     return {
         'success': True,
         'query': clean_query,
-        'pod_class': pod_class,
+        'pod_class': result_pod.get('class', ''),
         'data': result_pod.get('content', {})
     }
 
 
-def handle_doc_search(result_pod, original_query, headers):
-    """DocumentSearch 결과 + 자동 페이지네이션 (최대 5페이지)."""
+def execute_query(api_key, query, max_pages=None, max_docs=None):
+    """DeepSearch API 쿼리 실행."""
+    headers = auth_headers(api_key)
+    clean_query = with_fields(query.replace('\n', '').strip(), DOC_SUMMARY_FIELDS)
+
+    response = first_response(clean_query, headers)
+    if 'result' in response:
+        return response['result']
+
+    result_pod = response['pod']
+    if result_pod.get('class', '') == 'Result:DocumentSearchResult':
+        return handle_doc_search(result_pod, clean_query, headers, api_key, max_pages, max_docs)
+
+    return pod_result(result_pod, clean_query)
+
+
+# 기간 분할 없이 페이지를 넘길 때의 기본 최대 페이지 수 (--max-pages 로 변경)
+DEFAULT_MAX_PAGES = 5
+
+
+class DocumentPager:
+    """
+    DocumentSearch 결과를 소비하는 만큼만 다음 페이지를 요청하는 지연 페이지 반복자.
+
+    pages()는 페이지별 docs 리스트를, docs()는 문서를 하나씩 (uid_str 중복 없이) 생성한다.
+    max_pages 가 None 이면 기본 5페이지까지 받고, 결과가 그보다 많고 쿼리에 기간이 있으면
+    기간 조각(plan_time_shards)을 차례로 넘기며 전체를 받는다. max_docs 에 도달하면 즉시 멈춘다.
+    받은 페이지는 PageCheckpoint 에 저장되어, 실패/중단 후 다시 실행하면 남은 페이지부터 이어받는다.
+    진행 상황은 fetched_pages / doc_count / shards 속성으로 확인한다.
+    """
+
+    def __init__(self, data, query, headers, api_key=None, max_pages=None, max_docs=None):
+        self.first = data
+        self.query = query
+        self.headers = headers
+        self.api_key = api_key
+        self.max_pages = max_pages
+        self.max_docs = max_docs
+        self.total_matches = data.get('total_matches', 0)
+        self.last_page = data.get('last_page', 1)
+        self.fetched_pages = 0
+        self.doc_count = 0
+        self.shards = None
+
+    def sharded(self):
+        """기본 페이지 제한을 넘는 기간 쿼리라서 기간 분할로 전체를 받을지 여부."""
+        return bool(self.api_key and self.max_pages is None and self.last_page > DEFAULT_MAX_PAGES
+                    and find_time_window(self.query))
+
+    def pages(self):
+        if self.sharded():
+            try:
+                plan = plan_time_shards(self.api_key, self.query)
+            except Exception as e:
+                print(f"[shard] failed, falling back to paging: {str(e)[:200]}", file=sys.stderr)
+                plan = None
+            if plan:
+                self.shards = len(plan)
+                for shard_query, _ in plan:
+                    if not (yield from self._paginate(shard_query, None, None)):
+                        return
+                return
+        yield from self._paginate(self.query, self.first, self.max_pages or DEFAULT_MAX_PAGES)
+
+    def docs(self):
+        if self.max_docs is not None and self.max_docs <= 0:
+            return
+        # created_at 조각 경계 문서는 양쪽 조각에 모두 나오므로 uid_str 로 한 번만 생성
+        seen = set()
+        for docs in self.pages():
+            for doc in docs:
+                doc_id = doc.get('uid_str')
+                if doc_id is not None:
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                self.doc_count += 1
+                yield doc
+                if self.max_docs is not None and self.doc_count >= self.max_docs:
+                    return
+
+    def _paginate(self, query, data, max_pages):
+        """query 의 페이지를 차례로 생성. 끝까지 받으면 체크포인트를 지우고 True, 실패로 멈추면 False."""
+        checkpoint = get_checkpoint()
+        if data is None:
+            data = self._fetch(query, 1, checkpoint, {})
+            if data is None:
+                return False
+        self.fetched_pages += 1
+        yield data.get('docs', [])
+        last_page = data.get('last_page', 1)
+        # 1페이지 결과 수가 저장 당시와 같으면 이전 실행이 남긴 페이지를 이어받음
+        saved = checkpoint.start(query, data.get('total_matches'), last_page) if checkpoint else {}
+        if max_pages is not None:
+            last_page = min(last_page, max_pages)
+        for page in range(data.get('current_page', 1) + 1, last_page + 1):
+            data = self._fetch(query, page, checkpoint, saved)
+            if data is None:
+                return False
+            self.fetched_pages += 1
+            yield data.get('docs', [])
+        if checkpoint:
+            checkpoint.finish(query)
+        return True
+
+    def _fetch(self, query, page, checkpoint, saved):
+        """
+        page 번째 페이지의 data. 이전 실행이 체크포인트에 남긴 페이지는 다시 요청하지 않고,
+        새로 받은 페이지는 저장한다. 요청 실패 시 None (이후 페이지 중단), 응답 실패 시 빈 dict.
+        """
+        page_data = saved.get(page)
+        if page_data is None:
+            paged_query = re.sub(r'page\s*=\s*\d+', f'page={page}', query)
+            try:
+                page_data = make_request(build_url(paged_query), self.headers)
+            except Exception as e:
+                print(f"[page {page}] failed: {str(e)[:200]}", file=sys.stderr)
+                return None
+            if checkpoint and page_data.get('success'):
+                checkpoint.save(query, page, page_data)
+        pp = page_data.get('data', {}).get('pods', []) if page_data.get('success') else []
+        if len(pp) < 2:
+            return {}
+        return pp[1].get('content', {}).get('data', {})
+
+
+def summarize_doc(doc):
+    """문서 하나를 결과 요약 형식으로 변환."""
+    s = {
+        'title': doc.get('title', ''),
+        'publisher': doc.get('publisher', ''),
+        'created_at': doc.get('created_at', ''),
+        'category': doc.get('category', ''),
+        'section': doc.get('section', ''),
+        'content': doc.get('content', '')[:500],
+        'content_url': doc.get('content_url', ''),
+    }
+    secs = doc.get('securities', [])
+    if secs:
+        s['securities'] = [{'name': x.get('name',''), 'symbol': x.get('symbol',''), 'market': x.get('market','')} for x in secs]
+    pol = doc.get('polarity', {})
+    if pol:
+        s['polarity'] = pol.get('name', '')
+    esg = doc.get('esg', {})
+    if esg and esg.get('category', {}).get('name'):
+        s['esg'] = {'category': esg['category'].get('name',''), 'polarity': esg.get('polarity',{}).get('name','')}
+    return s
+
+
+def doc_search_data(result_pod):
     content = result_pod.get('content', {})
-    data = content.get('data', {}) if isinstance(content, dict) else {}
-    total_matches = data.get('total_matches', 0)
-    last_page = data.get('last_page', 1)
-    current_page = data.get('current_page', 1)
-    all_docs = data.get('docs', [])
-    max_pages = min(last_page, 5)
-
-    while current_page < max_pages:
-        current_page += 1
-        paged_query = re.sub(r'page\s*=\s*\d+', f'page={current_page}', original_query)
-        url = f'{URL_BASE}{quote(paged_query, safe="")}'
+    return content.get('data', {}) if isinstance(content, dict) else {}
+
+
+def handle_doc_search(result_pod, original_query, headers, api_key=None, max_pages=None, max_docs=None):
+    """
+    DocumentSearch 결과 + 자동 페이지네이션 (기본 최대 5페이지, max_pages/max_docs 로 조정).
+
+    5페이지를 넘고 기간 조건이 있으면 기간 분할 병렬 수집(search_all)으로 전체를 받는다.
+    """
+    data = doc_search_data(result_pod)
+    pager = DocumentPager(data, original_query, headers, api_key, max_pages, max_docs)
+    summarized = None
+    shards = None
+
+    if pager.sharded() and max_docs is None:
         try:
-            page_data = make_request(url, headers)
-            if page_data.get('success'):
-                pp = page_data.get('data', {}).get('pods', [])
-                if len(pp) >= 2:
-                    docs = pp[1].get('content', {}).get('data', {}).get('docs', [])
-                    all_docs.extend(docs)
+            all_docs, total_matches, shards, pages = search_all(api_key, original_query)
+            summarized = [summarize_doc(doc) for doc in all_docs]
+            pager.total_matches, pager.fetched_pages = total_matches, pages
         except Exception as e:
-            print(f"[page {current_page}] failed: {str(e)[:200]}", file=sys.stderr)
-            break
-
-    summarized = []
-    for doc in all_docs:
-        s = {
-            'title': doc.get('title', ''),
-            'publisher': doc.get('publisher', ''),
-            'created_at': doc.get('created_at', ''),
-            'category': doc.get('category', ''),
-            'section': doc.get('section', ''),
-            'content': doc.get('content', '')[:500],
-            'content_url': doc.get('content_url', ''),
-        }
-        secs = doc.get('securities', [])
-        if secs:
-            s['securities'] = [{'name': x.get('name',''), 'symbol': x.get('symbol',''), 'market': x.get('market','')} for x in secs]
-        pol = doc.get('polarity', {})
-        if pol:
-            s['polarity'] = pol.get('name', '')
-        esg = doc.get('esg', {})
-        if esg and esg.get('category', {}).get('name'):
-            s['esg'] = {'category': esg['category'].get('name',''), 'polarity': esg.get('polarity',{}).get('name','')}
-        summarized.append(s)
+            print(f"[shard] failed, falling back to paging: {str(e)[:200]}", file=sys.stderr)
+            pager = DocumentPager(data, original_query, headers, None, max_pages, max_docs)
 
-    return {
+    if summarized is None:
+        summarized = [summarize_doc(doc) for doc in pager.docs()]
+        shards = pager.shards
+
+    result = {
         'success': True,
         'query': original_query,
         'pod_class': 'Result:DocumentSearchResult',
-        'total_matches': total_matches,
-        'total_pages': last_page,
-        'fetched_pages': min(current_page, max_pages),
+        'total_matches': pager.total_matches,
+        'total_pages': pager.last_page,
+        'fetched_pages': pager.fetched_pages,
         'doc_count': len(summarized),
         'docs': summarized
     }
+    if shards:
+        result['shards'] = shards
+    return result
+
+
+def stream_query(api_key, query, out=sys.stdout, max_pages=None, max_docs=None):
+    """
+    쿼리를 실행해 결과를 NDJSON(한 줄에 JSON 하나)으로 out 에 바로 쓴다.
+
+    DocumentSearch 는 페이지가 도착하는 대로 요약 문서를 한 줄씩 쓰고(메모리에 쌓지 않음),
+    다른 결과는 execute_query 결과를 한 줄로 쓴다. 진행 요약은 stderr 로 출력한다.
+    반환값은 성공 여부.
+    """
+    headers = auth_headers(api_key)
+    clean_query = with_fields(query.replace('\n', '').strip(), DOC_SUMMARY_FIELDS)
+    response = first_response(clean_query, headers)
+    result_pod = response.get('pod')
+    if result_pod is None or result_pod.get('class', '') != 'Result:DocumentSearchResult':
+        result = response['result'] if result_pod is None else pod_result(result_pod, clean_query)
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        return result.get('success', False)
+
+    pager = DocumentPager(doc_search_data(result_pod), clean_query, headers, api_key, max_pages, max_docs)
+    for doc in pager.docs():
+        out.write(json.dumps(summarize_doc(doc), ensure_ascii=False) + '\n')
+        out.flush()
+    shards = f', {pager.shards} shards' if pager.shards else ''
+    print(f"[stream] {pager.doc_count}/{pager.total_matches} docs, "
+          f"{pager.fetched_pages}/{pager.last_page} pages{shards}", file=sys.stderr)
+    return True
+
+
+def option_value(name):
+    """--name 값 (없으면 None)."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return int(sys.argv[idx + 1])
+    return None
 
 
 def main():
     # Windows 환경에서 한글 출력 깨짐 방지
     sys.stdout.reconfigure(encoding='utf-8')
 
-    if len(sys.argv) < 3:
-        print(json.dumps({'success': False, 'error': 'Usage: python query_api.py <API_KEY> <QUERY>'}, ensure_ascii=False, indent=2))
+    args = [a for i, a in enumerate(sys.argv[1:], start=1)
+            if not a.startswith('--') and sys.argv[i - 1] not in ('--max-pages', '--max-docs')]
+    if len(args) < 2:
+        print(json.dumps({'success': False, 'error': 'Usage: python query_api.py <API_KEY> <QUERY> '
+                                                     '[--stream] [--max-pages N] [--max-docs N]'},
+                         ensure_ascii=False, indent=2))
         sys.exit(1)
 
-    api_key = sys.argv[1]
-    query = sys.argv[2]
+    api_key = args[0]
+    query = args[1]
+    max_pages = option_value('--max-pages')
+    max_docs = option_value('--max-docs')
 
     try:
-        result = execute_query(api_key, query)
+        if '--stream' in sys.argv:
+            if not stream_query(api_key, query, max_pages=max_pages, max_docs=max_docs):
+                sys.exit(1)
+            return
+        result = execute_query(api_key, query, max_pages, max_docs)
         print(json.dumps(result, ensure_ascii=False, indent=2))
     except Exception as e:
         print(json.dumps({'success': False, 'error': str(e), 'query': query}, ensure_ascii=False, indent=2))
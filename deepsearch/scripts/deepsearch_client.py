@@ -0,0 +1,1628 @@
+"""
+DeepSearch API 공용 클라이언트
+
+모든 스크립트와 Streamlit 앱이 공유하는 HTTP 계층입니다.
+프로세스 전체에서 하나의 keep-alive 커넥션 풀(requests.Session)을 재사용하므로
+호출마다 api.deepsearch.com 과 TLS 핸드셰이크를 새로 맺지 않습니다.
+
+대량 조회(fan-out)는 AsyncClient / api_call_many 를 사용합니다.
+하나의 asyncio 이벤트 루프에서 수백 개 요청을 스레드 없이 동시에 진행합니다.
+aiohttp 가 설치되어 있으면 논블로킹 소켓을, 없으면 공용 세션을 스레드 풀에서 사용합니다.
+
+모든 요청(스레드/asyncio)은 프로세스 공용 AdaptiveLimiter 를 거칩니다.
+토큰 버킷으로 초당 요청 수를 제한하고, 429/503 응답이 오면 동시성 한도를 절반으로 줄인 뒤
+성공이 이어지는 동안 다시 조금씩 늘립니다 (AIMD). Retry-After 헤더를 존중합니다.
+
+재시도 간격은 지터를 섞은 지수 백오프(full jitter)라서 여러 호출자가 같은 순간에 몰리지 않습니다.
+쿼리 함수(DocumentSearch, GetStockPrices 등)별 CircuitBreaker 가 연속 실패를 세어
+한도를 넘으면 쿨다운 동안 요청을 보내지 않고 CircuitOpenError 로 즉시 실패합니다.
+
+성공한 응답은 로컬 디스크 캐시(ResponseCache, SQLite 한 파일)에 정규화한 쿼리 문자열의
+해시를 키로 저장되어 모든 스크립트와 앱이 공유합니다. 유효 기간은 쿼리 종류로 정합니다.
+    - 쿼리 안의 날짜가 모두 오늘(KST) 이전: 과거 데이터라 바뀌지 않으므로 만료 없음
+    - 오늘 또는 최신 데이터 조회(DocumentSearch, GetStockPrices, GetMarketIndexes,
+      SearchTrendingTopics, 자연어 쿼리 등): DEEPSEARCH_CACHE_TTL_LIVE
+    - 그 외 기업 정보 조회(GetEntitySummary, FindEntity, GetCompany* 등): DEEPSEARCH_CACHE_TTL_REFERENCE
+전체 크기가 DEEPSEARCH_CACHE_MAX_MB 를 넘으면 가장 오래 쓰지 않은 항목부터 지웁니다 (LRU).
+
+fetch_json 은 같은 쿼리가 이미 다른 스레드에서 진행 중이면 새로 요청하지 않고
+그 결과를 기다려 함께 받습니다 (single-flight). Streamlit 앱처럼 여러 세션이 한 프로세스를
+공유할 때 동시에 들어온 같은 검색/페이지 요청이 API 호출 한 번으로 합쳐집니다.
+
+여러 종목을 한 번에 받는 쿼리(GetStockPrices([...]) 등)는 api_call_batched 로 URL 길이
+(DEEPSEARCH_MAX_URL_LENGTH)가 허용하는 만큼 묶어 보내고, 400/413 이 오면 배치를 반으로
+나눠 다시 보냅니다. fetch_stock_prices 는 이를 이용한 일괄 주가 조회이고, fetch_market_caps 는
+종가(columns=["close"])와 GetStockSymbols 의 상장주식수(shares_outstanding)로 시가총액을 계산합니다.
+긴 OR 조건(언론사 목록, 종목 목록 등)은 split_or_query 로 URL 한도에 맞는 여러 하위 쿼리로
+나눈 뒤 병렬 실행하고 문서 ID(uid_str)로 중복을 제거해 합칩니다.
+기간이 넓은 DocumentSearch 는 plan_time_shards 가 count=1 로 total_matches 를 조사해
+date_from/date_to 또는 created_at:[...] 구간을 일/시간 단위 조각으로 나누고
+(여러 쿼리는 plan_time_shards_many 가 조사를 한 번에 묶어 보냄),
+search_all 이 조각들의 페이지를 병렬로 받아 합칩니다 (깊은 페이지네이션 회피).
+여러 페이지를 받는 수집(search_all, query_api.py, 웹앱 검색)은 받은 페이지를 PageCheckpoint
+(캐시 폴더의 checkpoints.sqlite3)에 저장하므로, 중간에 실패/중단된 검색을 다시 실행하면
+이미 받은 페이지는 건너뛰고 남은 페이지부터 이어받습니다. 끝까지 받으면 체크포인트를 지웁니다.
+day_slices 는 기간 쿼리를 하루 조각으로 나눕니다 (웹앱의 로컬 문서 저장소
+newsscrap/document_store.py 가 지난 날짜 조각을 저장하는 단위).
+
+카세트(cassette) 모드: DEEPSEARCH_CASSETTE 에 폴더를 지정하면 HTTP 계층이 API 대신 그 폴더를 씁니다.
+    - record: 실제 API 에 요청하면서 응답을 정규화한 쿼리별 gzip JSON 파일로 저장
+    - replay: 저장된 응답만으로 동작 (네트워크/API 키 불필요). 없는 쿼리는 CassetteMissError
+      DEEPSEARCH_REPLAY_LATENCY 초의 지연과 DEEPSEARCH_REPLAY_ERROR_RATE 비율의 503 을 주입할 수 있어
+      재시도/요청 제한기/회로 차단기까지 포함한 성능 측정을 오프라인에서 재현할 수 있습니다.
+    카세트 모드에서는 응답 캐시를 쓰지 않습니다 (모든 요청이 카세트를 거치도록).
+
+환경변수:
+    DEEPSEARCH_POOL_CONNECTIONS      호스트별 커넥션 풀 개수 (기본 4)
+    DEEPSEARCH_POOL_MAXSIZE          호스트당 최대 커넥션 수 (기본 32)
+    DEEPSEARCH_CONCURRENCY           동시 요청 수 상한 (기본 100)
+    DEEPSEARCH_INITIAL_CONCURRENCY   시작 동시성 한도 (기본 10)
+    DEEPSEARCH_RATE                  초당 최대 요청 수, 0 이면 제한 없음 (기본 50)
+    DEEPSEARCH_BACKOFF_CAP           재시도 대기 상한 초 (기본 30)
+    DEEPSEARCH_BREAKER_THRESHOLD     회로 차단까지 연속 실패 횟수 (기본 5)
+    DEEPSEARCH_BREAKER_COOLDOWN      회로 차단 유지 시간 초 (기본 30)
+    DEEPSEARCH_CACHE                 0 이면 응답 캐시 사용 안 함 (기본 1)
+    DEEPSEARCH_CACHE_DIR             캐시 폴더 (기본 ~/.cache/deepsearch)
+    DEEPSEARCH_CACHE_MAX_MB          캐시 최대 크기 MB (기본 512)
+    DEEPSEARCH_CACHE_TTL_LIVE        오늘/최신 데이터 쿼리 유효 초 (기본 300)
+    DEEPSEARCH_CACHE_TTL_REFERENCE   기업 정보 쿼리 유효 초 (기본 86400)
+    DEEPSEARCH_MAX_URL_LENGTH        배치 쿼리 URL 최대 길이 (기본 4000)
+    DEEPSEARCH_SHARD_TARGET_PAGES    기간 분할 시 조각당 목표 페이지 수 (기본 10)
+    DEEPSEARCH_CHECKPOINT            0 이면 페이지 체크포인트 사용 안 함 (기본 1)
+    DEEPSEARCH_CHECKPOINT_TTL        실패/중단된 검색을 이어받을 수 있는 시간 (초, 기본 1800)
+    DEEPSEARCH_CASSETTE              카세트 폴더 (지정 시 카세트 모드)
+    DEEPSEARCH_CASSETTE_MODE         record 또는 replay (기본 replay)
+    DEEPSEARCH_REPLAY_LATENCY        replay 응답 지연 초 (기본 0)
+    DEEPSEARCH_REPLAY_ERROR_RATE     replay 시 503 으로 응답할 비율 0~1 (기본 0)
+
+사본 위치:
+    스킬 폴더가 단독으로 배포되므로 이 파일은 deepsearch/scripts/ 를 원본으로
+    deepsearch-*/scripts/, newsscrap/ 에 동일하게 복사되어 있습니다.
+    수정 시 모든 사본을 함께 갱신하세요.
+
+의존성: requests (pip install requests), 선택: aiohttp
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import gzip
+import json
+import zlib
+import base64
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, unquote
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# DeepSearch API 인증서 경고 비활성화 (verify=False 사용)
+requests.packages.urllib3.disable_warnings()
+
+URL_BASE = 'https://api.deepsearch.com/v1/compute?input='
+
+DEFAULT_POOL_CONNECTIONS = int(os.getenv('DEEPSEARCH_POOL_CONNECTIONS', '4'))
+DEFAULT_POOL_MAXSIZE = int(os.getenv('DEEPSEARCH_POOL_MAXSIZE', '32'))
+DEFAULT_CONCURRENCY = int(os.getenv('DEEPSEARCH_CONCURRENCY', '100'))
+DEFAULT_INITIAL_CONCURRENCY = int(os.getenv('DEEPSEARCH_INITIAL_CONCURRENCY', '10'))
+DEFAULT_RATE = float(os.getenv('DEEPSEARCH_RATE', '50'))
+DEFAULT_BACKOFF_CAP = float(os.getenv('DEEPSEARCH_BACKOFF_CAP', '30'))
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv('DEEPSEARCH_BREAKER_THRESHOLD', '5'))
+DEFAULT_BREAKER_COOLDOWN = float(os.getenv('DEEPSEARCH_BREAKER_COOLDOWN', '30'))
+DEFAULT_CACHE_ENABLED = os.getenv('DEEPSEARCH_CACHE', '1') != '0'
+DEFAULT_CACHE_DIR = os.getenv('DEEPSEARCH_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'deepsearch'))
+DEFAULT_CACHE_MAX_MB = float(os.getenv('DEEPSEARCH_CACHE_MAX_MB', '512'))
+DEFAULT_CACHE_TTL_LIVE = float(os.getenv('DEEPSEARCH_CACHE_TTL_LIVE', '300'))
+DEFAULT_CACHE_TTL_REFERENCE = float(os.getenv('DEEPSEARCH_CACHE_TTL_REFERENCE', '86400'))
+DEFAULT_MAX_URL_LENGTH = int(os.getenv('DEEPSEARCH_MAX_URL_LENGTH', '4000'))
+DEFAULT_SHARD_TARGET_PAGES = int(os.getenv('DEEPSEARCH_SHARD_TARGET_PAGES', '10'))
+DEFAULT_CHECKPOINT_ENABLED = os.getenv('DEEPSEARCH_CHECKPOINT', '1') != '0'
+DEFAULT_CHECKPOINT_TTL = float(os.getenv('DEEPSEARCH_CHECKPOINT_TTL', '1800'))
+DEFAULT_CASSETTE = os.getenv('DEEPSEARCH_CASSETTE') or None
+DEFAULT_CASSETTE_MODE = os.getenv('DEEPSEARCH_CASSETTE_MODE', 'replay')
+DEFAULT_REPLAY_LATENCY = float(os.getenv('DEEPSEARCH_REPLAY_LATENCY', '0'))
+DEFAULT_REPLAY_ERROR_RATE = float(os.getenv('DEEPSEARCH_REPLAY_ERROR_RATE', '0'))
+
+KST = timezone(timedelta(hours=9))
+
+# 즉시 실패 처리하는 클라이언트 에러 (재시도해도 결과가 같음)
+FAIL_FAST_STATUSES = (400, 403, 413)
+# 서버가 부하를 알리는 응답 (동시성 한도 축소)
+THROTTLE_STATUSES = (429, 503)
+
+
+class DeepSearchError(Exception):
+    """API 호출 실패. HTTP 응답이 있었다면 status_code 를 함께 보관."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(DeepSearchError):
+    """회로 차단 중이라 요청을 보내지 않음. retry_in 초 뒤에 다시 시도 가능."""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"{endpoint} 요청 일시 중단 (API 장애 감지, {retry_in:.0f}초 후 재개)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CassetteMissError(DeepSearchError):
+    """replay 모드에서 카세트에 없는 쿼리를 요청함."""
+
+
+# =====================================================================
+# 커넥션 풀
+# =====================================================================
+_session = None
+_session_lock = threading.Lock()
+_pool_config = {
+    'pool_connections': DEFAULT_POOL_CONNECTIONS,
+    'pool_maxsize': DEFAULT_POOL_MAXSIZE,
+}
+
+
+def _build_session():
+    session = requests.Session()
+    session.verify = False
+    adapter = HTTPAdapter(
+        pool_connections=_pool_config['pool_connections'],
+        pool_maxsize=_pool_config['pool_maxsize'],
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def configure_pool(pool_connections=None, pool_maxsize=None):
+    """커넥션 풀 크기 변경. 기존 세션은 닫고 다음 호출 시 새 크기로 생성."""
+    global _session
+    with _session_lock:
+        if pool_connections is not None:
+            _pool_config['pool_connections'] = pool_connections
+        if pool_maxsize is not None:
+            _pool_config['pool_maxsize'] = pool_maxsize
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def ensure_pool_size(pool_maxsize):
+    """풀 크기가 pool_maxsize 보다 작으면 키운다 (스레드 fan-out 대비)."""
+    if _pool_config['pool_maxsize'] < pool_maxsize:
+        configure_pool(pool_maxsize=pool_maxsize)
+
+
+def get_session():
+    """프로세스 공용 keep-alive 세션 (스레드 간 공유)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+# =====================================================================
+# 요청 제한 (토큰 버킷 + AIMD)
+# =====================================================================
+class AdaptiveLimiter:
+    """
+    토큰 버킷(초당 요청 수) + AIMD 동시성 한도.
+
+    - 성공 응답마다 한도를 1/limit 씩 올린다 (한도만큼 성공하면 +1)
+    - 429/503 이면 한도를 절반으로 줄이고, Retry-After 동안 새 요청을 보내지 않는다
+    스레드(make_request)와 asyncio(AsyncClient)에서 함께 사용한다.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, initial_limit=DEFAULT_INITIAL_CONCURRENCY,
+                 max_limit=DEFAULT_CONCURRENCY, min_limit=1):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.limit = float(min(initial_limit, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """슬롯과 토큰을 얻으면 0, 못 얻으면 다시 시도하기까지 기다릴 초."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self.in_flight >= int(self.limit):
+                return 0.05
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.rate
+                self._tokens -= 1
+            self.in_flight += 1
+            return 0
+
+    def acquire(self):
+        """요청 슬롯 획득 (블로킹)."""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """요청 슬롯 획득 (asyncio)."""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, status_code=None, retry_after=None):
+        """슬롯 반환. 응답 코드로 한도를 조정 (네트워크 오류 등 status_code=None 은 중립)."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if status_code in THROTTLE_STATUSES:
+                # 동시에 돌아온 429 여러 개로 한도가 연속 반감되지 않도록 1초에 한 번만 감소
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            elif status_code is not None and status_code < 400:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+_limiter = AdaptiveLimiter()
+
+
+def get_limiter():
+    """프로세스 공용 요청 제한기."""
+    return _limiter
+
+
+def configure_limiter(**kwargs):
+    """요청 제한기 재설정 (rate, burst, initial_limit, max_limit, min_limit)."""
+    global _limiter
+    _limiter = AdaptiveLimiter(**kwargs)
+    return _limiter
+
+
+def _retry_after_seconds(value):
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 초 단위로 변환. 없으면 None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+# =====================================================================
+# 회로 차단기
+# =====================================================================
+class CircuitBreaker:
+    """
+    엔드포인트 하나의 회로 차단기.
+
+    closed: 정상. 연속 실패가 threshold 에 닿으면 open 으로 전환.
+    open: cooldown 동안 모든 요청을 CircuitOpenError 로 즉시 실패.
+    half-open: cooldown 이 지나면 요청 1건만 시험으로 통과시키고,
+               성공하면 closed, 실패하면 다시 open.
+    """
+
+    def __init__(self, endpoint, threshold=DEFAULT_BREAKER_THRESHOLD, cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """차단이 풀리기까지 남은 초. 차단 중이 아니면 0."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def before_request(self):
+        """요청 직전 호출. 차단 중이면 CircuitOpenError."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.retry_in()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.endpoint, max(remaining, 1.0))
+            self._probing = True
+
+    def record(self, healthy):
+        """요청 결과 반영. healthy=False 는 연결 오류, 5xx, 429."""
+        with self._lock:
+            if healthy:
+                self.failures = 0
+                self._opened_at = None
+            else:
+                self.failures += 1
+                if self._probing or self.failures >= self.threshold:
+                    self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_breaker_config = {
+    'threshold': DEFAULT_BREAKER_THRESHOLD,
+    'cooldown': DEFAULT_BREAKER_COOLDOWN,
+}
+_ENDPOINT_RE = re.compile(r'^\s*([A-Za-z_]\w*)\s*\(')
+
+
+def endpoint_of(query):
+    """쿼리의 함수명(DocumentSearch 등). 자연어 쿼리는 'compute'."""
+    match = _ENDPOINT_RE.match(query)
+    return match.group(1) if match else 'compute'
+
+
+def get_breaker(endpoint):
+    """엔드포인트별 공용 CircuitBreaker."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(endpoint, **_breaker_config)
+            _breakers[endpoint] = breaker
+        return breaker
+
+
+def configure_breakers(threshold=None, cooldown=None):
+    """회로 차단 기준 변경. 기존 차단 상태는 초기화."""
+    with _breakers_lock:
+        if threshold is not None:
+            _breaker_config['threshold'] = threshold
+        if cooldown is not None:
+            _breaker_config['cooldown'] = cooldown
+        _breakers.clear()
+
+
+def open_circuits():
+    """현재 차단 중인 엔드포인트와 남은 초. {endpoint: retry_in}"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.endpoint: b.retry_in() for b in breakers if b.retry_in() > 0}
+
+
+def _is_healthy(status_code):
+    return status_code is not None and status_code < 500 and status_code != 429
+
+
+def backoff_delay(attempt, base, cap=None):
+    """지수 백오프 + full jitter: 0 ~ min(cap, base * 2^(attempt-1)) 사이 무작위."""
+    cap = DEFAULT_BACKOFF_CAP if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+# =====================================================================
+# 응답 캐시
+# =====================================================================
+# 오늘 데이터가 계속 바뀌는 쿼리 함수. 과거 날짜로 닫힌 쿼리가 아니면 짧은 TTL 적용.
+LIVE_ENDPOINTS = frozenset([
+    'compute', 'DocumentSearch', 'DocumentTrends', 'DocumentAggregation',
+    'GetStockPrices', 'GetMarketIndexes', 'GetMarketSummaryInfoByIndustry',
+    'SearchTrendingTopics', 'GetTrendingTopic', 'SearchHistoricalTopics',
+    'GetHistoricalTopic', 'GetSentimentScore', 'SearchTargetPrices', 'SearchAnalystReports',
+])
+
+
+def canonical_query(query):
+    """캐시 키용 쿼리 정규화. 따옴표 밖의 공백을 정리해 표기만 다른 쿼리를 같은 키로 묶는다."""
+    out = []
+    quote_char = None
+    for ch in query.replace('\n', '').strip():
+        if quote_char:
+            out.append(ch)
+            if ch == quote_char and (len(out) < 2 or out[-2] != '\\'):
+                quote_char = None
+            continue
+        if ch in '"\'':
+            quote_char = ch
+        elif ch.isspace():
+            if out and out[-1] not in ' ([,=':
+                out.append(' ')
+            continue
+        elif ch in ')],=' and out and out[-1] == ' ':
+            out.pop()
+        out.append(ch)
+    return ''.join(out).strip()
+
+
+def _query_end(query):
+    """
+    쿼리에 명시된 기간 끝 날짜 (date_to 파라미터 또는 created_at:[... to 끝]). 없으면 None.
+
+    date_from 만 있는 조회나 키워드 안의 날짜는 끝이 열려 있으므로 보지 않는다.
+    """
+    match = _CREATED_AT_RE.search(query)
+    if match:
+        return datetime.fromisoformat(match.group('end')).date()
+    date_to = get_query_param(query, 'date_to')
+    if date_to:
+        try:
+            return _parse_date(date_to).date()
+        except ValueError:
+            return None
+    return None
+
+
+def cache_ttl(query):
+    """쿼리 종류별 캐시 유효 시간(초). None 은 만료 없음 (끝 날짜가 오늘 이전으로 닫힌 쿼리)."""
+    end = _query_end(query)
+    if end is not None and end < datetime.now(KST).date():
+        return None
+    if endpoint_of(query) in LIVE_ENDPOINTS:
+        return DEFAULT_CACHE_TTL_LIVE
+    return DEFAULT_CACHE_TTL_REFERENCE
+
+
+class ResponseCache:
+    """
+    SQLite 한 파일에 저장하는 응답 캐시.
+
+    키는 정규화한 쿼리의 SHA-256, 값은 zlib 으로 압축한 JSON.
+    여러 프로세스(스크립트, Streamlit 앱)가 같은 파일을 공유해도 되며,
+    전체 크기가 max_bytes 를 넘으면 마지막 사용 시각이 오래된 항목부터 지운다.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, query TEXT, body BLOB, size INTEGER,'
+            ' expires REAL, accessed REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)')
+
+    @staticmethod
+    def key(query):
+        return hashlib.sha256(canonical_query(query).encode('utf-8')).hexdigest()
+
+    def get(self, query):
+        """캐시된 응답(dict) 또는 None."""
+        key = self.key(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, expires FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, expires = row
+            if expires is not None and expires < now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(zlib.decompress(body))
+
+    def put(self, query, data, ttl=None):
+        """응답 저장. ttl=None 이면 만료 없음."""
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, query, body, size, expires, accessed)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (self.key(query), canonical_query(query), body, len(body), expires, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute('DELETE FROM responses WHERE expires IS NOT NULL AND expires < ?', (now,))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - self.max_bytes * 0.9
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed'):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_config = {
+    'enabled': DEFAULT_CACHE_ENABLED,
+    'path': os.path.join(DEFAULT_CACHE_DIR, 'responses.sqlite3'),
+    'max_bytes': int(DEFAULT_CACHE_MAX_MB * 1024 * 1024),
+}
+
+
+def get_cache():
+    """프로세스 공용 ResponseCache. 비활성화되었거나 파일을 열 수 없으면 None."""
+    global _cache
+    if not _cache_config['enabled'] or get_cassette() is not None:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and _cache_config['enabled']:
+                try:
+                    os.makedirs(os.path.dirname(_cache_config['path']), exist_ok=True)
+                    _cache = ResponseCache(_cache_config['path'], _cache_config['max_bytes'])
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[cache] 비활성화: {e}", file=sys.stderr)
+                    _cache_config['enabled'] = False
+    return _cache
+
+
+def configure_cache(enabled=None, path=None, max_bytes=None):
+    """캐시 설정 변경. 다음 조회 시 새 설정으로 다시 연다."""
+    global _cache
+    with _cache_lock:
+        if enabled is not None:
+            _cache_config['enabled'] = enabled
+        if path is not None:
+            _cache_config['path'] = path
+        if max_bytes is not None:
+            _cache_config['max_bytes'] = max_bytes
+        _cache = None
+
+
+def _cacheable(data):
+    return isinstance(data, dict) and data.get('success', True) is not False
+
+
+# =====================================================================
+# 페이지 체크포인트 (중단된 페이지네이션 이어받기)
+# =====================================================================
+class PageCheckpoint:
+    """
+    페이지 단위 수집 진행 상황을 SQLite 한 파일에 저장하는 체크포인트.
+
+    검색 하나(page 값을 1로 맞춘 정규화 쿼리)마다 받은 페이지(2페이지부터)의 응답 JSON 을 저장해 두고,
+    같은 검색이 실패/중단 후 다시 실행되면 저장된 페이지는 API 를 호출하지 않고 돌려준다.
+    끝까지 받은 검색은 finish() 로 지운다. 마지막 저장 후 ttl 이 지난 검색은 자동 삭제.
+
+    기간 끝이 오늘 이전으로 닫힌 검색은 응답 캐시가 페이지를 만료 없이 보관하므로 저장하지 않고
+    (응답 캐시가 꺼져 있을 때만 저장), 캐시가 몇 분만 보관하는 오늘 포함 검색을 이어받게 해 준다.
+    오늘 포함 검색은 새 기사가 앞 페이지로 들어오면 문서가 뒤 페이지로 밀려, 예전 페이지와 새 페이지를
+    섞으면 문서가 빠진다. 그래서 1페이지는 항상 새로 받고, start() 가 그 total_matches / last_page 를
+    저장 당시 값과 비교해 같을 때만 저장된 페이지를 돌려준다 (다르면 저장된 페이지를 버림).
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS searches ('
+            ' key TEXT PRIMARY KEY, query TEXT, expires REAL, total INTEGER, last_page INTEGER)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' key TEXT, page INTEGER, body BLOB, PRIMARY KEY (key, page))'
+        )
+        # 이전 형식 파일 (total / last_page 컬럼 없음)
+        for column in ('total INTEGER', 'last_page INTEGER'):
+            try:
+                self._conn.execute(f'ALTER TABLE searches ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                pass
+        self._purge(time.time())
+
+    @staticmethod
+    def search_query(query):
+        return canonical_query(set_query_param(query, 'page', 1))
+
+    def key(self, query):
+        return hashlib.sha256(self.search_query(query).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def cached(query):
+        """응답 캐시가 페이지를 만료 없이 보관하는 검색인지 (체크포인트 불필요)."""
+        return cache_ttl(query) is None and get_cache() is not None
+
+    def start(self, query, total_matches, last_page):
+        """
+        새로 받은 1페이지의 total_matches / last_page 로 검색을 시작(또는 이어받기)하고,
+        이어받을 수 있는 저장 페이지 {page: 응답 dict} 를 반환.
+
+        저장 당시와 값이 다르면 (새 기사로 페이지가 밀림) 저장된 페이지를 지우고 빈 dict.
+        응답 캐시가 보관하는 검색이면 아무것도 하지 않고 빈 dict.
+        """
+        if self.cached(query):
+            return {}
+        key = self.key(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT expires, total, last_page FROM searches WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is not None and (row[0] < now or (row[1], row[2]) != (total_matches, last_page)):
+                self._delete(key)
+                row = None
+            self._conn.execute(
+                'INSERT INTO searches (key, query, expires, total, last_page) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET expires = excluded.expires',
+                (key, self.search_query(query), now + self.ttl, total_matches, last_page),
+            )
+            rows = [] if row is None else \
+                self._conn.execute('SELECT page, body FROM pages WHERE key = ?', (key,)).fetchall()
+        return {page: json.loads(zlib.decompress(body)) for page, body in rows}
+
+    def save(self, query, page, data):
+        """
+        page 번째 페이지 응답 저장 (검색의 유효 시간도 연장). start() 로 시작한 검색만 저장하며,
+        1페이지(항상 새로 받음)와 응답 캐시가 보관하는 검색은 저장하지 않음.
+        """
+        if page == 1 or self.cached(query):
+            return
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        key = self.key(query)
+        with self._lock:
+            updated = self._conn.execute('UPDATE searches SET expires = ? WHERE key = ?',
+                                         (time.time() + self.ttl, key)).rowcount
+            if updated:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO pages (key, page, body) VALUES (?, ?, ?)', (key, page, body)
+                )
+
+    def finish(self, query):
+        """검색을 끝까지 받았으면 체크포인트 삭제."""
+        with self._lock:
+            self._delete(self.key(query))
+
+    def _delete(self, key):
+        self._conn.execute('DELETE FROM pages WHERE key = ?', (key,))
+        self._conn.execute('DELETE FROM searches WHERE key = ?', (key,))
+
+    def _purge(self, now):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages WHERE key IN (SELECT key FROM searches WHERE expires < ?)', (now,))
+            self._conn.execute('DELETE FROM searches WHERE expires < ?', (now,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.execute('DELETE FROM searches')
+
+
+_checkpoint = None
+_checkpoint_lock = threading.Lock()
+_checkpoint_config = {
+    'enabled': DEFAULT_CHECKPOINT_ENABLED,
+    'path': os.path.join(DEFAULT_CACHE_DIR, 'checkpoints.sqlite3'),
+    'ttl': DEFAULT_CHECKPOINT_TTL,
+}
+
+
+def get_checkpoint():
+    """프로세스 공용 PageCheckpoint. 비활성화되었거나 파일을 열 수 없으면 None (카세트 모드에서도 None)."""
+    global _checkpoint
+    if not _checkpoint_config['enabled'] or get_cassette() is not None:
+        return None
+    if _checkpoint is None:
+        with _checkpoint_lock:
+            if _checkpoint is None and _checkpoint_config['enabled']:
+                try:
+                    os.makedirs(os.path.dirname(_checkpoint_config['path']), exist_ok=True)
+                    _checkpoint = PageCheckpoint(_checkpoint_config['path'], _checkpoint_config['ttl'])
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[checkpoint] 비활성화: {e}", file=sys.stderr)
+                    _checkpoint_config['enabled'] = False
+    return _checkpoint
+
+
+def configure_checkpoint(enabled=None, path=None, ttl=None):
+    """체크포인트 설정 변경. 다음 조회 시 새 설정으로 다시 연다."""
+    global _checkpoint
+    with _checkpoint_lock:
+        if enabled is not None:
+            _checkpoint_config['enabled'] = enabled
+        if path is not None:
+            _checkpoint_config['path'] = path
+        if ttl is not None:
+            _checkpoint_config['ttl'] = ttl
+        _checkpoint = None
+
+
+# =====================================================================
+# 카세트 (record / replay)
+# =====================================================================
+class Cassette:
+    """
+    쿼리별 응답을 폴더에 저장(record)하거나 저장된 응답으로 대신 응답(replay).
+
+    파일 하나가 쿼리 하나: <폴더>/<정규화 쿼리 SHA-256>.json.gz
+    내용: {'query', 'status', 'reason', 'retry_after', 'body'} (body 는 JSON 응답, 실패 시 None)
+    """
+
+    def __init__(self, path, mode='replay', latency=0.0, error_rate=0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"cassette mode must be 'record' or 'replay': {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.error_rate = error_rate
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def _file(self, query):
+        return os.path.join(self.path, ResponseCache.key(query) + '.json.gz')
+
+    def record(self, query, status, reason, retry_after, body):
+        entry = {'query': canonical_query(query), 'status': status, 'reason': reason,
+                 'retry_after': retry_after, 'body': body}
+        tmp = self._file(query) + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._file(query))
+
+    def replay(self, query):
+        """저장된 (status, reason, retry_after, body). 오류 주입 대상이면 503 을 돌려준다."""
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, 'Service Unavailable (injected)', None, None
+        try:
+            with gzip.open(self._file(query), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            raise CassetteMissError(f"카세트에 없는 쿼리: {canonical_query(query)[:200]}")
+        return entry['status'], entry['reason'], entry['retry_after'], entry['body']
+
+    def replay_response(self, url):
+        """make_request 용 requests.Response 로 재생."""
+        if self.latency:
+            time.sleep(self.latency)
+        status, reason, retry_after, body = self.replay(_query_of(url))
+        resp = requests.Response()
+        resp.status_code = status
+        resp.reason = reason
+        resp.url = url
+        resp._content = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+        resp.headers['Content-Type'] = 'application/json'
+        if retry_after is not None:
+            resp.headers['Retry-After'] = retry_after
+        return resp
+
+    def record_response(self, url, resp):
+        body = resp.json() if resp.ok else None
+        self.record(_query_of(url), resp.status_code, resp.reason, resp.headers.get('Retry-After'), body)
+
+
+_cassette = None
+_cassette_config = {
+    'path': DEFAULT_CASSETTE,
+    'mode': DEFAULT_CASSETTE_MODE,
+    'latency': DEFAULT_REPLAY_LATENCY,
+    'error_rate': DEFAULT_REPLAY_ERROR_RATE,
+}
+
+
+def get_cassette():
+    """설정된 Cassette. 카세트 모드가 아니면 None."""
+    global _cassette
+    if _cassette is None and _cassette_config['path']:
+        _cassette = Cassette(**_cassette_config)
+    return _cassette
+
+
+def configure_cassette(path=None, mode=None, latency=None, error_rate=None):
+    """카세트 설정 변경. path='' 면 카세트 모드 해제."""
+    global _cassette
+    if path is not None:
+        _cassette_config['path'] = path or None
+    if mode is not None:
+        _cassette_config['mode'] = mode
+    if latency is not None:
+        _cassette_config['latency'] = latency
+    if error_rate is not None:
+        _cassette_config['error_rate'] = error_rate
+    _cassette = None
+
+
+def _query_of(url):
+    return unquote(url[len(URL_BASE):]) if url.startswith(URL_BASE) else url
+
+
+def _http_get(url, headers, timeout):
+    """요청 1회 (카세트 모드면 재생/녹화)."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return cassette.replay_response(url)
+    resp = get_session().get(url, headers=headers, timeout=timeout)
+    if cassette is not None:
+        cassette.record_response(url, resp)
+    return resp
+
+
+# =====================================================================
+# 중복 요청 합치기 (single-flight)
+# =====================================================================
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    같은 키의 작업이 진행 중이면 새로 실행하지 않고 그 결과를 함께 받는다.
+
+    먼저 들어온 스레드만 fn() 을 실행하고, 뒤따른 스레드는 완료를 기다려
+    같은 결과 객체(또는 같은 예외)를 받는다. 결과는 공유되므로 호출자가 수정하지 않아야 한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+_single_flight = SingleFlight()
+
+
+# =====================================================================
+# 요청 헬퍼
+# =====================================================================
+def normalize_api_key(api_key):
+    """API 키를 base64 형식으로 정규화. raw(id:secret) 형식이면 자동 인코딩."""
+    if api_key and ':' in api_key:
+        return base64.b64encode(api_key.encode()).decode()
+    return api_key
+
+
+def auth_headers(api_key):
+    """Basic 인증 헤더 생성."""
+    return {'Authorization': f'Basic {normalize_api_key(api_key)}'}
+
+
+def build_url(query):
+    """쿼리 문자열을 URL 인코딩하여 compute 엔드포인트 URL 생성."""
+    clean_query = query.replace('\n', '').strip()
+    return f'{URL_BASE}{quote(clean_query, safe="")}'
+
+
+def _log_retry(attempt, max_retries, error):
+    print(f"[retry {attempt}/{max_retries}] {str(error)[:200]}", file=sys.stderr)
+
+
+def _raise_if_fail_fast(status_code, reason):
+    if status_code in FAIL_FAST_STATUSES:
+        raise DeepSearchError(
+            f"{status_code} {reason}: URL이 너무 길거나 인증 실패. 쿼리를 줄이거나 API 키를 확인하세요.",
+            status_code=status_code,
+        )
+
+
+def make_request(url, headers, max_retries=3, retry_delay=5, timeout=60, on_retry=_log_retry,
+                 max_elapsed=None):
+    """
+    공용 세션으로 GET 요청. 실패 시 재시도하며 응답 객체를 반환.
+
+    400/403/413 은 재시도 없이 즉시 DeepSearchError.
+    재시도 대기는 retry_delay 를 밑으로 하는 지터 지수 백오프이며,
+    429/503 에 Retry-After 가 있으면 최소 그 시간만큼 기다린다.
+    엔드포인트 회로가 열려 있으면 요청 없이 CircuitOpenError.
+    max_elapsed 를 주면 다음 대기가 그 시간(초)을 넘길 때 재시도를 멈춘다.
+    on_retry(attempt, max_retries, error) 는 재시도 직전에 호출 (None 이면 무시).
+    """
+    limiter = get_limiter()
+    breaker = get_breaker(endpoint_of(_query_of(url)))
+    started = time.monotonic()
+    last_error = None
+    for attempt in range(1, max_retries + 1):
+        wait = backoff_delay(attempt, retry_delay)
+        status_code = retry_after = None
+        breaker.before_request()
+        limiter.acquire()
+        try:
+            resp = _http_get(url, headers, timeout)
+            status_code = resp.status_code
+            retry_after = _retry_after_seconds(resp.headers.get('Retry-After'))
+        except requests.exceptions.RequestException as e:
+            last_error = e
+        finally:
+            limiter.release(status_code, retry_after)
+            breaker.record(_is_healthy(status_code))
+
+        if status_code is not None:
+            if resp.ok:
+                return resp
+            _raise_if_fail_fast(status_code, resp.reason)
+            last_error = DeepSearchError(f"{status_code} {resp.reason}", status_code=status_code)
+            if retry_after is not None:
+                wait = max(wait, retry_after)
+
+        if attempt < max_retries:
+            if max_elapsed is not None and time.monotonic() - started + wait > max_elapsed:
+                break
+            if on_retry:
+                on_retry(attempt, max_retries, last_error)
+            time.sleep(wait)
+    raise DeepSearchError(f"Max retries exceeded: {last_error}", status_code=getattr(last_error, 'status_code', None))
+
+
+def fetch_json(url, headers, use_cache=True, **kwargs):
+    """
+    make_request 후 JSON 응답(dict) 반환. 응답 캐시를 먼저 확인한다.
+
+    같은 쿼리가 다른 스레드에서 진행 중이면 그 요청의 결과를 함께 받는다 (single-flight).
+    kwargs 는 make_request 로 그대로 전달. use_cache=False 면 캐시를 읽지 않고 새로 받아 저장.
+    """
+    query = _query_of(url)
+
+    def load():
+        cache = get_cache()
+        if cache is not None and use_cache:
+            data = cache.get(query)
+            if data is not None:
+                return data
+        data = make_request(url, headers, **kwargs).json()
+        if cache is not None and _cacheable(data):
+            cache.put(query, data, cache_ttl(query))
+        return data
+
+    return _single_flight.do((canonical_query(query), use_cache), load)
+
+
+def api_call(api_key, query, max_retries=3, retry_delay=2, timeout=60, use_cache=True):
+    """DeepSearch 쿼리 실행 후 JSON 응답(dict) 반환. 최종 실패 시 DeepSearchError."""
+    return fetch_json(build_url(query), auth_headers(api_key), use_cache=use_cache,
+                      max_retries=max_retries, retry_delay=retry_delay, timeout=timeout)
+
+
+# =====================================================================
+# 비동기 실행 엔진
+# =====================================================================
+class AsyncClient:
+    """
+    asyncio 기반 DeepSearch 클라이언트.
+
+    최대 concurrency 개까지 요청을 동시에 진행하며, 실제 동시성은 공용 AdaptiveLimiter 가
+    서버 응답에 맞춰 조절한다. 재시도 정책은 make_request 와 같다.
+    사용법:
+        async with AsyncClient(api_key, concurrency=100) as client:
+            data = await client.api_call('GetEntitySummary(KRX:005930)')
+    """
+
+    def __init__(self, api_key, concurrency=DEFAULT_CONCURRENCY, max_retries=3, retry_delay=2, timeout=60,
+                 use_cache=True):
+        self.headers = auth_headers(api_key)
+        self.use_cache = use_cache
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self._semaphore = None
+        self._http = None
+        self._executor = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if aiohttp is not None:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ssl=False),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        else:
+            ensure_pool_size(self.concurrency)
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._http is not None:
+            await self._http.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    async def _send(self, url):
+        """요청 1회. (status, reason, Retry-After 헤더, JSON 또는 None) 반환."""
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            if cassette.latency:
+                await asyncio.sleep(cassette.latency)
+            return cassette.replay(_query_of(url))
+
+        if self._http is None:
+            loop = asyncio.get_running_loop()
+            resp = await loop.run_in_executor(
+                self._executor,
+                lambda: _http_get(url, self.headers, self.timeout),
+            )
+            data = resp.json() if resp.ok else None
+            return resp.status_code, resp.reason, resp.headers.get('Retry-After'), data
+
+        async with self._http.get(url, headers=self.headers) as resp:
+            data = await resp.json(content_type=None) if resp.status < 400 else None
+            result = resp.status, resp.reason, resp.headers.get('Retry-After'), data
+        if cassette is not None:
+            cassette.record(_query_of(url), *result)
+        return result
+
+    async def api_call(self, query, max_retries=None):
+        """쿼리 실행 후 JSON 응답(dict) 반환. 최종 실패 시 DeepSearchError."""
+        max_retries = max_retries or self.max_retries
+        cache = get_cache()
+        if cache is not None and self.use_cache:
+            data = cache.get(query)
+            if data is not None:
+                return data
+        url = build_url(query)
+        limiter = get_limiter()
+        breaker = get_breaker(endpoint_of(query))
+        last_error = None
+        async with self._semaphore:
+            for attempt in range(1, max_retries + 1):
+                wait = backoff_delay(attempt, self.retry_delay)
+                status_code = retry_after = None
+                breaker.before_request()
+                await limiter.acquire_async()
+                try:
+                    status_code, reason, retry_after, data = await self._send(url)
+                    retry_after = _retry_after_seconds(retry_after)
+                except CassetteMissError:
+                    raise
+                except Exception as e:
+                    status_code = None
+                    last_error = e
+                finally:
+                    limiter.release(status_code, retry_after)
+                    breaker.record(_is_healthy(status_code))
+
+                if status_code is not None:
+                    if status_code < 400:
+                        if cache is not None and _cacheable(data):
+                            cache.put(query, data, cache_ttl(query))
+                        return data
+                    _raise_if_fail_fast(status_code, reason)
+                    last_error = DeepSearchError(f"{status_code} {reason}", status_code=status_code)
+                    if retry_after is not None:
+                        wait = max(wait, retry_after)
+
+                if attempt < max_retries:
+                    await asyncio.sleep(wait)
+        raise DeepSearchError(f"Max retries exceeded: {last_error}", status_code=getattr(last_error, 'status_code', None))
+
+
+def api_call_many(api_key, queries, concurrency=DEFAULT_CONCURRENCY, max_retries=3, retry_delay=2, on_done=None,
+                  use_cache=True):
+    """
+    여러 쿼리를 하나의 이벤트 루프에서 동시에 실행. 입력 순서대로 결과 리스트 반환.
+
+    실패한 쿼리 자리에는 예외 객체가 들어간다. use_cache=False 면 캐시를 읽지 않는다 (저장은 함).
+    on_done(done, total) 은 쿼리 하나가 끝날 때마다 호출 (진행률 표시용).
+    """
+    queries = list(queries)
+
+    async def run():
+        done = 0
+
+        async def one(client, query):
+            nonlocal done
+            try:
+                return await client.api_call(query)
+            except Exception as e:
+                return e
+            finally:
+                done += 1
+                if on_done:
+                    on_done(done, len(queries))
+
+        async with AsyncClient(api_key, concurrency=concurrency, max_retries=max_retries,
+                               retry_delay=retry_delay, use_cache=use_cache) as client:
+            return await asyncio.gather(*(one(client, q) for q in queries))
+
+    if not queries:
+        return []
+    return asyncio.run(run())
+
+
+# =====================================================================
+# 배치 조회
+# =====================================================================
+def pack_by_url_length(items, render, max_url_length=None):
+    """
+    items 를 순서대로 묶어 배치 리스트로 반환.
+
+    render(batch) 는 배치로 쿼리 문자열을 만드는 함수이며, 각 배치는 build_url(render(batch))
+    길이가 max_url_length 이하가 되도록 최대한 채운다. 한 개만으로 넘치면 단독 배치.
+    """
+    max_url_length = max_url_length or DEFAULT_MAX_URL_LENGTH
+    batches = []
+    batch = []
+    for item in items:
+        if batch and len(build_url(render(batch + [item]))) > max_url_length:
+            batches.append(batch)
+            batch = []
+        batch.append(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def api_call_batched(api_key, items, render, max_url_length=None, concurrency=DEFAULT_CONCURRENCY,
+                     max_retries=3, retry_delay=2):
+    """
+    items 를 URL 길이에 맞춰 배치로 묶어 동시에 조회. [(배치, 응답 또는 예외), ...] 반환.
+
+    400/413 으로 거절된 배치는 반으로 나눠 다시 보낸다 (URL 한도 추정이 빗나갔거나
+    배치 안에 잘못된 항목이 섞인 경우). 항목 하나짜리 배치의 실패는 그대로 반환.
+    """
+    pending = pack_by_url_length(list(items), render, max_url_length)
+    results = []
+    while pending:
+        responses = api_call_many(api_key, [render(b) for b in pending], concurrency=concurrency,
+                                  max_retries=max_retries, retry_delay=retry_delay)
+        split = []
+        for batch, data in zip(pending, responses):
+            if isinstance(data, DeepSearchError) and data.status_code in (400, 413) and len(batch) > 1:
+                mid = len(batch) // 2
+                split += [batch[:mid], batch[mid:]]
+            else:
+                results.append((batch, data))
+        pending = split
+    return results
+
+
+def or_clause(field, values, quote="'"):
+    """검색 조건 OR 절 생성. 예: or_clause('publisher.raw', ['A', 'B']) → publisher.raw:('A' or 'B')"""
+    return f"{field}:(" + ' or '.join(f'{quote}{v}{quote}' for v in values) + ')'
+
+
+_FIELDS_RE = re.compile(r'\bfields\s*=')
+
+
+def with_fields(query, fields):
+    """
+    DocumentSearch 쿼리에 fields=[...] 투영을 추가. 응답에 필요한 필드만 받아 전송량을 줄인다.
+
+    이미 fields= 가 있거나 DocumentSearch 가 아니면 그대로 반환.
+    """
+    query = query.strip()
+    if endpoint_of(query) != 'DocumentSearch' or _FIELDS_RE.search(query) or not query.endswith(')'):
+        return query
+    field_list = ','.join(f'"{f}"' for f in fields)
+    return f'{query[:-1]}, fields=[{field_list}])'
+
+
+def split_or_query(render, field, values, max_url_length=None, quote="'"):
+    """
+    긴 OR 절이 들어간 쿼리를 URL 길이 한도에 맞춰 여러 하위 쿼리로 분할.
+
+    render(clause) 는 OR 절 문자열을 받아 완성된 쿼리를 만드는 함수.
+    각 하위 쿼리는 values 일부만 담은 OR 절을 가지며, 결과 합집합이 원래 쿼리와 같다.
+    """
+    def render_batch(batch):
+        return render(or_clause(field, batch, quote))
+
+    return [render_batch(b) for b in pack_by_url_length(list(values), render_batch, max_url_length)]
+
+
+def merge_docs(doc_lists, key='uid_str'):
+    """여러 하위 쿼리의 문서 리스트를 순서대로 합치며 문서 ID 중복 제거."""
+    seen = set()
+    merged = []
+    for docs in doc_lists:
+        for doc in docs:
+            doc_id = doc.get(key)
+            if doc_id is not None:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+            merged.append(doc)
+    return merged
+
+
+def _stock_price_query(symbols, date_from=None, date_to=None, columns=None):
+    args = [f'[{",".join(symbols)}]']
+    if columns:
+        args.append('columns=[' + ','.join(f'"{c}"' for c in columns) + ']')
+    if date_from:
+        args.append(f'date_from={date_from}')
+    if date_to:
+        args.append(f'date_to={date_to}')
+    return f'GetStockPrices({",".join(args)})'
+
+
+def parse_stock_prices(data):
+    """
+    GetStockPrices 응답을 종목별 컬럼 dict 로 변환.
+
+    반환: {symbol: {'date': [...], 'entity_name': [...], 'close': [...], ...}} (날짜 오름차순)
+    """
+    if not isinstance(data, dict) or not data.get('success'):
+        return {}
+    pods = data.get('data', {}).get('pods', [])
+    if len(pods) < 2:
+        return {}
+    content = pods[1].get('content', {})
+    inner = content.get('data', {}) if isinstance(content, dict) else {}
+    if isinstance(inner.get('data'), dict):
+        inner = inner['data']
+    symbols = inner.get('symbol')
+    if not isinstance(symbols, list):
+        return {}
+
+    rows = {}
+    for i, symbol in enumerate(symbols):
+        rows.setdefault(symbol, []).append(i)
+
+    columns = [k for k, v in inner.items() if isinstance(v, list) and len(v) == len(symbols) and k != 'symbol']
+    by_symbol = {}
+    for symbol, idx in rows.items():
+        if 'date' in inner:
+            idx.sort(key=lambda i: inner['date'][i] or '')
+        by_symbol[symbol] = {k: [inner[k][i] for i in idx] for k in columns}
+    return by_symbol
+
+
+def fetch_stock_prices(api_key, symbols, date_from=None, date_to=None, columns=None,
+                       concurrency=DEFAULT_CONCURRENCY, max_url_length=None, max_retries=2):
+    """
+    여러 종목의 주가를 GetStockPrices 배치 호출로 일괄 조회.
+
+    URL 길이가 허용하는 만큼 종목을 한 쿼리에 묶으므로 종목 수천 개도 수십 번 호출로 끝난다.
+    반환: parse_stock_prices 와 같은 {symbol: {컬럼: [...]}}. 응답에 없던 종목은 빠진다.
+    """
+    def render(batch):
+        return _stock_price_query(batch, date_from, date_to, columns)
+
+    prices = {}
+    for batch, data in api_call_batched(api_key, list(dict.fromkeys(symbols)), render,
+                                        max_url_length=max_url_length, concurrency=concurrency,
+                                        max_retries=max_retries):
+        if isinstance(data, Exception):
+            print(f"[GetStockPrices] {len(batch)}개 종목 조회 실패: {str(data)[:200]}", file=sys.stderr)
+            continue
+        prices.update(parse_stock_prices(data))
+    return prices
+
+
+def fetch_stock_symbols(api_key, symbols, concurrency=DEFAULT_CONCURRENCY, max_url_length=None, max_retries=2):
+    """
+    여러 종목의 종목 정보(GetStockSymbols)를 배치 호출로 일괄 조회.
+
+    응답 형식이 GetStockPrices 와 같아 parse_stock_prices 로 읽는다.
+    반환: {symbol: {'entity_name': [...], 'market': [...], 'shares_outstanding': [...], ...}}
+    """
+    def render(batch):
+        return f'GetStockSymbols([{",".join(batch)}])'
+
+    info = {}
+    for batch, data in api_call_batched(api_key, list(dict.fromkeys(symbols)), render,
+                                        max_url_length=max_url_length, concurrency=concurrency,
+                                        max_retries=max_retries):
+        if isinstance(data, Exception):
+            print(f"[GetStockSymbols] {len(batch)}개 종목 조회 실패: {str(data)[:200]}", file=sys.stderr)
+            continue
+        info.update(parse_stock_prices(data))
+    return info
+
+
+def fetch_market_caps(api_key, symbols, date_from=None, date_to=None, concurrency=DEFAULT_CONCURRENCY,
+                      max_url_length=None, max_retries=2):
+    """
+    여러 종목의 종가와 시가총액을 배치 호출로 일괄 조회.
+
+    GetStockPrices 응답의 시가총액 컬럼명은 문서에 없으므로, 문서화된 두 필드로 계산한다:
+    GetStockPrices(columns=["close"]) 의 종가 × GetStockSymbols 의 shares_outstanding.
+    상장주식수는 현재 값이므로 과거 날짜의 시가총액은 근사치다 (순위 비교용).
+    반환: {symbol: {'date': [...], 'close': [...], 'market_cap': [...]}}. 종가가 없던 종목은 빠진다.
+    """
+    prices = fetch_stock_prices(api_key, symbols, date_from, date_to, columns=['close'],
+                                concurrency=concurrency, max_url_length=max_url_length, max_retries=max_retries)
+    info = fetch_stock_symbols(api_key, list(prices), concurrency=concurrency,
+                               max_url_length=max_url_length, max_retries=max_retries)
+    for symbol, cols in prices.items():
+        shares = (info.get(symbol, {}).get('shares_outstanding') or [None])[-1]
+        cols['market_cap'] = [c * shares if c is not None and shares else None for c in cols.get('close', [])]
+    return prices
+
+
+# =====================================================================
+# 기간 분할 (time-window sharding)
+# =====================================================================
+_CREATED_AT_RE = re.compile(
+    r'created_at\s*:\s*\[\s*\\?"?(?P<start>\d{4}-\d{2}-\d{2}T[\d:.]+)\\?"?'
+    r'\s+to\s+\\?"?(?P<end>\d{4}-\d{2}-\d{2}T[\d:.]+)\\?"?\s*\]'
+)
+
+
+def _param_re(name):
+    return re.compile(r'(\b' + name + r'\s*=\s*)("?)([^,)\s"]+)("?)')
+
+
+def get_query_param(query, name):
+    """DocumentSearch 쿼리의 키워드 파라미터 값(문자열). 없으면 None."""
+    match = _param_re(name).search(query)
+    return match.group(3) if match else None
+
+
+def set_query_param(query, name, value):
+    """키워드 파라미터 값 교체 (표기 형식 유지). 없으면 마지막 괄호 앞에 추가."""
+    pattern = _param_re(name)
+    if pattern.search(query):
+        return pattern.sub(lambda m: f'{m.group(1)}{m.group(2)}{value}{m.group(4)}', query, count=1)
+    query = query.rstrip()
+    return f'{query[:-1]}, {name}={value})'
+
+
+def _parse_date(value):
+    return datetime.strptime(value.replace('-', ''), '%Y%m%d')
+
+
+def find_time_window(query):
+    """
+    쿼리의 검색 기간. (종류, 시작, 끝) 또는 None.
+
+    종류 'created_at': 검색식의 created_at:[시작 to 끝] (시간 단위 분할)
+    종류 'date': date_from/date_to 파라미터, 끝 날짜 포함 (일 단위 분할)
+    """
+    match = _CREATED_AT_RE.search(query)
+    if match:
+        return 'created_at', datetime.fromisoformat(match.group('start')), datetime.fromisoformat(match.group('end'))
+    date_from = get_query_param(query, 'date_from')
+    date_to = get_query_param(query, 'date_to')
+    if date_from and date_to:
+        try:
+            return 'date', _parse_date(date_from), _parse_date(date_to)
+        except ValueError:
+            return None
+    return None
+
+
+def with_time_window(query, kind, start, end):
+    """쿼리의 검색 기간을 [start, end] 로 교체 (find_time_window 와 같은 종류)."""
+    if kind == 'created_at':
+        match = _CREATED_AT_RE.search(query)
+        fmt = '%Y-%m-%dT%H:%M:%S'
+        return (query[:match.start('start')] + start.strftime(fmt)
+                + query[match.end('start'):match.start('end')] + end.strftime(fmt)
+                + query[match.end('end'):])
+    fmt = '%Y-%m-%d' if '-' in get_query_param(query, 'date_from') else '%Y%m%d'
+    query = set_query_param(query, 'date_from', start.strftime(fmt))
+    return set_query_param(query, 'date_to', end.strftime(fmt))
+
+
+def day_slices(query):
+    """
+    기간 쿼리를 하루 단위 조각으로 분할. [(날짜, 조각 쿼리, 완료 여부), ...] 기간 순, 기간이 없으면 [].
+
+    완료 여부는 조각이 오늘(KST) 이전에 끝나는지 (지난 날짜의 결과는 바뀌지 않으므로 저장해도 됨).
+    created_at 기간은 자정 경계로 자르므로 첫날/마지막 날은 하루보다 짧은 조각이 된다.
+    """
+    window = find_time_window(query)
+    if window is None:
+        return []
+    kind, start, end = window
+    today = datetime.now(KST).date()
+    one_day = timedelta(days=1)
+    if kind == 'date':
+        days = [start + one_day * i for i in range((end - start).days + 1)]
+        return [(d.date(), with_time_window(query, kind, d, d), d.date() < today) for d in days]
+    slices = []
+    day = datetime.combine(start.date(), datetime.min.time())
+    while day < end:
+        a, b = max(start, day), min(end, day + one_day)
+        if a < b:
+            slices.append((day.date(), with_time_window(query, kind, a, b), day.date() < today))
+        day += one_day
+    return slices
+
+
+def _split_window(kind, start, end, parts):
+    """[start, end] 를 일(date)/시간(created_at) 경계에 맞춰 최대 parts 조각으로 분할."""
+    unit = timedelta(days=1) if kind == 'date' else timedelta(hours=1)
+    units = int((end - start) / unit) + (1 if kind == 'date' else 0)
+    parts = max(1, min(parts, units))
+    bounds = [start + unit * round(units * i / parts) for i in range(parts + 1)]
+    if kind == 'date':
+        # 날짜는 끝을 포함하므로 조각 끝 = 다음 조각 시작 전날
+        return [(bounds[i], bounds[i + 1] - unit) for i in range(parts)]
+    # created_at 범위는 양끝 포함이라 경계 문서가 겹칠 수 있음 (uid_str 로 중복 제거)
+    bounds[-1] = end
+    return [(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+def _total_matches(data):
+    try:
+        return int(data['data']['pods'][1]['content']['data']['total_matches'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def plan_time_shards(api_key, query, target_pages=None, max_shards=64, concurrency=DEFAULT_CONCURRENCY):
+    """
+    DocumentSearch 쿼리를 조각당 target_pages 페이지 이하가 되도록 기간 분할.
+
+    count=1 로 total_matches 만 조사(probe)해서 필요한 조각 수를 정하고, 조각들을 다시
+    병렬로 조사해 여전히 큰 조각만 더 나눈다. 더 나눌 수 없는 조각(하루/한 시간)은 그대로 둔다.
+    반환: [(조각 쿼리, total_matches), ...] 기간 순. 기간이 없거나 조사에 실패하면
+    [(query, None)] 또는 [(query, total)] 하나.
+    """
+    return plan_time_shards_many(api_key, [query], target_pages, max_shards, concurrency)[0]
+
+
+def plan_time_shards_many(api_key, queries, target_pages=None, max_shards=64, concurrency=DEFAULT_CONCURRENCY):
+    """
+    여러 쿼리를 plan_time_shards 와 같은 규칙으로 함께 기간 분할. 쿼리 순서대로 분할 결과 리스트 반환.
+
+    단계마다 모든 쿼리의 조사(probe)를 api_call_many 한 번으로 보내므로, 쿼리 수만큼
+    조사를 차례로 기다리지 않는다. max_shards 는 쿼리마다 따로 적용한다.
+    """
+    target_pages = target_pages or DEFAULT_SHARD_TARGET_PAGES
+
+    def probe(probe_queries):
+        probes = [with_fields(set_query_param(set_query_param(q, 'count', 1), 'page', 1), ['uid_str'])
+                  for q in probe_queries]
+        return [_total_matches(d) if not isinstance(d, Exception) else None
+                for d in api_call_many(api_key, probes, concurrency=concurrency, max_retries=2)]
+
+    plans = [None] * len(queries)
+    states = []
+    for i, (query, total) in enumerate(zip(queries, probe(queries))):
+        window = find_time_window(query)
+        page_size = int(get_query_param(query, 'count') or 10)
+        if window is None or total is None or -(-total // page_size) <= target_pages:
+            plans[i] = [(query, total)]
+        else:
+            states.append({'index': i, 'query': query, 'kind': window[0], 'page_size': page_size,
+                           'pending': [(window[1], window[2], total)], 'done': []})
+
+    while any(state['pending'] for state in states):
+        round_slices = []
+        for state in states:
+            slices = []
+            for start, end, slice_total in state['pending']:
+                parts = -(-slice_total // (state['page_size'] * target_pages))
+                slices.extend(_split_window(state['kind'], start, end, min(parts, max_shards)))
+            state['pending'] = []
+            state['slice_count'] = len(slices)
+            round_slices.extend((state, a, b, with_time_window(state['query'], state['kind'], a, b))
+                                for a, b in slices)
+        totals = probe([q for _, _, _, q in round_slices])
+        for (state, start, end, q), slice_total in zip(round_slices, totals):
+            done = state['done']
+            if slice_total is None:
+                done.append((start, q, None))
+            elif (-(-slice_total // state['page_size']) > target_pages
+                    and len(done) + state['slice_count'] < max_shards
+                    and len(_split_window(state['kind'], start, end, 2)) > 1):
+                state['pending'].append((start, end, slice_total))
+            elif slice_total > 0:
+                done.append((start, q, slice_total))
+
+    for state in states:
+        state['done'].sort(key=lambda item: item[0])
+        plans[state['index']] = [(q, slice_total) for _, q, slice_total in state['done']]
+    return plans
+
+
+def _docs_of(data):
+    return data['data']['pods'][1]['content']['data'].get('docs', [])
+
+
+def _last_page(data):
+    try:
+        return int(data['data']['pods'][1]['content']['data']['last_page'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def search_all(api_key, query, target_pages=None, max_shards=64, concurrency=DEFAULT_CONCURRENCY,
+               max_retries=3):
+    """
+    DocumentSearch 전체 결과를 기간 분할 + 병렬 페이지 조회로 수집.
+
+    반환: (uid_str 중복 제거한 문서 리스트, 조각들의 total_matches 합, 조각 수, 받은 페이지 수).
+    total_matches 를 알 수 없는 조각이 있으면 합은 None.
+    조각마다 1페이지를 먼저 받아 그 total_matches(없으면 last_page)로 나머지 페이지를 받으므로
+    조사(probe)에 실패한 조각도 전부 받는다. 1페이지로도 페이지 수를 알 수 없으면 DeepSearchError.
+    페이지 하나라도 최종 실패하면 그 예외를 그대로 올린다. 받은 페이지는 체크포인트에 남으므로
+    같은 호출을 다시 하면 (1페이지 결과 수가 그대로면) 실패한 페이지부터 이어받는다.
+    """
+    shards = plan_time_shards(api_key, query, target_pages, max_shards, concurrency)
+    page_size = int(get_query_param(query, 'count') or 10)
+    checkpoint = get_checkpoint()
+    responses = {}
+
+    def fetch(tasks):
+        missing = [(q, page) for q, page in tasks if page not in responses.get(q, {})]
+        fetched = api_call_many(api_key, [set_query_param(q, 'page', page) for q, page in missing],
+                                concurrency=concurrency, max_retries=max_retries)
+        for (shard_query, page), data in zip(missing, fetched):
+            if not isinstance(data, Exception):
+                responses.setdefault(shard_query, {})[page] = data
+                if checkpoint:
+                    checkpoint.save(shard_query, page, data)
+        for data in fetched:
+            if isinstance(data, Exception):
+                raise data
+
+    # 1페이지: 조각별 전체 페이지 수 확인 (이전 실행의 저장 페이지를 이어받을 수 있는지도 여기서 확인)
+    fetch([(q, 1) for q, _ in shards])
+    tasks = []
+    totals = []
+    for shard_query, _ in shards:
+        first = responses[shard_query][1]
+        total, last_page = _total_matches(first), _last_page(first)
+        pages = -(-total // page_size) if total is not None else last_page
+        if pages is None:
+            raise DeepSearchError(f'결과 페이지 수를 알 수 없습니다: {shard_query[:200]}')
+        if checkpoint:
+            responses[shard_query].update(checkpoint.start(shard_query, total, last_page))
+        tasks.extend((shard_query, page) for page in range(1, max(pages, 1) + 1))
+        totals.append(total)
+
+    # 나머지 페이지: 체크포인트에 없는 페이지만 요청
+    fetch(tasks)
+    if checkpoint:
+        for shard_query, _ in shards:
+            checkpoint.finish(shard_query)
+    total = None if None in totals else sum(totals)
+    return merge_docs(_docs_of(responses[q][page]) for q, page in tasks), total, len(shards), len(tasks)
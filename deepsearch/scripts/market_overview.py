@@ -2,10 +2,11 @@
 """DeepSearch 일일 시황분석 (Daily Market Overview)
 
 사용법:
-    python market_overview.py <API_KEY> <DATE>
+    python market_overview.py <API_KEY> <DATE> [--concurrency N]
 
 예시:
     python market_overview.py "KEY" 2026-02-27
+    python market_overview.py "KEY" 2026-02-27 --concurrency 200
 
 출력: JSON - 7개 섹션의 종합 시황 리포트
   1. 시장 지수 (KOSPI/KOSDAQ/대형/중형/소형주)
@@ -16,51 +17,27 @@
   6. 트렌딩 토픽 (Top 10)
   7. 시장 감성 (긍정/부정/중립 비율)
 
-의존성: requests (pip install requests)
+의존성: requests (pip install requests), 같은 폴더의 deepsearch_client.py
 """
 
 import sys
 import json
 import time
-import base64
 from datetime import date, timedelta, datetime
-from urllib.parse import quote
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
-    import requests
-    requests.packages.urllib3.disable_warnings()
-except ImportError:
-    print(json.dumps({'success': False, 'error': 'requests 필요: pip install requests'}, ensure_ascii=False))
+    from deepsearch_client import api_call, api_call_many, fetch_market_caps, DEFAULT_CONCURRENCY
+except ImportError as e:
+    if e.name == 'deepsearch_client':
+        error = '같은 폴더에 deepsearch_client.py 가 필요합니다 (스킬 scripts 폴더의 사본을 이 스크립트 옆에 두세요)'
+    else:
+        error = f'{e.name} 라이브러리가 필요합니다: pip install {e.name}'
+    print(json.dumps({'success': False, 'error': error}, ensure_ascii=False))
     sys.exit(1)
 
 sys.stdout.reconfigure(encoding='utf-8')
 
-URL_BASE = 'https://api.deepsearch.com/v1/compute?input='
-
-
-def _normalize_api_key(api_key):
-    """API 키를 base64 형식으로 정규화. raw(id:secret) 형식이면 자동 인코딩."""
-    if ':' in api_key:
-        return base64.b64encode(api_key.encode()).decode()
-    return api_key
-
-
-def api_call(api_key, query, max_retries=3):
-    """API 호출 + 재시도"""
-    headers = {'Authorization': f'Basic {_normalize_api_key(api_key)}'}
-    url = f'{URL_BASE}{quote(query, safe="")}'
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=headers, verify=False, timeout=60)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                raise
-
 
 def parse_pods(data):
     """API 응답에서 result pod 추출"""
@@ -200,7 +177,7 @@ def fetch_size_analysis(api_key, date_str):
 # =====================================================================
 # Section 3: 시가총액 상위 등락
 # =====================================================================
-def fetch_top_movers(api_key, date_str):
+def fetch_top_movers(api_key, date_str, concurrency=DEFAULT_CONCURRENCY):
     """매출 5조 이상 대형주의 시총/등락률 조회"""
     # Step 1: 대형주 필터
     query = '상장 기업 and 매출 > 5000000000000'
@@ -220,31 +197,16 @@ def fetch_top_movers(api_key, date_str):
     if not companies:
         return {'success': False, 'error': '대형주 목록이 비어있습니다'}
 
-    # Step 2: 개별 종목 시총/종가 병렬 조회
+    # Step 2: 종목 시총/종가 조회 (종가 × 상장주식수 배치 → 빠진 종목만 개별 자연어 쿼리)
     parts = date_str.split('-')
     y, m, d = int(parts[0]), int(parts[1]), int(parts[2])
     target = date(y, m, d)
     start = target - timedelta(days=7)
     start_str = start.strftime('%Y-%m-%d')
 
-    results = []
-    failed = 0
-
-    def fetch_stock(item):
+    def stock_entry(item, ci):
         name, symbol = item
-        q = f'{name} 종가 시가총액 {start_str}-{date_str}'
         try:
-            d = api_call(api_key, q, max_retries=2)
-            if not d or not d.get('success'):
-                return None
-            pods = d.get('data', {}).get('pods', [])
-            if len(pods) < 2:
-                return None
-            c = pods[1].get('content', {})
-            ci = c.get('data', c)
-            if 'data' in ci and isinstance(ci['data'], dict):
-                ci = ci['data']
-
             close_vals = None
             mktcap_vals = None
             for k, v in ci.items():
@@ -275,14 +237,43 @@ def fetch_top_movers(api_key, date_str):
         except:
             return None
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(fetch_stock, c): c for c in companies}
-        for future in as_completed(futures):
-            result = future.result()
-            if result and result['market_cap'] and result['market_cap'] > 0:
-                results.append(result)
-            else:
-                failed += 1
+    def parse_stock(item, d):
+        try:
+            if not d or not d.get('success'):
+                return None
+            pods = d.get('data', {}).get('pods', [])
+            if len(pods) < 2:
+                return None
+            c = pods[1].get('content', {})
+            ci = c.get('data', c)
+            if 'data' in ci and isinstance(ci['data'], dict):
+                ci = ci['data']
+        except:
+            return None
+        return stock_entry(item, ci)
+
+    prices = fetch_market_caps(api_key, [symbol for _, symbol in companies], start_str, date_str,
+                               concurrency=concurrency)
+
+    results = []
+    missing = []
+    for item in companies:
+        result = stock_entry(item, prices[item[1]]) if item[1] in prices else None
+        if result and result['market_cap'] and result['market_cap'] > 0:
+            results.append(result)
+        else:
+            missing.append(item)
+
+    queries = [f'{name} 종가 시가총액 {start_str}-{date_str}' for name, _ in missing]
+    responses = api_call_many(api_key, queries, concurrency=concurrency, max_retries=2)
+
+    failed = 0
+    for item, d in zip(missing, responses):
+        result = None if isinstance(d, Exception) else parse_stock(item, d)
+        if result and result['market_cap'] and result['market_cap'] > 0:
+            results.append(result)
+        else:
+            failed += 1
 
     # 시총 상위 30개
     results.sort(key=lambda x: x['market_cap'], reverse=True)
@@ -338,7 +329,7 @@ def fetch_most_mentioned(api_key, date_str):
 def fetch_key_headlines(api_key, date_str):
     """해당 날짜 경제 뉴스 상위 10건"""
     date_api = date_to_api(date_str)
-    query = f'DocumentSearch(["news"],["economy"],"securities.market:(KOSPI or KOSDAQ)",count=10,page=1,date_from={date_api},date_to={date_api})'
+    query = f'DocumentSearch(["news"],["economy"],"securities.market:(KOSPI or KOSDAQ)",count=10,page=1,date_from={date_api},date_to={date_api},fields=["title","publisher","created_at","polarity","securities"])'
     data = api_call(api_key, query)
 
     # query_api.py 스타일로 파싱
@@ -457,7 +448,7 @@ def fetch_market_sentiment(api_key, date_str):
 
     counts = {}
     for polarity in ['긍정', '부정', '중립']:
-        query = f'DocumentSearch(["news"],["economy"],"{base_query} and polarity.name:{polarity}",count=1,page=1,date_from={date_api},date_to={date_api})'
+        query = f'DocumentSearch(["news"],["economy"],"{base_query} and polarity.name:{polarity}",count=1,page=1,date_from={date_api},date_to={date_api},fields=["uid_str"])'
         try:
             data = api_call(api_key, query)
             if data and data.get('success'):
@@ -510,7 +501,7 @@ def fetch_market_sentiment(api_key, date_str):
 # =====================================================================
 # 오케스트레이터
 # =====================================================================
-def build_report(api_key, date_str):
+def build_report(api_key, date_str, concurrency=DEFAULT_CONCURRENCY):
     """7개 섹션을 병렬 + 순차 실행하여 종합 리포트 생성"""
     report = {
         'success': True,
@@ -545,10 +536,10 @@ def build_report(api_key, date_str):
                 report['sections'][name] = {'success': False, 'error': str(e)[:500]}
                 print(f'[{name}] 에러: {str(e)[:100]}', file=sys.stderr)
 
-    # Phase 2: top_movers (내부에서 ThreadPoolExecutor 사용)
-    print('[top_movers] 조회 시작 (대형주 병렬 조회)...', file=sys.stderr)
+    # Phase 2: top_movers (내부에서 asyncio 엔진 사용)
+    print(f'[top_movers] 조회 시작 (대형주 최대 동시 {concurrency}개 조회)...', file=sys.stderr)
     try:
-        report['sections']['top_movers'] = fetch_top_movers(api_key, date_str)
+        report['sections']['top_movers'] = fetch_top_movers(api_key, date_str, concurrency)
         status = '성공' if report['sections']['top_movers'].get('success') else '실패'
         print(f'[top_movers] {status}', file=sys.stderr)
     except Exception as e:
@@ -583,6 +574,13 @@ def main():
     api_key = sys.argv[1]
     date_str = sys.argv[2]
 
+    # --concurrency 옵션 파싱 (기본값: DEEPSEARCH_CONCURRENCY 환경변수)
+    concurrency = DEFAULT_CONCURRENCY
+    if '--concurrency' in sys.argv:
+        idx = sys.argv.index('--concurrency')
+        if idx + 1 < len(sys.argv):
+            concurrency = int(sys.argv[idx + 1])
+
     # 날짜 형식 검증
     try:
         y, m, d = date_str.split('-')
@@ -594,7 +592,7 @@ def main():
     print(f'시황분석 생성 중: {date_str}', file=sys.stderr)
     start_time = time.time()
 
-    report = build_report(api_key, date_str)
+    report = build_report(api_key, date_str, concurrency)
 
     elapsed = round(time.time() - start_time, 1)
     print(f'완료: {report["sections_succeeded"]}/{report["sections_total"]}개 섹션 성공 ({elapsed}초)', file=sys.stderr)
@@ -2,48 +2,47 @@
 """코스닥/코스피 시가총액 상위 N개 종목의 등락률 조회
 
 사용법:
-    python market_top_movers.py <API_KEY> <market> <top_n> <date>
+    python market_top_movers.py <API_KEY> <market> <top_n> <date> [--concurrency N]
 
 예시:
     python market_top_movers.py "KEY" kosdaq 150 2025-02-27
-    python market_top_movers.py "KEY" kospi 100 2025-02-27
+    python market_top_movers.py "KEY" kospi 100 2025-02-27 --concurrency 200
+
+종가/시가총액은 배치 호출(deepsearch_client.fetch_market_caps)로 받습니다.
+GetStockPrices(columns=["close"]) 종가 × GetStockSymbols 상장주식수(shares_outstanding)로
+시가총액을 계산하며, URL 길이가 허용하는 만큼 종목을 한 쿼리에 묶습니다.
+배치 응답에 빠진 종목만 종목별 자연어 쿼리로 다시 조회합니다 (asyncio 엔진으로 동시 실행).
+동시 요청 상한 기본값: DEEPSEARCH_CONCURRENCY 환경변수 (기본 100)
+실제 동시성은 429/503 응답에 맞춰 공용 요청 제한기가 자동 조절합니다.
 
 출력: JSON (시가총액 상위 N개 중 하락률 기준 정렬)
 """
 
 import sys
 import json
-import time
-import re
-from urllib.parse import quote
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 
 try:
-    import requests
-    requests.packages.urllib3.disable_warnings()
-except ImportError:
-    print(json.dumps({'success': False, 'error': 'requests 필요: pip install requests'}, ensure_ascii=False))
+    from deepsearch_client import (api_call as _client_call, api_call_many, fetch_market_caps,
+                                   DEFAULT_CONCURRENCY)
+except ImportError as e:
+    if e.name == 'deepsearch_client':
+        error = '같은 폴더에 deepsearch_client.py 가 필요합니다 (스킬 scripts 폴더의 사본을 이 스크립트 옆에 두세요)'
+    else:
+        error = f'{e.name} 라이브러리가 필요합니다: pip install {e.name}'
+    print(json.dumps({'success': False, 'error': error}, ensure_ascii=False))
     sys.exit(1)
 
 # Windows 한글 출력
 sys.stdout.reconfigure(encoding='utf-8')
 
-URL_BASE = 'https://api.deepsearch.com/v1/compute?input='
-
 
 def api_call(api_key, query, max_retries=3):
-    headers = {'Authorization': f'Basic {api_key}'}
-    url = f'{URL_BASE}{quote(query, safe="")}'
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=headers, verify=False, timeout=60)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                return None
+    """API 호출 (공용 커넥션 풀). 최종 실패 시 None."""
+    try:
+        return _client_call(api_key, query, max_retries=max_retries)
+    except Exception:
+        return None
 
 
 def get_listed_companies(api_key, market):
@@ -68,19 +67,22 @@ def get_listed_companies(api_key, market):
     return list(zip(names, symbols))
 
 
-def get_stock_data(api_key, name, date_str):
-    """개별 종목의 종가, 시가총액, 등락률 조회"""
-    # 전일 포함 2일치 조회
+def start_date_str(date_str):
+    """조회 시작일 (주말/공휴일 대비 7일 전)"""
     parts = date_str.split('-')
     y, m, d = int(parts[0]), int(parts[1]), int(parts[2])
-    # 간단히 7일 전부터 조회 (주말/공휴일 대비)
-    from datetime import date, timedelta
     target = date(y, m, d)
     start = target - timedelta(days=7)
-    start_str = start.strftime('%Y-%m-%d')
+    return start.strftime('%Y-%m-%d')
+
 
-    query = f'{name} 종가 시가총액 {start_str}-{date_str}'
-    data = api_call(api_key, query, max_retries=2)
+def stock_data_query(name, date_str):
+    """종가/시가총액 조회 쿼리 (주말/공휴일 대비 7일 전부터)"""
+    return f'{name} 종가 시가총액 {start_date_str(date_str)}-{date_str}'
+
+
+def parse_stock_data(name, data, date_str):
+    """종가/시가총액 응답에서 등락률 계산"""
     if not data or not data.get('success'):
         return None
 
@@ -93,6 +95,11 @@ def get_stock_data(api_key, name, date_str):
     if 'data' in inner:
         inner = inner['data']
 
+    return stock_change(name, inner, date_str)
+
+
+def stock_change(name, inner, date_str):
+    """날짜순 컬럼 dict({'date': [...], '종가'/'close': [...], ...})에서 등락률 계산"""
     dates = inner.get('date', [])
     if not dates:
         return None
@@ -131,11 +138,48 @@ def get_stock_data(api_key, name, date_str):
     }
 
 
+def fetch_all_stock_data(api_key, companies, date_str, concurrency=DEFAULT_CONCURRENCY):
+    """
+    전 종목 종가/시가총액 조회. (결과 리스트, 실패 수) 반환
+
+    fetch_market_caps 배치 호출로 먼저 받고, 응답에 없거나 시가총액이 빠진 종목만
+    종목별 자연어 쿼리를 asyncio 엔진으로 동시 조회한다.
+    """
+    prices = fetch_market_caps(api_key, [symbol for _, symbol in companies],
+                               start_date_str(date_str), date_str, concurrency=concurrency)
+
+    results = []
+    missing = []
+    for name, symbol in companies:
+        result = stock_change(name, prices[symbol], date_str) if symbol in prices else None
+        if result and result['market_cap'] and result['market_cap'] > 0:
+            results.append(result)
+        else:
+            missing.append(name)
+    print(f'  → 배치 조회 {len(results)}개, 개별 조회 필요 {len(missing)}개', file=sys.stderr)
+
+    def progress(done, total):
+        if done % 100 == 0:
+            print(f'  → {done}/{total} 완료', file=sys.stderr)
+
+    queries = [stock_data_query(name, date_str) for name in missing]
+    responses = api_call_many(api_key, queries, concurrency=concurrency, max_retries=2, on_done=progress)
+
+    failed = 0
+    for name, data in zip(missing, responses):
+        result = None if isinstance(data, Exception) else parse_stock_data(name, data, date_str)
+        if result and result['market_cap'] and result['market_cap'] > 0:
+            results.append(result)
+        else:
+            failed += 1
+    return results, failed
+
+
 def main():
     if len(sys.argv) < 5:
         print(json.dumps({
             'success': False,
-            'error': 'Usage: python market_top_movers.py <API_KEY> <kosdaq|kospi> <top_n> <date>',
+            'error': 'Usage: python market_top_movers.py <API_KEY> <kosdaq|kospi> <top_n> <date> [--concurrency N]',
             'example': 'python market_top_movers.py "KEY" kosdaq 150 2025-02-27'
         }, ensure_ascii=False, indent=2))
         sys.exit(1)
@@ -145,6 +189,13 @@ def main():
     top_n = int(sys.argv[3])
     target_date = sys.argv[4]
 
+    # --concurrency 옵션 파싱
+    concurrency = DEFAULT_CONCURRENCY
+    if '--concurrency' in sys.argv:
+        idx = sys.argv.index('--concurrency')
+        if idx + 1 < len(sys.argv):
+            concurrency = int(sys.argv[idx + 1])
+
     print(f'[1/3] {market.upper()} 상장 기업 목록 조회 중...', file=sys.stderr)
     companies = get_listed_companies(api_key, market)
     if not companies:
@@ -152,26 +203,8 @@ def main():
         sys.exit(1)
     print(f'  → {len(companies)}개 기업', file=sys.stderr)
 
-    print(f'[2/3] 시가총액+종가 일괄 조회 중 (병렬 10개)...', file=sys.stderr)
-    results = []
-    failed = 0
-
-    def fetch(item):
-        name, symbol = item
-        return get_stock_data(api_key, name, target_date)
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(fetch, c): c for c in companies}
-        done = 0
-        for future in as_completed(futures):
-            done += 1
-            if done % 100 == 0:
-                print(f'  → {done}/{len(companies)} 완료', file=sys.stderr)
-            result = future.result()
-            if result and result['market_cap'] and result['market_cap'] > 0:
-                results.append(result)
-            else:
-                failed += 1
+    print(f'[2/3] 시가총액+종가 일괄 조회 중 (최대 동시 {concurrency}개)...', file=sys.stderr)
+    results, failed = fetch_all_stock_data(api_key, companies, target_date, concurrency)
 
     print(f'  → 성공: {len(results)}개, 실패: {failed}개', file=sys.stderr)
 
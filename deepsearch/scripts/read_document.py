@@ -15,7 +15,7 @@ DeepSearch 문서 본문 읽기 스크립트
     - PDF (애널리스트 보고서, IR자료, 공시) → PyMuPDF로 텍스트 추출
     - HTML (뉴스 기사) → 웹페이지 텍스트 추출
 
-의존성: requests, PyMuPDF (pip install pymupdf)
+의존성: requests, PyMuPDF (pip install pymupdf), 같은 폴더의 deepsearch_client.py
 """
 
 import sys
@@ -23,7 +23,6 @@ import json
 import os
 import tempfile
 import re
-from urllib.parse import quote
 
 
 def install_pymupdf():
@@ -38,10 +37,9 @@ def install_pymupdf():
 
 
 def download_file(url, timeout=60):
-    """URL에서 파일 다운로드"""
-    import requests
-    requests.packages.urllib3.disable_warnings()
-    resp = requests.get(url, verify=False, timeout=timeout)
+    """URL에서 파일 다운로드 (공용 커넥션 풀)"""
+    from deepsearch_client import get_session
+    resp = get_session().get(url, timeout=timeout)
     resp.raise_for_status()
     return resp.content, resp.headers.get('Content-Type', '')
 
@@ -85,16 +83,9 @@ def extract_html_text(html_bytes, url):
 
 def search_and_get_url(api_key, query, doc_index=0):
     """DocumentSearch 실행 후 특정 문서의 URL과 메타데이터 반환"""
-    import requests
-    requests.packages.urllib3.disable_warnings()
-
-    headers = {'Authorization': f'Basic {api_key}'}
-    clean_query = query.replace('\n', '').strip()
-    url = f'https://api.deepsearch.com/v1/compute?input={quote(clean_query, safe="")}'
-
-    resp = requests.get(url, headers=headers, verify=False, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
+    from deepsearch_client import api_call, with_fields
+    query = with_fields(query, ['title', 'publisher', 'created_at', 'category', 'section', 'content_url'])
+    data = api_call(api_key, query, max_retries=1)
 
     if not data.get('success', False):
         return None, "API 요청 실패"
@@ -0,0 +1,95 @@
+"""
+뉴스 일일 적재 (GitHub Actions 파이프라인 2단계)
+
+전날(KST) 경제 섹션 뉴스 전체를 DeepSearch에서 받아 PostgreSQL ds_news 테이블에 upsert 합니다.
+앱은 적재가 끝난 날짜를 API 대신 DB에서 읽으므로, 지난 날짜 검색은 인덱스 조회 한 번으로 끝납니다.
+
+사용법:
+    python newsscrap/deepsearch_news_ingest.py              # 어제 + 최근 7일 중 적재를 마치지 못한 날짜
+    python newsscrap/deepsearch_news_ingest.py 20250101 20250102   # 지정한 날짜들 (재적재/백필)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import psycopg2
+from dotenv import load_dotenv
+
+# DeepSearch 공용 클라이언트 (기간 분할 + 병렬 페이지 조회, 실패 시 체크포인트에서 이어받기)
+from deepsearch_client import KST, search_all
+from news_archive import archive_query, ensure_schema, is_complete, pending_days, upsert_news
+
+#-----------------------------------------------------------
+# 환경변수 설정
+#-----------------------------------------------------------
+load_dotenv()
+
+api_key = os.getenv("API_KEY")
+
+#접속정보-CRUD
+db_config_crud = {
+    'user': os.getenv("DB_USER_CRUD"),
+    'password': os.getenv("DB_PASSWORD_CRUD"),
+    'host': os.getenv("DB_HOST"),
+    'port': os.getenv("DB_PORT"),
+    'database': os.getenv("DB_NAME"),
+}
+
+#-----------------------------------------------------------
+# 적재 날짜 (인자가 없으면 최근 RETRY_DAYS 일 중 아직 적재를 마치지 못한 날짜, 실패한 날짜는 다음 실행에서 재시도)
+#-----------------------------------------------------------
+RETRY_DAYS = 7
+
+if len(sys.argv) > 1:
+    days = [datetime.strptime(arg, '%Y%m%d').date() for arg in sys.argv[1:]]
+    retry = False
+else:
+    yesterday = datetime.now(KST).date() - timedelta(days=1)
+    days = [yesterday - timedelta(days=i) for i in range(RETRY_DAYS - 1, -1, -1)]
+    retry = True
+
+#-----------------------------------------------------------
+# 날짜별 수집 → upsert (날짜마다 커밋하므로 중간에 실패해도 앞 날짜는 남음)
+#-----------------------------------------------------------
+connection = None
+failed = []
+try:
+    connection = psycopg2.connect(**db_config_crud)
+    print("Connected to PostgreSQL database")
+    with connection.cursor() as cursor:
+        ensure_schema(cursor)
+        if retry:
+            days = pending_days(cursor, days)
+    connection.commit()
+
+    for day in days:
+        try:
+            docs, total, shard_count, _ = search_all(api_key, archive_query(day))
+        except Exception as e:
+            print(f"❌ {day}: 뉴스 수집 실패 ({e})")
+            failed.append(day)
+            continue
+        if not is_complete(docs, total):
+            # 일부만 받은 날짜를 완료로 기록하지 않음 (다음 실행 또는 날짜 인자로 재적재)
+            print(f"❌ {day}: 문서 {len(docs)}건으로 total_matches {total}에 못 미쳐 적재하지 않음")
+            failed.append(day)
+            continue
+        with connection.cursor() as cursor:
+            count = upsert_news(cursor, day, docs)
+        connection.commit()
+        print(f"✅ {day}: {count}건 적재 (total_matches {total}, {shard_count}개 조각)")
+
+except psycopg2.Error as e:
+    print(f"Error: {e}")
+    failed = days
+
+finally:
+    if connection:
+        connection.close()
+        print("PostgreSQL connection is closed")
+
+if failed:
+    # 워크플로 실패로 표시 (실패한 날짜는 다음 실행 또는 수동 실행 시 날짜 인자로 재적재)
+    sys.exit(f"뉴스 적재 실패: {', '.join(str(day) for day in failed)}")
+print("✅ 뉴스 데이터 적재 완료!")
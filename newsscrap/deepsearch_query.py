@@ -23,18 +23,29 @@ KRX 상장사 문서검색기 (DeepSearch API 기반)
 
 import pandas as pd
 import streamlit as st
-import requests
 import os
+import io
+import hashlib
 import time
 import psycopg2
 from datetime import datetime, timedelta, timezone
-from urllib.parse import quote
 from zoneinfo import ZoneInfo
 import plotly.graph_objects as go
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
-# SSL 인증서 경고 비활성화 (DeepSearch API가 self-signed 인증서 사용 시)
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+# DeepSearch 공용 클라이언트 (keep-alive 커넥션 풀, SSL 경고 비활성화 포함)
+from deepsearch_client import (auth_headers, build_url, fetch_json, or_clause, split_or_query, merge_docs,
+                               with_fields, plan_time_shards_many, get_checkpoint, day_slices, find_time_window,
+                               CircuitOpenError, DeepSearchError)
+# 유사(중복) 기사 묶기 (MinHash + LSH)
+from news_dedup import annotate_near_duplicates
+from issue_index import IssueIndex, split_conditions
+from entity_match import CompanyIndex, EntityIndex
+from stock_search import StockSearchIndex, stock_codes
+from news_archive import ARCHIVE_SECTION, load_news
+# 완료된 하루 조각 로컬 저장소 (앱 전용)
+from document_store import get_document_store
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 # ==============================================================================
@@ -122,15 +133,28 @@ db_config_crud = config['db_config_crud']
 # - 인증 방식: Basic Authentication (API 키를 base64 인코딩하여 전송)
 # - 엔드포인트: https://api.deepsearch.com/v1/compute
 # - 요청 형식: GET 요청, input 파라미터로 쿼리 함수 전달
+# - 연결: deepsearch_client의 공용 requests.Session 재사용 (세션 간 커넥션 풀 공유)
+# - 장애 대응: 지터 지수 백오프 재시도 + 쿼리 함수별 회로 차단기 (연속 실패 시 쿨다운 동안 즉시 실패)
+# - 캐시: 응답은 deepsearch_client의 디스크 캐시에 저장되어 같은 검색 반복 시 API를 호출하지 않음
+#         (과거 날짜 쿼리는 만료 없음, 오늘 포함 쿼리는 5분)
+# - 중복 요청 합치기: Streamlit 세션들은 한 프로세스를 공유하므로, 여러 사용자가 동시에 같은
+#   검색/페이지를 요청하면 진행 중인 API 호출 하나의 결과를 함께 받음 (single-flight)
+# - 체크포인트: 받은 페이지를 로컬 체크포인트에 저장해, 실패/중단된 검색을 같은 조건으로 다시 검색하면
+#   이미 받은 페이지는 건너뛰고 남은 페이지부터 이어받음 (끝까지 받으면 삭제)
+# - 로컬 문서 저장소: 검색 기간을 하루 조각으로 나눠 지난 날짜 조각은 로컬(documents.sqlite3)에 저장하고,
+#   기간이 겹치는 다음 검색에서는 저장된 날짜를 로컬에서 읽고 빠진 날짜(보통 오늘)만 API로 요청
+# - 뉴스 아카이브: 경제 섹션 날짜 검색은 일일 파이프라인이 PostgreSQL(ds_news)에 적재한 지난 날짜를
+#   SQL 한 번으로 읽고, 적재되지 않은 날짜(보통 오늘)만 API로 요청
+# - 필드 투영: DocumentSearch는 fields=[...]로 화면/필터에 쓰는 필드만 받아 응답 크기와 세션 메모리를 줄임
+
+# 뉴스 검색 결과에서 사용하는 필드 (결과 표시, 상장사 필터, 이슈 키워드 매칭, 중복 제거)
+NEWS_FIELDS = ['uid_str', 'section', 'publisher', 'author', 'title', 'content', 'content_url',
+               'polarity', 'securities', 'entities', 'named_entities']
+# 종목 상세의 공시/IR/애널리스트 보고서 목록에서 사용하는 필드
+DETAIL_DOC_FIELDS = ['title', 'publisher', 'created_at', 'content_url']
 
 # HTTP 요청 헤더 (인증 정보 포함)
-headers = {
-    'Authorization': f'Basic {api_key}'
-}
-
-# DeepSearch API 기본 URL
-# 쿼리 함수는 input 파라미터로 URL 인코딩되어 전달됨
-url_base = 'https://api.deepsearch.com/v1/compute?input='
+headers = auth_headers(api_key)
 
 
 # ==============================================================================
@@ -162,8 +186,7 @@ def generate_url(base_query, page):
     query = base_query.replace('page = 1', f'page = {page}')
     # URL에서 줄바꿈 문자 제거 후 URL 인코딩 적용
     # (콜론, 따옴표 등 특수문자가 URL에서 올바르게 처리되도록)
-    encoded_query = quote(query.replace('\n', ''), safe='')
-    return f'{url_base}{encoded_query}'
+    return build_url(query)
 
 
 def make_request(url, headers, max_retries=5):
@@ -171,13 +194,18 @@ def make_request(url, headers, max_retries=5):
     DeepSearch API에 HTTP GET 요청을 보내고 응답을 반환합니다.
 
     [동작 설명]
-    네트워크 오류나 서버 오류 발생 시 지수 백오프로 재시도합니다.
-    최대 재시도 횟수 초과 시 예외를 발생시킵니다.
+    deepsearch_client의 공용 keep-alive 세션으로 요청하므로 페이지마다
+    TLS 연결을 새로 맺지 않습니다. 같은 쿼리의 응답이 디스크 캐시에 있으면
+    API를 호출하지 않고 캐시를 반환하며, 다른 세션이 같은 URL을 요청 중이면
+    그 응답을 함께 받습니다. 네트워크 오류나 서버 오류 발생 시
+    재시도하며, 최대 재시도 횟수 초과 시 예외를 발생시킵니다.
 
     [재시도 정책]
-    - 최대 재시도: 5회 (기본값)
-    - 재시도 간격: 5초 고정
-    - 재시도 대상: 모든 RequestException (타임아웃, 연결 오류, HTTP 오류 등)
+    - 최대 재시도: 5회 (기본값), 총 대기 시간은 최대 15초
+    - 재시도 간격: 1초부터 두 배씩 늘어나는 지터 백오프 (사용자 간 재시도 분산)
+    - 재시도 대상: 타임아웃, 연결 오류, 5xx 등 (400/403/413은 즉시 실패)
+    - 같은 쿼리 함수가 연속으로 실패하면 회로가 열려 쿨다운 동안 요청 없이 즉시 실패
+    - 실패 시 시도마다 경고를 쌓지 않고 상단 api_status 자리에 안내 메시지 하나만 표시
 
     Args:
         url (str): API 요청 URL
@@ -185,28 +213,107 @@ def make_request(url, headers, max_retries=5):
         max_retries (int): 최대 재시도 횟수 (기본값: 5)
 
     Returns:
-        requests.Response: API 응답 객체
+        dict: API 응답 JSON
 
     Raises:
-        Exception: 최대 재시도 횟수 초과 시
+        DeepSearchError: 최대 재시도 횟수 초과 또는 클라이언트 에러 시
+    """
+    try:
+        return fetch_json(url, headers, max_retries=max_retries, retry_delay=1,
+                          timeout=30, on_retry=None, max_elapsed=15)
+    except DeepSearchError as e:
+        show_api_error(e)
+        raise
+
+
+def show_api_error(error):
+    """API 실패 안내를 상단 api_status 자리에 하나만 표시합니다."""
+    if isinstance(error, CircuitOpenError):
+        api_status.warning(f"⚠️ DeepSearch API 응답이 불안정하여 요청을 잠시 중단했습니다. "
+                           f"약 {error.retry_in:.0f}초 후 다시 시도해주세요.")
+    else:
+        api_status.warning(f"⚠️ DeepSearch API 요청에 실패했습니다: {str(error)[:200]}")
+
+
+# 검색 결과 페이지 동시 요청 수 (세션당). 실제 API 부하는 공용 요청 제한기가 함께 조절
+PAGE_CONCURRENCY = int(os.getenv('DEEPSEARCH_PAGE_CONCURRENCY', '8'))
+# 검색 중 중간 결과 표/종목별 기사 수를 다시 그리는 최소 간격 (초)
+STREAM_RENDER_INTERVAL = 1.0
+
 
-    Note:
-        verify=False로 SSL 인증서 검증을 비활성화합니다.
-        이는 DeepSearch API의 인증서 문제를 우회하기 위함입니다.
+def fetch_pages(tasks, headers, on_done=None, on_page=None, saved=None):
     """
-    attempt = 0
-    last_error = None
-    while attempt < max_retries:
+    (기본 쿼리, 페이지 번호) 목록을 최대 PAGE_CONCURRENCY개씩 병렬로 요청합니다.
+
+    [동작 설명]
+    작업 스레드에서는 Streamlit 함수를 호출할 수 없으므로 fetch_json을 직접 쓰고,
+    완료 순서와 관계없이 tasks와 같은 순서로 응답을 반환합니다.
+    한 페이지라도 실패하면 남은 요청을 취소하고 그 자리에 예외 객체를 담습니다
+    (안내는 호출한 쪽에서 표시). 취소된 자리는 None입니다.
+    콜백 도중 스크립트가 중단되면(검색 중단 버튼 등으로 재실행) 대기 중인 요청도 취소합니다.
+    받은 페이지는 체크포인트(PageCheckpoint)에 저장되고, saved 로 넘긴 페이지(실패/중단된 검색을
+    다시 실행할 때 checkpoint.start()가 돌려준 페이지)는 API 호출 없이 그대로 사용합니다.
+
+    Args:
+        tasks (list): [(base_query, page), ...]
+        headers (dict): HTTP 요청 헤더
+        on_done (callable): on_done(완료 수, 전체 수). 스크립트 스레드에서 호출되므로
+                            progress_bar 갱신에 사용 가능
+        on_page (callable): on_page(tasks 인덱스, 응답 JSON). 페이지가 도착하는 즉시
+                            스크립트 스레드에서 호출되므로 중간 결과 표시에 사용 가능
+        saved (dict): {base_query: {page: 응답 JSON}} 이어받을 페이지 (없으면 모두 요청)
+
+    Returns:
+        list: tasks 순서의 응답 JSON (dict), 예외 또는 None
+    """
+    checkpoint = get_checkpoint()
+
+    def fetch(base_query, page):
         try:
-            response = requests.get(url, headers=headers, verify=False, timeout=30)
-            response.raise_for_status()  # HTTP 오류 상태 코드 확인 (4xx, 5xx)
-            return response
-        except requests.exceptions.RequestException as e:
-            last_error = e
-            attempt += 1
-            st.warning(f"API 요청 실패 (시도 {attempt}/{max_retries}): {str(e)[:200]}")
-            time.sleep(5)
-    raise Exception(f"Max retries exceeded. Last error: {last_error}")
+            response_data = fetch_json(generate_url(base_query, page), headers, max_retries=5, retry_delay=1,
+                                       timeout=30, on_retry=None, max_elapsed=15)
+        except DeepSearchError as e:
+            return e
+        if checkpoint and response_data.get('success', True) is not False:
+            checkpoint.save(base_query, page, response_data)
+        return response_data
+
+    results = [None] * len(tasks)
+    if not tasks:
+        return results
+
+    # 이전 검색이 실패/중단되며 체크포인트에 남긴 페이지는 다시 요청하지 않음
+    saved = saved or {}
+    pending = []
+    restored = 0
+    for i, (query, page) in enumerate(tasks):
+        if page in saved.get(query, {}):
+            results[i] = saved[query][page]
+            restored += 1
+            if on_page:
+                on_page(i, results[i])
+            if on_done:
+                on_done(restored, len(tasks))
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=min(len(pending), PAGE_CONCURRENCY))
+    try:
+        futures = {pool.submit(fetch, *tasks[i]): i for i in pending}
+        for done, future in enumerate(as_completed(futures), start=restored + 1):
+            results[futures[future]] = future.result()
+            if isinstance(results[futures[future]], Exception):
+                break
+            if on_page:
+                on_page(futures[future], results[futures[future]])
+            if on_done:
+                on_done(done, len(tasks))
+    finally:
+        # 실패/중단 시 아직 시작하지 않은 요청은 버리고, 진행 중인 요청은 기다리지 않음
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
 
 
 # ==============================================================================
@@ -226,19 +333,16 @@ def get_stock_prices(symbol, date_from, date_to, headers):
     Returns:
         pd.DataFrame: 주가 데이터 (date, open, high, low, close, volume)
     """
-    import urllib.parse
     # 날짜 파라미터 없이 호출하면 가장 최근 거래일 데이터 반환
     # 날짜가 있으면 해당 기간 조회
     if date_from and date_to:
         query = f'GetStockPrices([{symbol}],date_from={date_from},date_to={date_to})'
     else:
         query = f'GetStockPrices([{symbol}])'
-    encoded_query = urllib.parse.quote(query)
-    url = f"https://api.deepsearch.com/v1/compute?input={encoded_query}"
+    url = build_url(query)
 
     try:
-        response = make_request(url, headers, max_retries=3)
-        data = response.json()
+        data = make_request(url, headers, max_retries=3)
 
         if 'data' in data and 'pods' in data['data']:
             for pod in data['data']['pods']:
@@ -270,14 +374,11 @@ def get_disclosure_documents(symbol, date_from, date_to, headers, count=50):
     Returns:
         list: 공시 문서 목록
     """
-    import urllib.parse
     query = f'DocumentSearch(["company"],["disclosure"],"securities.symbol:{symbol}", count={count}, date_from={date_from}, date_to={date_to})'
-    encoded_query = urllib.parse.quote(query)
-    url = f"https://api.deepsearch.com/v1/compute?input={encoded_query}"
+    url = build_url(with_fields(query, DETAIL_DOC_FIELDS))
 
     try:
-        response = make_request(url, headers, max_retries=3)
-        data = response.json()
+        data = make_request(url, headers, max_retries=3)
 
         if 'data' in data and 'pods' in data['data']:
             for pod in data['data']['pods']:
@@ -305,14 +406,11 @@ def get_ir_documents(symbol, date_from, date_to, headers, count=50):
     Returns:
         list: IR 문서 목록
     """
-    import urllib.parse
     query = f'DocumentSearch(["company"],["ir"],"securities.symbol:{symbol}", count={count}, date_from={date_from}, date_to={date_to})'
-    encoded_query = urllib.parse.quote(query)
-    url = f"https://api.deepsearch.com/v1/compute?input={encoded_query}"
+    url = build_url(with_fields(query, DETAIL_DOC_FIELDS))
 
     try:
-        response = make_request(url, headers, max_retries=3)
-        data = response.json()
+        data = make_request(url, headers, max_retries=3)
 
         if 'data' in data and 'pods' in data['data']:
             for pod in data['data']['pods']:
@@ -340,14 +438,11 @@ def get_analyst_reports(symbol, date_from, date_to, headers, count=50):
     Returns:
         list: 애널리스트 보고서 목록
     """
-    import urllib.parse
     query = f'DocumentSearch(["research"],["company"],"securities.symbol:{symbol}", count={count}, date_from={date_from}, date_to={date_to})'
-    encoded_query = urllib.parse.quote(query)
-    url = f"https://api.deepsearch.com/v1/compute?input={encoded_query}"
+    url = build_url(with_fields(query, DETAIL_DOC_FIELDS))
 
     try:
-        response = make_request(url, headers, max_retries=3)
-        data = response.json()
+        data = make_request(url, headers, max_retries=3)
 
         if 'data' in data and 'pods' in data['data']:
             for pod in data['data']['pods']:
@@ -361,6 +456,44 @@ def get_analyst_reports(symbol, date_from, date_to, headers, count=50):
         return []
 
 
+# ==============================================================================
+# 결과 집계 함수
+# ==============================================================================
+
+# 종목별 기사 통계의 긍부정 컬럼 (DeepSearch polarity.name, 그 외 값은 '없음')
+POLARITY_LABELS = ['긍정', '중립', '부정', '없음']
+
+
+def stock_article_stats(view_df):
+    """
+    종목별 기사수와 긍부정 분포를 집계합니다.
+
+    [동작 설명]
+    identified_symbols 리스트를 한 번 explode 해 (종목, 긍부정) 긴 표를 만들고
+    crosstab 한 번으로 종목 × 긍부정 기사수를 구합니다 (행 단위 파이썬 반복 없음).
+
+    Args:
+        view_df (pd.DataFrame): identified_symbols, polarity_name 컬럼이 있는 필터 결과
+
+    Returns:
+        pd.DataFrame: 종목, 기사수, 긍정, 중립, 부정, 없음 컬럼
+                     기사수 내림차순 (같으면 먼저 나온 종목 순), 종목이 없으면 빈 DataFrame
+    """
+    polarity = view_df['polarity_name'] if 'polarity_name' in view_df.columns else pd.Series('', index=view_df.index)
+    long_df = pd.DataFrame({
+        '종목': view_df['identified_symbols'],
+        'polarity': polarity.where(polarity.isin(POLARITY_LABELS[:3]), '없음'),
+    }).explode('종목', ignore_index=True).dropna(subset=['종목'])
+    if long_df.empty:
+        return pd.DataFrame(columns=['종목', '기사수'] + POLARITY_LABELS)
+
+    counts = pd.crosstab(long_df['종목'], long_df['polarity'])
+    counts = counts.reindex(index=pd.unique(long_df['종목']), columns=POLARITY_LABELS, fill_value=0)
+    counts.insert(0, '기사수', counts.sum(axis=1))
+    counts = counts.sort_values('기사수', ascending=False, kind='stable')
+    return counts.rename_axis('종목').reset_index().rename_axis(None, axis=1)
+
+
 # ==============================================================================
 # Streamlit UI 초기 설정
 # ==============================================================================
@@ -378,6 +511,9 @@ st.markdown('<h1>KRX 상장사 뉴스 검색기 <span style="font-size: 0.5em; f
 st.caption('※본 서비스는 Deepsearch의 공식서비스가 아니며, 정재광 과장이 Deepsearch API 문서를 참고하여 제작해본 서비스 예시입니다.')
 st.markdown("### [📚 (참고링크) DeepSearch를 KRX 업무에 활용하는 방안 예시](https://beaten-by-the-market.github.io/deepsearch/api_guide.html)")
 
+# API 장애 안내 자리 (make_request 실패 시 메시지 하나만 덮어써서 표시)
+api_status = st.empty()
+
 
 # ==============================================================================
 # 데이터베이스 함수
@@ -487,13 +623,126 @@ def load_data_from_db(last_update_key):
             print("PostgreSQL connection is closed")
 
 
+@st.cache_resource
+def load_company_index(last_update_key):
+    """
+    상장사 통합 식별자 색인(CompanyIndex)을 만듭니다.
+
+    [동작 설명]
+    KRX symbol, NICE symbol, '-' 를 뺀 사업자/법인등록번호, 기업명을 모두 정수 회사 id 로 연결합니다.
+    필터 적용 시 시장/종목 선택은 회사 id 집합으로 바뀌고, 문서 매칭은 정수 비교만 합니다.
+
+    [캐시 전략]
+    st.cache_resource 로 last_update 값마다 한 번만 만들고 모든 세션이 같은 객체를 공유합니다
+    (cache_data 처럼 세션마다 복사하지 않음). 색인은 만든 뒤 읽기만 합니다.
+
+    Args:
+        last_update_key (str): 캐시 무효화 키 (load_data_from_db와 동일)
+
+    Returns:
+        CompanyIndex: 상장사 통합 식별자 색인
+    """
+    return CompanyIndex(load_data_from_db(last_update_key))
+
+
+@st.cache_resource
+def load_stock_search_index(last_update_key):
+    """
+    종목명 자동완성 색인(StockSearchIndex)을 만듭니다.
+
+    [동작 설명]
+    종목명 접두/부분 일치, 초성(ㅅㅅㅈㅈ), 종목코드 검색과 종목코드/종목명 → 종목 조회를 제공합니다.
+    종목별 필터 입력창, 관심종목 종목코드 확인, 종목 상세의 심볼 조회에 사용합니다.
+
+    [캐시 전략]
+    load_company_index와 같이 last_update 값마다 한 번만 만들고 모든 세션이 공유합니다.
+
+    Args:
+        last_update_key (str): 캐시 무효화 키 (load_data_from_db와 동일)
+
+    Returns:
+        StockSearchIndex: 종목 검색 색인
+    """
+    return StockSearchIndex(load_data_from_db(last_update_key))
+
+
+def load_archived_news(days, publishers=None):
+    """
+    뉴스 아카이브(ds_news)에서 지난 날짜의 경제 섹션 뉴스를 조회합니다.
+
+    [동작 설명]
+    GitHub Actions 일일 파이프라인(deepsearch_news_ingest.py)이 적재를 마친 날짜만
+    {날짜: [문서, ...]} 로 반환합니다. 적재되지 않은 날짜와 DB 오류는 API 검색으로 대신합니다.
+    결과는 검색 조건(날짜, 언론사)마다 달라 캐싱하지 않습니다 (인덱스 조회 한 번).
+
+    Args:
+        days (iterable[date]): 조회할 날짜들
+        publishers (list or None): 언론사 목록 (None이면 전체 언론사)
+
+    Returns:
+        dict: {date: [문서 dict, ...]}, DB 조회 실패 시 빈 dict
+    """
+    connection = None
+    try:
+        connection = psycopg2.connect(**db_config)
+        return load_news(connection, days, publishers)
+    except psycopg2.Error as e:
+        print(f"News archive unavailable: {e}")
+        return {}
+    finally:
+        if connection:
+            connection.close()
+
+
+@st.cache_data(max_entries=32)
+def read_watchlist_codes(content_hash, _content):
+    """
+    관심종목 엑셀 파일에서 6자리 종목코드 목록을 읽습니다.
+
+    [동작 설명]
+    '종목' / 'code' / '코드' 가 들어간 첫 컬럼(없으면 첫 번째 컬럼)을 종목코드로 보고,
+    소수점 제거(5930.0 → 5930)와 6자리 zero-fill 을 컬럼 단위 문자열 연산으로 한 번에 처리합니다.
+
+    [캐시 전략]
+    업로드 파일 내용의 SHA-256 해시(content_hash)로 캐싱하므로, 같은 파일이면 재실행마다
+    엑셀을 다시 읽지 않습니다. 파일 내용(_content)은 '_' 접두로 캐시 키 해싱에서 제외됩니다.
+
+    Args:
+        content_hash (str): 파일 내용의 SHA-256 hex
+        _content (bytes): 업로드 파일 내용
+
+    Returns:
+        list or None: 파일 순서의 6자리 종목코드 목록, 종목코드 컬럼이 없으면 None
+    """
+    watchlist_df = pd.read_excel(io.BytesIO(_content))
+
+    # 종목코드 컬럼 찾기 (없으면 첫 번째 컬럼 사용)
+    code_col = next((col for col in watchlist_df.columns
+                     if '종목' in str(col) or 'code' in str(col).lower() or '코드' in str(col)), None)
+    if code_col is None and len(watchlist_df.columns) > 0:
+        code_col = watchlist_df.columns[0]
+    if code_col is None:
+        return None
+    return stock_codes(watchlist_df[code_col].dropna()).tolist()
+
+
+@st.cache_data
+def watchlist_template():
+    """관심종목 업로드 서식 엑셀 파일 내용 (한 번만 만듦)."""
+    buffer = io.BytesIO()
+    pd.DataFrame({'종목코드': ['005930', '000660', '035720']}).to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
 # 마지막 업데이트 시간 표시
 last_update = get_last_update_time()
 if last_update:
     st.caption(f"📅 상장종목 정보 업데이트: {last_update} (매일 오전 7시 자동 갱신)")
 
-# 상장사 데이터 로드 (캐싱됨 - last_update 값이 바뀌면 자동 갱신)
-search_list_df_original = load_data_from_db(last_update)
+# 상장사 데이터 색인 로드 (캐싱됨 - last_update 값이 바뀌면 자동 갱신, 세션 간 공유)
+# company_index: 필터용 통합 식별자 색인 / stock_search_index: 종목 검색·종목코드 조회 색인
+company_index = load_company_index(last_update)
+stock_search_index = load_stock_search_index(last_update)
 
 
 # ==============================================================================
@@ -693,10 +942,10 @@ with st.expander("🔍 검색 조건", expanded=True):
         st.session_state.selected_publishers = selected_publishers
 
         # 선택된 언론사를 API 쿼리 형식으로 변환
-        # 형식: publisher.raw :('언론사1' or '언론사2' or ...)
+        # 형식: publisher.raw:('언론사1' or '언론사2' or ...)
+        # (URL 길이를 넘으면 검색 시 언론사 목록을 나눠 여러 하위 쿼리로 실행)
         if selected_publishers:
-            news_comp_query = " or ".join([f"'{publisher}'" for publisher in selected_publishers])
-            news_comp_query = f"publisher.raw :({news_comp_query})"
+            news_comp_query = or_clause('publisher.raw', selected_publishers)
         else:
             news_comp_query = ''
 
@@ -781,8 +1030,8 @@ with st.expander("🔍 검색 조건", expanded=True):
 # ==============================================================================
 # [검색 실행 로직]
 # 1. 사용자가 설정한 조건들을 조합하여 DocumentSearch 쿼리 생성
-# 2. API 호출하여 첫 페이지 결과 획득
-# 3. 전체 페이지 수 확인 후 나머지 페이지 순차 요청
+# 2. 기간을 하루 조각으로 나눠 로컬 저장소/뉴스 DB에 있는 지난 날짜는 재사용하고, 나머지 조각의 첫 페이지 요청
+# 3. 전체 페이지 수 확인 후 나머지 페이지 병렬 요청 (도착하는 대로 표/종목별 기사 수 표시, 중단 가능)
 # 4. 결과를 DataFrame으로 병합하여 session_state에 저장
 #
 # [DocumentSearch 쿼리 구조]
@@ -842,85 +1091,236 @@ if search_clicked:
     # query_parts: 카테고리, 섹션 등 쉼표로 구분되는 파라미터
     # query_parts_and: 검색어 부분 (and로 연결)
     # query_parts_comma: date_from, date_to 등 쉼표로 구분되는 파라미터
-    query_parts = ['["news"]']  # 뉴스 카테고리 고정
-    query_parts_and = []
-    query_parts_comma = []
-
-    # 뉴스 섹션 조건 추가 ([] 빈 배열도 포함 - API 필수 파라미터)
-    if domestic_news_query:
-        query_parts.append(domestic_news_query)
+    def build_query(publisher_clause):
+        """언론사 조건을 받아 완성된 DocumentSearch 쿼리(page = 1)를 생성"""
+        query_parts = ['["news"]']  # 뉴스 카테고리 고정
+        query_parts_and = []
+        query_parts_comma = []
+
+        # 뉴스 섹션 조건 추가 ([] 빈 배열도 포함 - API 필수 파라미터)
+        if domestic_news_query:
+            query_parts.append(domestic_news_query)
+
+        # 언론사 조건 추가
+        if publisher_clause:
+            query_parts_and.append(publisher_clause)
+
+        # 날짜 조건 추가
+        if date_query:
+            query_parts_comma.append(date_query)
+
+        # 날짜+시간 조건 추가
+        if datetime_query:
+            query_parts_and.append(datetime_query)
+
+        # None 값 및 빈 문자열 제거
+        query_parts = [part for part in query_parts if part and part != 'None']
+        query_parts_and = [part for part in query_parts_and if part and part != 'None']
+        query_parts_comma = [part for part in query_parts_comma if part and part != 'None']
+
+        # 최종 쿼리 조합
+        intro = 'DocumentSearch('
+        outro = ', count = 100, page = 1)'
+        final_query_category = ' , '.join(query_parts)
+        final_query_condition = ' and '.join(query_parts_and)
+        final_query_comma = ' , '.join(query_parts_comma)
+
+        # 완성된 DocumentSearch 쿼리
+        # 검색어가 없으면 * (와일드카드)를 기본값으로 사용 (API 필수 파라미터)
+        search_term = final_query_condition if final_query_condition else '*'
+        return with_fields(
+            intro +
+            final_query_category +
+            ' , "' + search_term + '"' +
+            ((' , ' if final_query_comma else '') + final_query_comma) +
+            outro,
+            NEWS_FIELDS,
+        )
 
-    # 언론사 조건 추가
+    # 언론사 OR 조건이 길어 URL 한도(413)를 넘으면 언론사 목록을 나눠 여러 하위 쿼리로 검색
     if news_comp_query:
-        query_parts_and.append(news_comp_query)
-
-    # 날짜 조건 추가
-    if date_query:
-        query_parts_comma.append(date_query)
-
-    # 날짜+시간 조건 추가
-    if datetime_query:
-        query_parts_and.append(datetime_query)
-
-    # None 값 및 빈 문자열 제거
-    query_parts = [part for part in query_parts if part and part != 'None']
-    query_parts_and = [part for part in query_parts_and if part and part != 'None']
-    query_parts_comma = [part for part in query_parts_comma if part and part != 'None']
-
-    # 최종 쿼리 조합
-    intro = 'DocumentSearch('
-    outro = ', count = 100, page = 1)'
-    final_query_category = ' , '.join(query_parts)
-    final_query_condition = ' and '.join(query_parts_and)
-    final_query_comma = ' , '.join(query_parts_comma)
-
-    # 완성된 DocumentSearch 쿼리
-    # 검색어가 없으면 * (와일드카드)를 기본값으로 사용 (API 필수 파라미터)
-    search_term = final_query_condition if final_query_condition else '*'
-    final_query_all = (
-        intro +
-        final_query_category +
-        ' , "' + search_term + '"' +
-        ((' , ' if final_query_comma else '') + final_query_comma) +
-        outro
-    )
-
-    # 페이지네이션 처리
-    current_page = 1
-    url = generate_url(final_query_all, current_page)
-
-    # 첫 페이지 요청
-    response = make_request(url, headers)
-    response_data = response.json()
-
-    # API 응답에서 문서 데이터 추출
-    # 응답 구조: data.pods[1].content.data.docs
-    docs = response_data['data']['pods'][1]['content']['data']['docs']
-    df_list = [pd.json_normalize(docs)]
+        base_queries = split_or_query(build_query, 'publisher.raw', selected_publishers)
+    else:
+        base_queries = [build_query('')]
 
-    # 전체 페이지 수 확인
-    last_page = response_data['data']['pods'][1]['content']['data']['last_page']
+    def stop_on_error(responses):
+        """실패한 페이지가 있으면 안내 하나만 표시하고 중단"""
+        for response_data in responses:
+            if isinstance(response_data, Exception):
+                show_api_error(response_data)
+                st.stop()
 
-    # 진행률 표시
-    st.caption('📡 DeepSearch API 호출중입니다. (하루 기준 약 1분 소요)')
+    # 로컬 문서 저장소: 기간을 하루 조각으로 나눠, 이전 검색에서 받아 둔 지난 날짜 조각은 로컬에서 읽고
+    # 빠진 조각(보통 오늘)만 API로 요청. slice_plan은 결과 순서대로 (조각 쿼리, 날짜, 완료 여부)
+    # 뉴스 아카이브: 경제 섹션 날짜 검색이면 일일 파이프라인이 DB에 적재한 지난 날짜를 SQL 한 번으로 읽음
+    doc_store = get_document_store()
+    use_archive = use_date and domestic_news_query == ARCHIVE_SECTION
+    stored_docs = {}
+    archived_slices = 0
+    if doc_store or use_archive:
+        slice_plan = []
+        for base_query in base_queries:
+            slices = day_slices(base_query)
+            if not slices:
+                slice_plan.append((base_query, None, False))
+            slice_plan.extend((slice_query, day, complete) for day, slice_query, complete in slices)
+        for slice_query, day, complete in slice_plan:
+            docs = doc_store.load(slice_query) if doc_store and complete else None
+            if docs is not None:
+                stored_docs[slice_query] = docs
+        if use_archive:
+            pending = [(slice_query, day) for slice_query, day, complete in slice_plan
+                       if complete and slice_query not in stored_docs]
+            archived = load_archived_news({day for _, day in pending}, selected_publishers or None) if pending else {}
+            served_days = set()
+            for slice_query, day in pending:
+                if day in archived:
+                    # 언론사 목록이 여러 하위 쿼리로 나뉘었으면 같은 날짜 결과는 첫 조각에만 담음 (병합 결과는 같음)
+                    stored_docs[slice_query] = archived[day] if day not in served_days else []
+                    served_days.add(day)
+                    archived_slices += 1
+    else:
+        slice_plan = [(base_query, None, False) for base_query in base_queries]
+
+    def splittable(slice_query):
+        """하루짜리 날짜 조각은 더 나눌 수 없음"""
+        window = find_time_window(slice_query)
+        return not (window and window[0] == 'date' and window[1] == window[2])
+
+    # 받아야 할 조각만 count=1 조사로 조각당 페이지 수를 맞춰 병렬 수집 (깊은 페이지네이션 회피)
+    # 여러 조각의 조사는 plan_time_shards_many 가 단계마다 한 번에 묶어 보냄
+    fetch_slices = [slice_query for slice_query, _, _ in slice_plan if slice_query not in stored_docs]
+    to_plan = [slice_query for slice_query in fetch_slices if splittable(slice_query)]
+    shard_plans = dict(zip(to_plan, plan_time_shards_many(api_key, to_plan))) if to_plan else {}
+    shard_plan = [
+        (shard_query, slice_query)
+        for slice_query in fetch_slices
+        for shard_query in ([q for q, _ in shard_plans.get(slice_query, [])] or [slice_query])
+    ]
+    base_queries = [shard_query for shard_query, _ in shard_plan]
+
+    # 진행률/중간 결과 표시 자리
+    # 페이지가 도착할 때마다 표와 종목별 기사 수를 갱신하고, session_state.df도 중간 결과로 채움.
+    # 검색 중단 버튼을 누르면 Streamlit이 스크립트를 재실행하면서 남은 페이지 요청이 취소되고,
+    # 재실행된 화면에서는 지금까지 받은 결과로 바로 필터를 사용할 수 있음
+    # 이전 검색 결과는 지워 둠 (첫 중간 결과 전에 멈추면 이전 결과를 이번 검색의 일부로 보이지 않도록)
+    st.session_state.pop('df', None)
+    st.session_state.search_interrupted = True
+    progress_caption = st.empty()
+    progress_caption.caption('📡 DeepSearch API 호출중입니다. (첫 페이지 확인중)')
     progress_bar = st.progress(0)
+    cancel_slot = st.empty()
+    cancel_slot.button('⏹ 검색 중단', key='cancel_search', help='남은 페이지 요청을 멈추고 지금까지 받은 결과만 사용합니다.')
+    live_summary = st.empty()
+    col_live_table, col_live_stocks = st.columns([3, 1])
+    with col_live_table:
+        live_table = st.empty()
+    with col_live_stocks:
+        live_stocks = st.empty()
+
+    seen_uids = set()
+    live_frames = []
+    stock_counts = Counter()
+    last_render = [0.0]
+
+    def stream_page(response_data):
+        stream_docs(response_data['data']['pods'][1]['content']['data']['docs'])
+
+    def stream_docs(docs):
+        """도착한 문서 중 새 문서를 중간 결과에 추가 (하위 쿼리 간 중복은 uid_str 기준 제외)"""
+        new_docs = []
+        for doc in docs:
+            if doc.get('uid_str') is not None:
+                if doc['uid_str'] in seen_uids:
+                    continue
+                seen_uids.add(doc['uid_str'])
+            new_docs.append(doc)
+        if not new_docs:
+            return
+        live_frames.append(pd.json_normalize(new_docs))
+        for doc in new_docs:
+            # DeepSearch가 식별한 관련종목 기준 (상장사 필터 적용 전)
+            stock_counts.update({entry.get('name') or entry.get('symbol') for entry in doc.get('securities') or []} - {None})
+        render_live()
+
+    def render_live(force=False):
+        """중간 결과 표시 (페이지마다 다시 그리지 않도록 STREAM_RENDER_INTERVAL 간격으로 제한)"""
+        now = time.monotonic()
+        if not live_frames or (not force and now - last_render[0] < STREAM_RENDER_INTERVAL):
+            return
+        last_render[0] = now
+        df_live = pd.concat(live_frames, ignore_index=True)
+        st.session_state.df = df_live
+        live_summary.caption(f'지금까지 {len(df_live)}건 수신')
+        live_table.dataframe(
+            df_live[[col for col in ['publisher', 'title', 'content_url'] if col in df_live.columns]],
+            use_container_width=True, hide_index=True, height=300,
+            column_config={'content_url': st.column_config.LinkColumn('링크')},
+        )
+        live_stocks.dataframe(
+            pd.DataFrame(stock_counts.most_common(20), columns=['종목', '기사 수']),
+            use_container_width=True, hide_index=True, height=300,
+        )
 
-    # 나머지 페이지 순차 요청
-    while current_page < last_page:
-        current_page += 1
-        url = generate_url(final_query_all, current_page)
-        response = make_request(url, headers)
-        response_data = response.json()
-
-        docs = response_data['data']['pods'][1]['content']['data']['docs']
-        df_list.append(pd.json_normalize(docs))
-
-        # 진행률 업데이트
-        progress = int(current_page / last_page * 100)
-        progress_bar.progress(progress)
+    # 로컬 저장소에서 읽은 조각은 바로 표시
+    for docs in stored_docs.values():
+        stream_docs(docs)
+    if stored_docs:
+        sources = [f'뉴스 DB {archived_slices}개'] if archived_slices else []
+        if len(stored_docs) > archived_slices:
+            sources.append(f'로컬 저장소 {len(stored_docs) - archived_slices}개')
+        st.caption(f'💾 {", ".join(sources)} 날짜 조각을 재사용했습니다. (API 요청 {len(shard_plan)}개 조각)')
+
+    # 하위 쿼리별 첫 페이지 병렬 요청 (last_page 확인용, 도착하는 대로 표시)
+    first_pages = fetch_pages([(base_query, 1) for base_query in base_queries], headers,
+                              on_page=lambda i, response_data: stream_page(response_data))
+    stop_on_error(first_pages)
+
+    # API 응답에서 문서 데이터와 전체 페이지 수 추출
+    # 응답 구조: data.pods[1].content.data.docs / last_page
+    # 체크포인트: 1페이지의 결과 수가 저장 당시와 같으면 이전에 실패/중단된 검색의 나머지 페이지를 이어받음
+    checkpoint = get_checkpoint()
+    remaining = []
+    saved_pages = {}
+    for base_query, response_data in zip(base_queries, first_pages):
+        result = response_data['data']['pods'][1]['content']['data']
+        remaining.extend((base_query, page) for page in range(2, result['last_page'] + 1))
+        if checkpoint:
+            saved_pages[base_query] = checkpoint.start(base_query, result.get('total_matches'), result['last_page'])
+    total_pages = max(len(base_queries) + len(remaining), 1)
 
-    # 전체 결과 병합
-    df = pd.concat(df_list, ignore_index=True)
+    # 진행률 표시
+    progress_caption.caption(f'📡 DeepSearch API 호출중입니다. ({total_pages}페이지, 최대 {PAGE_CONCURRENCY}개 동시 요청)')
+    progress_bar.progress(int(len(base_queries) / total_pages * 100))
+
+    # 나머지 페이지 병렬 요청 (완료될 때마다 진행률/중간 결과 업데이트)
+    def update_progress(done, total):
+        progress_bar.progress(int((len(base_queries) + done) / total_pages * 100))
+
+    rest_pages = fetch_pages(remaining, headers, on_done=update_progress,
+                             on_page=lambda i, response_data: stream_page(response_data), saved=saved_pages)
+    stop_on_error(rest_pages)
+    render_live(force=True)
+    cancel_slot.empty()
+
+    # 페이지 순서대로 재조립 (하위 쿼리별 1페이지 → 나머지 페이지), 분할 조각은 원래 날짜 조각으로 모음
+    pages_by_query = {base_query: [response_data] for base_query, response_data in zip(base_queries, first_pages)}
+    for (base_query, page), response_data in zip(remaining, rest_pages):
+        pages_by_query[base_query].append(response_data)
+    docs_by_slice = dict(stored_docs)
+    for shard_query, slice_query in shard_plan:
+        for response_data in pages_by_query[shard_query]:
+            docs_by_slice.setdefault(slice_query, []).extend(response_data['data']['pods'][1]['content']['data']['docs'])
+    doc_lists = [docs_by_slice.get(slice_query, []) for slice_query, _, _ in slice_plan]
+
+    # 새로 받은 지난 날짜 조각은 완료된 조각으로 로컬 저장소에 저장 (다음 검색에서 재사용)
+    if doc_store:
+        for slice_query, day, complete in slice_plan:
+            if complete and slice_query not in stored_docs:
+                doc_store.save(slice_query, day, merge_docs([docs_by_slice.get(slice_query, [])]))
+
+    # 전체 결과 병합 (하위 쿼리 간 중복 문서는 uid_str 기준 제거)
+    df = pd.json_normalize(merge_docs(doc_lists))
 
     # 중복 컬럼 제거
     df_show = df.loc[:, ~df.columns.duplicated()]
@@ -935,6 +1335,20 @@ if search_clicked:
 
     # 결과를 session_state에 저장 (필터링에서 사용)
     st.session_state.df = df
+    st.session_state.search_interrupted = False
+
+    # 끝까지 받은 검색의 체크포인트 정리 (실패/중단된 검색은 남겨서 다시 검색할 때 이어받음)
+    if checkpoint:
+        for base_query in base_queries:
+            checkpoint.finish(base_query)
+
+elif st.session_state.get('search_interrupted'):
+    # 직전 검색이 끝나기 전에 멈춤 (검색 중단 버튼, 다른 위젯 조작 또는 API 오류)
+    st.session_state.search_interrupted = False
+    if 'df' in st.session_state:
+        st.info(f"검색이 끝나기 전에 중단되어 지금까지 받은 {len(st.session_state.df)}건으로 결과를 표시합니다.")
+    else:
+        st.info("검색이 끝나기 전에 중단되어 받은 결과가 없습니다. 다시 검색해주세요.")
 
 
 # ==============================================================================
@@ -1003,15 +1417,14 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                 stock_search_input = st.text_input(
                     '종목명 입력',
                     key='stock_search_input',
-                    placeholder='예: 삼성전자'
+                    placeholder='예: 삼성전자, ㅅㅅㅈㅈ, 005930'
                 )
-                st.caption('→ 종목명을 입력하면 오른쪽에서 종목코드 확인 후 선택')
+                st.caption('→ 종목명/초성/종목코드를 입력하면 오른쪽에서 종목코드 확인 후 선택')
 
             with col_stock_select:
                 if stock_search_input:
-                    filtered_stocks = search_list_df_original[
-                        search_list_df_original['entity_name'].str.contains(stock_search_input, case=False, na=False)
-                    ][['symbol', 'entity_name', 'mkt']].head(10)
+                    # 종목명(부분 일치), 초성(ㅅㅅㅈㅈ), 종목코드로 검색해 순위 상위 10개
+                    filtered_stocks = stock_search_index.search(stock_search_input, limit=10)
 
                     if not filtered_stocks.empty:
                         stock_options = [f"{row['entity_name']} ({row['symbol']}, {row['mkt']})"
@@ -1051,19 +1464,13 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
         else:  # 내 관심종목
             selected_market_codes = list(MARKET_OPTIONS.values())  # 전체 시장에서 검색
 
-            # 업로드 서식 다운로드 버튼
-            import io
-            template_df = pd.DataFrame({'종목코드': ['005930', '000660', '035720']})
-            buffer = io.BytesIO()
-            template_df.to_excel(buffer, index=False, engine='openpyxl')
-            buffer.seek(0)
-
+            # 업로드 서식 다운로드 버튼 (서식 파일은 캐싱됨)
             col_download, col_upload = st.columns([1, 2])
 
             with col_download:
                 st.download_button(
                     label='📥 업로드 서식 다운로드',
-                    data=buffer,
+                    data=watchlist_template(),
                     file_name='관심종목_서식.xlsx',
                     mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                 )
@@ -1083,36 +1490,23 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
             # 업로드된 파일 처리
             if uploaded_file is not None:
                 try:
-                    watchlist_df = pd.read_excel(uploaded_file)
+                    # 파일 내용 해시로 캐싱된 종목코드 목록 (같은 파일이면 재실행 시 엑셀을 다시 읽지 않음)
+                    content = uploaded_file.getvalue()
+                    watchlist_codes = read_watchlist_codes(hashlib.sha256(content).hexdigest(), content)
 
-                    # 종목코드 컬럼 찾기
-                    code_col = None
-                    for col in watchlist_df.columns:
-                        if '종목' in col or 'code' in col.lower() or '코드' in col:
-                            code_col = col
-                            break
+                    if watchlist_codes is not None:
+                        codes = pd.Series(watchlist_codes, dtype='object')
 
-                    if code_col is None and len(watchlist_df.columns) > 0:
-                        code_col = watchlist_df.columns[0]  # 첫 번째 컬럼 사용
-
-                    if code_col:
-                        # 종목코드 추출 및 6자리로 변환 (앞에 0 채우기)
-                        codes = watchlist_df[code_col].dropna().astype(str)
-                        codes = codes.apply(lambda x: x.split('.')[0])  # 소수점 제거
-                        codes = codes.apply(lambda x: x.zfill(6))  # 6자리로 zero-fill
-
-                        # DB symbol 형식 처리 (KRX:000000 또는 000000 형식 모두 지원)
-                        # symbol에서 순수 코드만 추출하여 비교
-                        db_symbols = search_list_df_original['symbol'].dropna()
-                        db_codes_only = db_symbols.apply(lambda x: x.split(':')[-1] if ':' in str(x) else str(x))
-
-                        # 유효한 종목코드만 필터링 (DB에 있는 것만)
-                        valid_codes = codes[codes.isin(db_codes_only.values)]
+                        # 종목 검색 색인으로 종목코드 → 회사 id 조회 (KRX:000000 또는 000000 형식 모두 지원, 없으면 -1)
+                        watchlist_ids = stock_search_index.ids_of_codes(codes)
+                        valid_codes = codes[watchlist_ids >= 0]
 
                         if not valid_codes.empty:
-                            # 종목코드로 종목명 찾기 (DB symbol 형식에 맞춰서)
-                            matching_mask = db_codes_only.isin(valid_codes.values)
-                            watchlist_stocks = search_list_df_original[matching_mask.values]['entity_name'].tolist()
+                            # 업로드 순서대로, 중복 종목은 한 번만
+                            loaded_df = stock_search_index.companies.iloc[
+                                pd.unique(watchlist_ids[watchlist_ids >= 0])
+                            ][['symbol', 'entity_name', 'mkt']].copy()
+                            watchlist_stocks = loaded_df['entity_name'].tolist()
 
                             st.session_state.selected_stocks = watchlist_stocks
 
@@ -1120,12 +1514,11 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
 
                             # 로드된 종목 표시
                             with st.expander(f'로드된 종목 목록 ({len(watchlist_stocks)}개)', expanded=False):
-                                loaded_df = search_list_df_original[matching_mask.values][['symbol', 'entity_name', 'mkt']].copy()
                                 loaded_df.columns = ['종목코드', '종목명', '시장']
                                 st.dataframe(loaded_df, use_container_width=True, hide_index=True)
 
                             # 유효하지 않은 코드 표시
-                            invalid_codes = codes[~codes.isin(db_codes_only.values)]
+                            invalid_codes = codes[watchlist_ids < 0]
                             if not invalid_codes.empty:
                                 st.warning(f'⚠️ {len(invalid_codes)}개 종목코드가 인식되지 않았습니다: {", ".join(invalid_codes.head(10).tolist())}')
                         else:
@@ -1159,8 +1552,7 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
         if 'last_selected_issue' not in st.session_state or st.session_state.last_selected_issue != selected_issue:
             issue_query = ISSUE_CATEGORIES.get(selected_issue, None)
             if issue_query:
-                st.session_state.issue_keywords = issue_query.split(' or ')
-                st.session_state.issue_keywords = [kw.strip() for kw in st.session_state.issue_keywords]
+                st.session_state.issue_keywords = split_conditions(issue_query)
             else:
                 st.session_state.issue_keywords = []
             st.session_state.last_selected_issue = selected_issue
@@ -1212,174 +1604,50 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
     # 필터 실행
     # ==========================================================================
     if filter_clicked:
-        # 필터 유형에 따라 상장사 목록 필터링
+        # 필터 유형에 따라 상장사 선택 (회사 id 집합)
         if filter_type == '시장별 필터':
             if not selected_market_codes:
                 st.error("시장을 하나 이상 선택해주세요.")
                 st.stop()
-            search_list_df = search_list_df_original[
-                search_list_df_original['mkt'].isin(selected_market_codes)
-            ]
+            company_ids = company_index.ids_in_markets(selected_market_codes)
         elif filter_type == '종목별 필터':
             if 'selected_stocks' not in st.session_state or not st.session_state.selected_stocks:
                 st.error("종목을 하나 이상 선택해주세요.")
                 st.stop()
-            search_list_df = search_list_df_original[
-                search_list_df_original['entity_name'].isin(st.session_state.selected_stocks)
-            ]
+            company_ids = company_index.ids_of_names(st.session_state.selected_stocks)
         else:  # 내 관심종목
             if 'selected_stocks' not in st.session_state or not st.session_state.selected_stocks:
                 st.error("관심종목 엑셀 파일을 업로드해주세요.")
                 st.stop()
-            search_list_df = search_list_df_original[
-                search_list_df_original['entity_name'].isin(st.session_state.selected_stocks)
-            ]
+            company_ids = company_index.ids_of_names(st.session_state.selected_stocks)
 
-        if search_list_df.empty:
+        if len(company_ids) == 0:
             st.write("선택한 조건에 맞는 상장사가 없습니다.")
         else:
-                # 조회용 Set 생성 (O(1) in 연산을 위해)
-                symbol_set = set(search_list_df['symbol'].dropna())
-                symbol_nice_set = set(search_list_df['symbol_nice'].dropna())
-                entity_name_set = set(search_list_df['entity_name'].dropna())
-                business_rid_set = set(search_list_df['business_rid'].dropna())
-                company_rid_set = set(search_list_df['company_rid'].dropna())
-
-                # 식별자 -> 기업명 매핑 Dict 생성
-                symbol_to_name = dict(zip(search_list_df['symbol'].dropna(),
-                                          search_list_df.loc[search_list_df['symbol'].notna(), 'entity_name']))
-                symbol_nice_to_name = dict(zip(search_list_df['symbol_nice'].dropna(),
-                                               search_list_df.loc[search_list_df['symbol_nice'].notna(), 'entity_name']))
-                business_rid_to_name = dict(zip(search_list_df['business_rid'].dropna(),
-                                                search_list_df.loc[search_list_df['business_rid'].notna(), 'entity_name']))
-                company_rid_to_name = dict(zip(search_list_df['company_rid'].dropna(),
-                                               search_list_df.loc[search_list_df['company_rid'].notna(), 'entity_name']))
-
-                def filter_df(row):
-                    """각 문서 행에서 KRX 상장사 언급 여부를 확인 (관련종목 + 언급종목 합집합)"""
-                    identified_list = []
-                    matched = False
-
-                    # securities, entities, named_entities 필드 모두 검사 (합집합)
-                    for col in ['securities', 'entities', 'named_entities']:
-                        if col not in row or row[col] is None:
-                            continue
-
-                        for entry in row[col]:
-                            identified = None
-
-                            if 'symbol' in entry:
-                                symbol = entry['symbol']
-                                if symbol in symbol_set:
-                                    matched = True
-                                    identified = symbol_to_name.get(symbol)
-                                elif symbol in symbol_nice_set:
-                                    matched = True
-                                    identified = symbol_nice_to_name.get(symbol)
-
-                            elif 'name' in entry:
-                                name = entry['name']
-                                if name in entity_name_set:
-                                    matched = True
-                                    identified = name
-
-                            elif 'business_rid' in entry:
-                                brid = entry['business_rid'].replace('-', '')
-                                if brid in business_rid_set:
-                                    matched = True
-                                    identified = business_rid_to_name.get(brid)
-
-                            elif 'company_rid' in entry:
-                                crid = entry['company_rid'].replace('-', '')
-                                if crid in company_rid_set:
-                                    matched = True
-                                    identified = company_rid_to_name.get(crid)
-
-                            if identified:
-                                identified_list.append(identified)
-
-                    identified_list = list(set(filter(None, identified_list)))
-                    return pd.Series([matched, identified_list])
-
-                # 전체 DataFrame에 필터 함수 적용
-                filtered_df = df.apply(filter_df, axis=1)
-                filtered_df.columns = ['matched', 'identified_symbols']
+                # 상장사 언급 매칭 (검색 결과마다 한 번 펼친 식별자 표를 회사 id 로 바꿔 선택한 회사와 비교)
+                entity_index = st.session_state.get('entity_index')
+                if entity_index is None or entity_index.source is not df:
+                    entity_index = EntityIndex(df)
+                    st.session_state.entity_index = entity_index
+                filtered_df = entity_index.match(company_index, company_ids)
 
                 # 매칭된 행만 추출
                 filtered_df2 = df[filtered_df['matched']].copy()
                 filtered_df2['identified_symbols'] = filtered_df['identified_symbols']
 
-                # 이슈 카테고리 필터링
-                def check_issue_category(row, issue_query):
-                    """문서가 선택된 이슈 카테고리에 해당하는지 확인"""
-                    if issue_query is None:
-                        return True
-
-                    text_fields = ['title', 'content', 'description', 'body', 'summary', 'text']
-                    text_parts = []
-                    for field in text_fields:
-                        if field in row and row[field] is not None:
-                            text_parts.append(str(row[field]))
-                    text = ' '.join(text_parts).lower()
-
-                    conditions = issue_query.split(' or ')
-                    for condition in conditions:
-                        condition = condition.strip()
-                        if condition.startswith('(') and condition.endswith(')'):
-                            inner = condition[1:-1]
-                            if ' and ' in inner:
-                                parts = [p.strip().lower() for p in inner.split(' and ')]
-                                if all(p in text for p in parts):
-                                    return True
-                            else:
-                                if inner.lower() in text:
-                                    return True
-                        else:
-                            if condition.lower() in text:
-                                return True
-                    return False
+                # 이슈 카테고리 필터링 (검색 결과마다 한 번 만든 2-gram 색인으로 키워드 조회)
+                issue_index = st.session_state.get('issue_index')
+                if issue_index is None or issue_index.source is not df:
+                    issue_index = IssueIndex(df)
+                    st.session_state.issue_index = issue_index
 
                 # 이슈 카테고리 필터 적용 (사용자가 선택한 키워드 사용)
                 selected_keywords = st.session_state.get('selected_issue_keywords', [])
-                if selected_keywords:
-                    # 선택된 키워드를 쿼리 형식으로 변환
-                    issue_query = ' or '.join(selected_keywords)
-                    filtered_df2 = filtered_df2[
-                        filtered_df2.apply(lambda row: check_issue_category(row, issue_query), axis=1)
-                    ]
-
-                # 매칭된 이슈 키워드 찾기
-                def find_matched_issue_keywords(row):
-                    """문서에서 매칭된 이슈 키워드 추출"""
-                    matched_kws = []
-                    keywords = st.session_state.get('selected_issue_keywords', [])
-                    if not keywords:
-                        return matched_kws
-
-                    text_fields = ['title', 'content', 'description', 'body', 'summary', 'text']
-                    text_parts = []
-                    for field in text_fields:
-                        if field in row and row[field] is not None:
-                            text_parts.append(str(row[field]))
-                    text = ' '.join(text_parts).lower()
-
-                    for condition in keywords:
-                        condition = condition.strip()
-                        if condition.startswith('(') and condition.endswith(')'):
-                            inner = condition[1:-1]
-                            if ' and ' in inner:
-                                parts = [p.strip().lower() for p in inner.split(' and ')]
-                                if all(p in text for p in parts):
-                                    matched_kws.append(condition)
-                            else:
-                                if inner.lower() in text:
-                                    matched_kws.append(condition)
-                        else:
-                            if condition.lower() in text:
-                                matched_kws.append(condition)
-                    return matched_kws
-
-                filtered_df2['matched_keywords'] = filtered_df2.apply(find_matched_issue_keywords, axis=1)
+                # 조건식 AST 를 한 번 평가해 통과 여부와 행별 매칭 키워드를 함께 얻음 (키워드가 없으면 모두 통과)
+                issue_matched, matched_keywords = issue_index.match(selected_keywords, filtered_df2.index)
+                filtered_df2 = filtered_df2[issue_matched]
+                filtered_df2['matched_keywords'] = pd.Series(
+                    [kws for kws, ok in zip(matched_keywords, issue_matched) if ok], index=filtered_df2.index, dtype=object)
 
                 # 긍부정 점수 추출 (json_normalize 후 평탄화된 컬럼 사용)
                 # polarity.name, polarity.score 컬럼이 이미 존재함
@@ -1393,6 +1661,9 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                 else:
                     filtered_df2['polarity_score'] = 0
 
+                # 통신사 전재 등 유사 기사 묶기 (MinHash + LSH, dup_cluster/dup_rep/dup_count 컬럼 추가)
+                filtered_df2 = annotate_near_duplicates(filtered_df2)
+
                 # 결과를 session state에 저장 (특정 종목 필터 사용 시 유지)
                 st.session_state.filtered_df2 = filtered_df2
 
@@ -1403,7 +1674,17 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
         filtered_df2 = st.session_state.filtered_df2
         result_count = len(filtered_df2)
         if result_count > 0:
-            st.success(f"검색 결과: {len(filtered_df2)}건")
+            # 유사 기사 묶기: 묶음마다 대표 기사 하나만 통계/결과 테이블에 사용
+            has_dup_info = 'dup_rep' in filtered_df2.columns
+            collapse_dups = has_dup_info and st.toggle(
+                '유사 기사 묶기', value=True, key='collapse_near_duplicates',
+                help='여러 언론사가 같은 기사(통신사 전재 등)를 실은 경우 대표 기사 하나만 표시하고 통계에서도 한 번만 셉니다.'
+            )
+            view_df = filtered_df2[filtered_df2['dup_rep']] if collapse_dups else filtered_df2
+            if collapse_dups and len(view_df) < result_count:
+                st.success(f"검색 결과: {result_count}건 (유사 기사 묶음 후 {len(view_df)}건)")
+            else:
+                st.success(f"검색 결과: {result_count}건")
 
             # --------------------------------------------------------------
             # 종목별 기사 통계 시각화 (원본 결과 기준)
@@ -1415,47 +1696,15 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                 with st.popover('ℹ️'):
                     st.markdown('긍부정점수 및 신뢰도는 DeepSearch 제공')
 
-            # identified_symbols 리스트를 개별 행으로 풀어서 집계
-            stock_counts = {}
-            for symbols in filtered_df2['identified_symbols']:
-                if symbols:
-                    for symbol in symbols:
-                        stock_counts[symbol] = stock_counts.get(symbol, 0) + 1
-
-            if stock_counts:
-                # 종목별 긍부정 집계
-                stock_polarity = {}
-                for _, row in filtered_df2.iterrows():
-                    symbols = row.get('identified_symbols', [])
-                    polarity = row.get('polarity_name', '')
-                    if symbols:
-                        for symbol in symbols:
-                            if symbol not in stock_polarity:
-                                stock_polarity[symbol] = {'긍정': 0, '중립': 0, '부정': 0, '없음': 0}
-                            if polarity == '긍정':
-                                stock_polarity[symbol]['긍정'] += 1
-                            elif polarity == '중립':
-                                stock_polarity[symbol]['중립'] += 1
-                            elif polarity == '부정':
-                                stock_polarity[symbol]['부정'] += 1
-                            else:
-                                stock_polarity[symbol]['없음'] += 1
-
-                # 전체 종목 표시 (기사수 내림차순)
-                sorted_stocks = sorted(stock_counts.items(), key=lambda x: x[1], reverse=True)
-                stock_data = []
-                for stock, count in sorted_stocks:
-                    pol = stock_polarity.get(stock, {'긍정': 0, '중립': 0, '부정': 0, '없음': 0})
-                    stock_data.append({
-                        '종목': stock,
-                        '기사수': count,
-                        '긍정': pol['긍정'],
-                        '중립': pol['중립'],
-                        '부정': pol['부정'],
-                        '없음': pol['없음']
-                    })
-                stock_df = pd.DataFrame(stock_data)
+            # 종목별 기사수/긍부정 집계 (유사 기사 묶기 시 묶음당 한 번)
+            # 위젯 조작으로 재실행될 때는 같은 필터 결과/묶기 설정이면 이전 집계를 재사용
+            cached_stats = st.session_state.get('stock_stats')
+            if cached_stats is None or cached_stats[0] is not filtered_df2 or cached_stats[1] != collapse_dups:
+                cached_stats = (filtered_df2, collapse_dups, stock_article_stats(view_df))
+                st.session_state.stock_stats = cached_stats
+            stock_df = cached_stats[2]
 
+            if not stock_df.empty:
                 # 종목별 기사수 테이블
                 st.caption(f'종목별 기사수 (총 {len(stock_df)}개 종목)')
                 # 기사수 최대값을 모든 컬럼의 기준으로 사용
@@ -1510,8 +1759,10 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
             display_columns = ['content_url', 'publisher', 'section', 'title', 'identified_symbols', 'polarity_name', 'polarity_score']
             if st.session_state.get('selected_issue_keywords', []):
                 display_columns.insert(5, 'matched_keywords')
+            if collapse_dups:
+                display_columns.insert(4, 'dup_count')
 
-            filtered_df3 = filtered_df2[[col for col in display_columns if col in filtered_df2.columns]]
+            filtered_df3 = view_df[[col for col in display_columns if col in view_df.columns]]
 
             # 컬럼명 한글화
             column_names = {
@@ -1523,7 +1774,8 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                 'polarity_name': '긍부정',
                 'polarity_score': '신뢰도',
                 'identified_symbols': '관련 종목',
-                'content_url': '원문'
+                'content_url': '원문',
+                'dup_count': '유사 기사'
             }
             filtered_df3 = filtered_df3.rename(columns=column_names)
 
@@ -1551,10 +1803,14 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                         min_value=0,
                         max_value=1,
                         format='%.2f'
+                    ),
+                    '유사 기사': st.column_config.NumberColumn(
+                        '유사 기사',
+                        help='이 기사와 같은 묶음에 속한 기사 수 (대표 기사 포함)'
                     )
                 },
                 use_container_width=True,
-                column_order=['원문', '언론사', '섹션', '제목', '관련 종목', '매칭 키워드', '긍부정', '신뢰도']
+                column_order=['원문', '언론사', '섹션', '제목', '유사 기사', '관련 종목', '매칭 키워드', '긍부정', '신뢰도']
             )
 
             # --------------------------------------------------------------
@@ -1597,12 +1853,7 @@ DeepSearch가 자연어처리를 통해 식별한 **관련종목**(기사 주제
                     today_str = today.strftime('%Y-%m-%d')
 
                     # 종목 심볼 조회 (공시/보고서/주가 API용)
-                    stock_symbol_for_docs = None
-                    stock_match_for_docs = search_list_df_original[
-                        search_list_df_original['entity_name'] == selected_stock
-                    ]
-                    if not stock_match_for_docs.empty:
-                        stock_symbol_for_docs = stock_match_for_docs.iloc[0]['symbol']
+                    stock_symbol_for_docs = stock_search_index.symbol_of(selected_stock)
 
                     # ----------------------------------------------------------
                     # 4개 컬럼 레이아웃: 뉴스, 공시, IR, 애널리스트 보고서
@@ -1,18 +1,13 @@
-import requests
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
 import pandas as pd
-import time
 from tqdm import tqdm
 import psycopg2
 from psycopg2.extras import execute_values
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-
-# InsecureRequestWarning 비활성화
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+# DeepSearch 공용 클라이언트 (keep-alive 커넥션 풀, asyncio fan-out, SSL 경고 비활성화 포함)
+from deepsearch_client import auth_headers, build_url, make_request, api_call_many, DEFAULT_CONCURRENCY
 
 #-----------------------------------------------------------
 # 환경변수 설정
@@ -48,12 +43,7 @@ db_config = {
 }
 
 # 인증 헤더에 API 키 적용
-headers = {
-    'Authorization': f'Basic {api_key}'
-}
-
-# API 호출 URL
-url_base = 'https://api.deepsearch.com/v1/compute?input='
+headers = auth_headers(api_key)
 
 
 #-----------------------------------------------------------
@@ -68,10 +58,10 @@ for mkt in range(1, 4):
     query = f"""
     FindEntity("Financial","{mkt}" ,fields=["market_id"])
     """
-    url = f'{url_base}{query}'.replace('\n','')
+    url = build_url(query)
 
-    # SSL 인증서 검증 비활성화하고 GET 요청 보내기
-    response = requests.get(url, headers=headers, verify=False)
+    # 공용 세션으로 GET 요청 보내기
+    response = make_request(url, headers)
     
     # 응답 출력
     print(response.status_code)
@@ -94,53 +84,44 @@ for mkt in range(1, 4):
 # KeyError 발생한 symbol을 저장할 리스트
 key_error_symbols = []
 
-def fetch_entity_summary(symbol):
-    """개별 symbol에 대해 API 호출하는 함수"""
-    query = f"GetEntitySummary({symbol})"
-    url = f'{url_base}{query}'
-
-    max_retries = 5
-    retries = 0
-
-    while retries < max_retries:
+def parse_entity_summary(symbol, response_data):
+    """GetEntitySummary 응답을 DataFrame으로 변환"""
+    if 'data' in response_data and 'pods' in response_data['data'] and len(response_data['data']['pods']) > 1:
         try:
-            response = requests.get(url, headers=headers, verify=False)
-            response.raise_for_status()
-            response_data = response.json()
-
-            if 'data' in response_data and 'pods' in response_data['data'] and len(response_data['data']['pods']) > 1:
-                try:
-                    data_dict = response_data['data']['pods'][1]['content']['data']
-                    return pd.DataFrame(data_dict)
-                except KeyError as e:
-                    print(f"KeyError for {symbol}: {e}")
-                    return None
-            else:
-                print(f"No valid data for {symbol}")
-                return None
-
-        except requests.exceptions.RequestException as e:
-            retries += 1
-            if retries >= max_retries:
-                print(f"Failed to retrieve data for {symbol} after {max_retries} attempts. Error: {e}")
-                return None
-            else:
-                time.sleep(2)  # 재시도 전 2초 대기
-
-    return None
-
-# 병렬 API 호출 (동시 10개)
-print("Fetching entity summaries (parallel, max_workers=10)...")
+            data_dict = response_data['data']['pods'][1]['content']['data']
+            return pd.DataFrame(data_dict)
+        except KeyError as e:
+            print(f"KeyError for {symbol}: {e}")
+            return None
+    else:
+        print(f"No valid data for {symbol}")
+        return None
+
+# asyncio 엔진으로 동시 호출 (상한 DEEPSEARCH_CONCURRENCY, 실제 동시성은 요청 제한기가 429/503에 맞춰 조절)
+print(f"Fetching entity summaries (asyncio, concurrency={DEFAULT_CONCURRENCY})...")
 symbols = list(listed_df['symbol'])
-results = []
+max_retries = 5
+progress = tqdm(total=len(symbols), desc="Fetching data")
+
+responses = api_call_many(
+    api_key,
+    [f"GetEntitySummary({symbol})" for symbol in symbols],
+    concurrency=DEFAULT_CONCURRENCY,
+    max_retries=max_retries,
+    retry_delay=2,  # 재시도 전 2초 대기
+    on_done=lambda done, total: progress.update(1),
+    use_cache=False,  # 일일 갱신이므로 캐시를 읽지 않고 새로 받음
+)
+progress.close()
 
-with ThreadPoolExecutor(max_workers=10) as executor:
-    futures = {executor.submit(fetch_entity_summary, symbol): symbol for symbol in symbols}
-
-    for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching data"):
-        result = future.result()
-        if result is not None:
-            results.append(result)
+results = []
+for symbol, response_data in zip(symbols, responses):
+    if isinstance(response_data, Exception):
+        print(f"Failed to retrieve data for {symbol} after {max_retries} attempts. Error: {response_data}")
+        continue
+    result = parse_entity_summary(symbol, response_data)
+    if result is not None:
+        results.append(result)
 
 # 결과 합치기
 if results:
@@ -0,0 +1,153 @@
+"""
+================================================================================
+로컬 문서 저장소 (SQLite) - 웹앱 검색의 완료된 하루 조각 재사용
+================================================================================
+
+[개요]
+웹앱(deepsearch_query.py) 검색은 deepsearch_client.day_slices 로 기간을 하루 조각으로 나누고,
+오늘(KST) 이전 날짜의 조각을 캐시 폴더의 documents.sqlite3 에 저장합니다.
+같은 조건으로 기간이 겹치는 검색을 다시 하면 저장된 날짜는 로컬에서 읽고
+빠진 날짜(보통 오늘)만 API 로 받습니다. 스킬 스크립트는 쓰지 않으므로
+공용 클라이언트(deepsearch_client.py) 사본에는 넣지 않고 앱 폴더에만 둡니다.
+
+[환경변수]
+- DEEPSEARCH_DOC_STORE             0 이면 로컬 문서 저장소 사용 안 함 (기본 1)
+- DEEPSEARCH_DOC_STORE_IDLE_DAYS   이 기간(일) 동안 읽히지 않은 저장 조각 삭제 (기본 90)
+================================================================================
+"""
+
+import os
+import sys
+import time
+import zlib
+import json
+import sqlite3
+import hashlib
+import threading
+
+from deepsearch_client import DEFAULT_CACHE_DIR, canonical_query, set_query_param, get_cassette
+
+DEFAULT_DOC_STORE_ENABLED = os.getenv('DEEPSEARCH_DOC_STORE', '1') != '0'
+DEFAULT_DOC_STORE_IDLE_DAYS = float(os.getenv('DEEPSEARCH_DOC_STORE_IDLE_DAYS', '90'))
+
+
+class DocumentStore:
+    """
+    DocumentSearch 결과를 하루 단위 조각(slice)으로 저장하는 SQLite 문서 저장소.
+
+    조각 키는 하루 기간으로 좁힌 정규화 쿼리(섹션, 언론사 조건, fields 포함)라서 같은 조건의
+    같은 날짜만 재사용된다. 문서 본문은 uid_str 기준으로 한 번만 저장하고 조각은 문서 목록만 가진다.
+    오늘(KST) 이전 날짜의 조각만 완료로 저장하며 (지난 날의 기사는 바뀌지 않음),
+    max_idle_days 동안 읽히지 않은 조각과 더 이상 참조되지 않는 문서는 열 때 지운다.
+    """
+
+    def __init__(self, path, max_idle_days):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS slices ('
+            ' key TEXT PRIMARY KEY, query TEXT, day TEXT, doc_count INTEGER, accessed REAL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS slice_docs (key TEXT, seq INTEGER, uid TEXT, PRIMARY KEY (key, seq))'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS docs (uid TEXT PRIMARY KEY, day TEXT, body BLOB)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS slices_day ON slices(day)')
+        self._purge(time.time() - max_idle_days * 86400)
+
+    @staticmethod
+    def slice_query(query):
+        return canonical_query(set_query_param(query, 'page', 1))
+
+    def key(self, query):
+        return hashlib.sha256(self.slice_query(query).encode('utf-8')).hexdigest()
+
+    def load(self, query):
+        """완료된 조각의 문서 리스트 (저장 순서). 없으면 None."""
+        key = self.key(query)
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM slices WHERE key = ?', (key,)).fetchone() is None:
+                return None
+            self._conn.execute('UPDATE slices SET accessed = ? WHERE key = ?', (time.time(), key))
+            rows = self._conn.execute(
+                'SELECT d.body FROM slice_docs s JOIN docs d ON d.uid = s.uid WHERE s.key = ? ORDER BY s.seq',
+                (key,),
+            ).fetchall()
+        return [json.loads(zlib.decompress(body)) for body, in rows]
+
+    def save(self, query, day, docs):
+        """day 하루 조각의 전체 문서를 완료 상태로 저장."""
+        key = self.key(query)
+        rows = []
+        for doc in docs:
+            body = json.dumps(doc, ensure_ascii=False, sort_keys=True)
+            uid = doc.get('uid_str') or hashlib.sha256(body.encode('utf-8')).hexdigest()
+            rows.append((uid, str(day), zlib.compress(body.encode('utf-8'))))
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO docs (uid, day, body) VALUES (?, ?, ?)', rows)
+                self._conn.execute('DELETE FROM slice_docs WHERE key = ?', (key,))
+                self._conn.executemany('INSERT INTO slice_docs (key, seq, uid) VALUES (?, ?, ?)',
+                                       [(key, seq, row[0]) for seq, row in enumerate(rows)])
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO slices (key, query, day, doc_count, accessed) VALUES (?, ?, ?, ?, ?)',
+                    (key, self.slice_query(query), str(day), len(rows), time.time()),
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _purge(self, before):
+        with self._lock:
+            self._conn.execute('DELETE FROM slice_docs WHERE key IN (SELECT key FROM slices WHERE accessed < ?)', (before,))
+            self._conn.execute('DELETE FROM slices WHERE accessed < ?', (before,))
+            self._conn.execute('DELETE FROM docs WHERE uid NOT IN (SELECT uid FROM slice_docs)')
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM slice_docs')
+            self._conn.execute('DELETE FROM slices')
+            self._conn.execute('DELETE FROM docs')
+
+
+_doc_store = None
+_doc_store_lock = threading.Lock()
+_doc_store_config = {
+    'enabled': DEFAULT_DOC_STORE_ENABLED,
+    'path': os.path.join(DEFAULT_CACHE_DIR, 'documents.sqlite3'),
+    'max_idle_days': DEFAULT_DOC_STORE_IDLE_DAYS,
+}
+
+
+def get_document_store():
+    """프로세스 공용 DocumentStore. 비활성화되었거나 파일을 열 수 없으면 None (카세트 모드에서도 None)."""
+    global _doc_store
+    if not _doc_store_config['enabled'] or get_cassette() is not None:
+        return None
+    if _doc_store is None:
+        with _doc_store_lock:
+            if _doc_store is None and _doc_store_config['enabled']:
+                try:
+                    os.makedirs(os.path.dirname(_doc_store_config['path']), exist_ok=True)
+                    _doc_store = DocumentStore(_doc_store_config['path'], _doc_store_config['max_idle_days'])
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[doc-store] 비활성화: {e}", file=sys.stderr)
+                    _doc_store_config['enabled'] = False
+    return _doc_store
+
+
+def configure_document_store(enabled=None, path=None, max_idle_days=None):
+    """문서 저장소 설정 변경. 다음 조회 시 새 설정으로 다시 연다."""
+    global _doc_store
+    with _doc_store_lock:
+        if enabled is not None:
+            _doc_store_config['enabled'] = enabled
+        if path is not None:
+            _doc_store_config['path'] = path
+        if max_idle_days is not None:
+            _doc_store_config['max_idle_days'] = max_idle_days
+        _doc_store = None
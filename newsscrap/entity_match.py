@@ -0,0 +1,169 @@
+"""
+================================================================================
+상장사 언급 매칭 - 컬럼 단위(벡터화) 식별자 조인
+================================================================================
+
+[개요]
+검색 결과 문서의 securities / entities / named_entities 항목을 긴 표(문서 행, 식별자 키) 하나로
+한 번 펼쳐 두고(EntityIndex), 상장사 통합 식별자 색인(CompanyIndex)의 회사 id 로 바꿔 둔 뒤,
+필터를 적용할 때마다 선택한 회사 id 집합과 비교해 문서별 matched / identified_symbols 를 구합니다. 행마다 파이썬으로 항목을 도는 df.apply 대신
+pandas/numpy 벡터 연산(explode, str.replace, factorize, 정렬)만 쓰므로 결과 건수가 늘어도 빠릅니다.
+
+[매칭 규칙]
+항목마다 symbol → name → business_rid → company_rid 순으로 처음 있는 식별자 하나만 봅니다.
+키가 있는지로 정하므로 {'symbol': None, 'name': '삼성전자'} 는 symbol 에서 멈추고 매칭되지 않습니다.
+- symbol: 상장사 symbol, 없으면 symbol_nice 와 비교
+- name: entity_name 과 비교
+- business_rid / company_rid: 양쪽 모두 '-' 를 뺀 값으로 비교
+  (기존 filter_df 는 문서 쪽만 '-' 를 빼고 DB 값은 그대로 비교했습니다. DB 값은 하이픈을 뺀
+  형식이라 결과는 같고, DB 에 하이픈이 든 값이 있어도 이제는 매칭되도록 의도적으로 바꾼 것입니다)
+그 밖의 규칙은 기존 filter_df 와 같습니다.
+================================================================================
+"""
+
+import numpy as np
+import pandas as pd
+
+# 상장사 언급을 찾는 문서 필드 (관련종목 + 언급종목 합집합)
+ENTITY_COLUMNS = ['securities', 'entities', 'named_entities']
+# 항목에서 보는 식별자 (앞선 키가 있으면 뒤 키는 보지 않음)
+ENTRY_KEYS = ['symbol', 'name', 'business_rid', 'company_rid']
+_RID_KEYS = {'business_rid', 'company_rid'}
+# 식별자 종류 → 상장사 목록 컬럼 (symbol 은 symbol 이 symbol_nice 보다 우선)
+_COMPANY_COLUMNS = [
+    ('symbol', 'symbol'),
+    ('symbol', 'symbol_nice'),
+    ('name', 'entity_name'),
+    ('business_rid', 'business_rid'),
+    ('company_rid', 'company_rid'),
+]
+
+
+def entity_keys(df):
+    """
+    문서 항목을 (row, key) 긴 표로 펼침. row 는 df 의 행 위치, key 는 '종류:값' 형식의 식별자.
+
+    종류를 키에 붙여 두므로 서로 다른 종류의 식별자 값이 우연히 같아도 섞이지 않습니다.
+    """
+    frames = []
+    for col in ENTITY_COLUMNS:
+        if col not in df.columns:
+            continue
+        entries = df[col].reset_index(drop=True).explode().dropna()
+        if entries.empty:
+            continue
+        records = entries.tolist()
+        fields = pd.DataFrame.from_records(records, columns=ENTRY_KEYS)
+        fields.index = entries.index
+        taken = np.zeros(len(records), dtype=bool)
+        for kind in ENTRY_KEYS:
+            # 키가 있으면 값이 None 이어도 그 항목은 이 종류에서 멈춤 (기존 filter_df 의 'symbol' in entry)
+            present = np.fromiter((kind in entry for entry in records), dtype=bool, count=len(records))
+            values = fields.loc[present & ~taken & fields[kind].notna().to_numpy(), kind].astype(str)
+            if kind in _RID_KEYS:
+                values = values.str.replace('-', '', regex=False)
+            frames.append(pd.DataFrame({'row': values.index.to_numpy(), 'key': kind + ':' + values.to_numpy()}))
+            taken |= present
+    if not frames:
+        return pd.DataFrame({'row': pd.Series(dtype='int64'), 'key': pd.Series(dtype='object')})
+    return pd.concat(frames, ignore_index=True)
+
+
+class CompanyIndex:
+    """
+    상장사 목록의 통합 식별자 색인. 회사 id 는 companies 의 행 위치(0..n-1)입니다.
+
+    symbol / symbol_nice / entity_name / '-' 를 뺀 business_rid, company_rid(문서 쪽과 같은 정규화) 를 모두 '종류:값' 키 하나의
+    공간에 넣어 회사 id 로 연결하므로, 필터 선택(시장, 종목)은 회사 id 집합으로만 다룹니다.
+    같은 키를 가진 회사가 여럿이면 앞선 식별자 종류(symbol 이 symbol_nice 보다 우선), 앞선 행이 이깁니다.
+    데이터 갱신(last_update)마다 한 번 만들어 세션 간에 공유하므로 만든 뒤에는 읽기만 합니다.
+    """
+
+    def __init__(self, companies):
+        self.companies = companies.reset_index(drop=True)
+        has_name = self.companies['entity_name'].notna() if 'entity_name' in self.companies.columns \
+            else pd.Series(False, index=self.companies.index)
+        self.names = self.companies['entity_name'].to_numpy() if 'entity_name' in self.companies.columns \
+            else np.array([], dtype=object)
+
+        frames = []
+        for kind, col in _COMPANY_COLUMNS:
+            if col not in self.companies.columns:
+                continue
+            values = self.companies.loc[self.companies[col].notna() & has_name, col].astype(str)
+            if kind in _RID_KEYS:
+                values = values.str.replace('-', '', regex=False)
+            frames.append(pd.DataFrame({'key': kind + ':' + values.to_numpy(), 'id': values.index.to_numpy()}))
+        table = pd.concat(frames, ignore_index=True).drop_duplicates('key') if frames \
+            else pd.DataFrame({'key': pd.Series(dtype='object'), 'id': pd.Series(dtype='int64')})
+        self._keys = pd.Index(table['key'])
+        # 마지막 칸(-1): 색인에 없는 키
+        self._key_ids = np.r_[table['id'].to_numpy(dtype=np.int64), -1]
+        self._market_ids = ({mkt: np.asarray(ids) for mkt, ids in self.companies.groupby('mkt').indices.items()}
+                            if 'mkt' in self.companies.columns else {})
+
+    def __len__(self):
+        return len(self.companies)
+
+    def lookup(self, keys):
+        """식별자 키 배열 → 회사 id 배열 (없는 키는 -1)."""
+        return self._key_ids[self._keys.get_indexer(keys)]
+
+    def ids_in_markets(self, markets):
+        """시장 코드(KOSPI 등) 목록에 속한 회사 id 배열."""
+        ids = [self._market_ids[mkt] for mkt in markets if mkt in self._market_ids]
+        return np.concatenate(ids) if ids else np.array([], dtype=np.int64)
+
+    def ids_of_names(self, names):
+        """기업명 목록에 해당하는 회사 id 배열."""
+        return np.flatnonzero(pd.Series(self.names).isin(list(names)).to_numpy())
+
+
+class EntityIndex:
+    """
+    검색 결과 DataFrame 의 펼친 식별자 표. 상장사 목록이 바뀌어도 펼친 표는 다시 만들지 않습니다.
+
+    source 는 색인을 만든 DataFrame 으로, session_state 에 두고 같은 검색 결과면 재사용합니다.
+    """
+
+    def __init__(self, df):
+        self.source = df
+        keys = entity_keys(df)
+        self._rows = keys['row'].to_numpy(dtype=np.int64)
+        # 식별자 키를 정수 코드로 (회사 id 조회는 고유 키 수만큼만)
+        self._codes, self._uniques = pd.factorize(keys['key'])
+        self._company_index = None
+        self._entry_companies = None
+
+    def _companies_of_entries(self, company_index):
+        """항목별 회사 id 배열 (색인에 없으면 -1). 같은 CompanyIndex 면 다시 조회하지 않음."""
+        if self._company_index is not company_index:
+            self._entry_companies = company_index.lookup(self._uniques)[self._codes]
+            self._company_index = company_index
+        return self._entry_companies
+
+    def match(self, company_index, company_ids):
+        """
+        선택한 회사 id 집합에 대한 문서별 매칭 결과.
+
+        반환: source 와 같은 index 의 DataFrame ('matched': bool, 'identified_symbols': 기업명 리스트).
+        """
+        n = len(self.source)
+        size = len(company_index) + 1
+        selected = np.zeros(size, dtype=bool)  # 마지막 칸(-1, 색인에 없는 식별자)은 항상 False
+        selected[np.asarray(company_ids, dtype=np.int64)] = True
+        companies = self._companies_of_entries(company_index)
+        hit = selected[companies]
+
+        # (문서, 회사) 중복 제거 후 문서 순으로 모음 (문서 안에서는 처음 언급된 순서)
+        pairs = pd.unique(self._rows[hit] * size + companies[hit])
+        pairs = pairs[np.argsort(pairs // size, kind='stable')]
+        rows, company = pairs // size, pairs % size
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else rows
+
+        matched = np.zeros(n, dtype=bool)
+        matched[rows] = True
+        identified_symbols = [[] for _ in range(n)]
+        for row, row_names in zip(rows[starts], np.split(company_index.names[company], starts[1:])):
+            identified_symbols[row] = row_names.tolist()
+        return pd.DataFrame({'matched': matched, 'identified_symbols': identified_symbols}, index=self.source.index)
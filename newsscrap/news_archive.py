@@ -0,0 +1,158 @@
+"""
+================================================================================
+뉴스 아카이브 (PostgreSQL) - 일일 적재 / 조회 공용 모듈
+================================================================================
+
+[개요]
+GitHub Actions 일일 파이프라인(deepsearch_news_ingest.py)이 전날 경제 섹션 뉴스 전체를
+ds_news 테이블에 적재하고, Streamlit 앱(deepsearch_query.py)은 적재가 끝난 날짜를
+API 대신 SQL 한 번으로 읽습니다. 앱 검색은 섹션 + 언론사 + 기간 조건뿐이므로
+(종목/이슈 필터는 받은 뒤 적용) 경제 섹션의 지난 날짜는 아카이브만으로 같은 결과를 냅니다.
+
+[테이블]
+- ds_news: 문서 1건 1행, uid_str 기준 upsert (같은 날짜를 다시 적재해도 중복 없음)
+    - doc(JSONB): API 응답 문서 그대로 (앱이 쓰는 필드만 투영해서 받음)
+    - symbols(TEXT[]): securities 종목코드 배열, GIN 인덱스 (symbols && ARRAY['KRX:005930'] 조회)
+    - (news_date, publisher) B-tree 인덱스: 앱의 날짜 + 언론사 조회
+- ds_news_days: 적재를 끝까지 마친 날짜. 앱은 여기 있는 날짜만 아카이브에서 읽음
+  (적재 중이거나 실패한 날짜, 받은 문서 수가 total_matches 에 못 미친 날짜는 API로 검색)
+================================================================================
+"""
+
+from datetime import datetime
+
+from psycopg2.extras import Json, execute_values
+
+from deepsearch_client import KST
+
+NEWS_TABLE = 'ds_news'
+DAYS_TABLE = 'ds_news_days'
+# 아카이브에 적재하는 뉴스 섹션 (앱의 국내뉴스 섹션 선택값과 같은 형식)
+ARCHIVE_SECTION = '["economy"]'
+# 적재 문서 필드: 앱의 NEWS_FIELDS + 정렬/날짜용 created_at
+ARCHIVE_FIELDS = ['uid_str', 'section', 'publisher', 'author', 'title', 'content', 'content_url',
+                  'polarity', 'securities', 'entities', 'named_entities', 'created_at']
+
+# 적재 완료로 인정하는 누락 허용치: total_matches 의 1% (최소 10건). 그보다 많이 빠지면 그날은 미완료
+COMPLETE_TOLERANCE = 0.01
+COMPLETE_TOLERANCE_MIN = 10
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {NEWS_TABLE} (
+    uid_str VARCHAR(200) PRIMARY KEY,
+    news_date DATE NOT NULL,
+    created_at TIMESTAMPTZ,
+    publisher VARCHAR(100),
+    symbols TEXT[] NOT NULL DEFAULT '{{}}',
+    doc JSONB NOT NULL,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS {NEWS_TABLE}_date_publisher_idx ON {NEWS_TABLE} (news_date, publisher);
+CREATE INDEX IF NOT EXISTS {NEWS_TABLE}_symbols_idx ON {NEWS_TABLE} USING GIN (symbols);
+CREATE TABLE IF NOT EXISTS {DAYS_TABLE} (
+    news_date DATE PRIMARY KEY,
+    doc_count INTEGER NOT NULL,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+
+def archive_query(day, count=100):
+    """적재용 DocumentSearch 쿼리 (하루치 경제 섹션 전체, 앱과 같은 필드 투영)."""
+    field_list = ','.join(f'"{f}"' for f in ARCHIVE_FIELDS)
+    return (f'DocumentSearch(["news"] , {ARCHIVE_SECTION} , "*" , date_from={day:%Y%m%d} , date_to={day:%Y%m%d} , '
+            f'count = {count}, page = 1, fields=[{field_list}])')
+
+
+def _created_at(doc):
+    """created_at 문자열을 KST 기준 datetime으로 (시간대 없는 값은 KST로 간주). 없거나 형식이 다르면 None."""
+    value = doc.get('created_at')
+    if not value:
+        return None
+    try:
+        created = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return created if created.tzinfo else created.replace(tzinfo=KST)
+
+
+def doc_symbols(doc):
+    """문서의 securities 종목코드 목록 (중복 제거, 순서 유지)."""
+    return list(dict.fromkeys(entry['symbol'] for entry in doc.get('securities') or [] if entry.get('symbol')))
+
+
+def is_complete(docs, total):
+    """
+    받은 문서(uid_str 있는 것)가 total_matches 와 허용치 안에서 맞는지. total 을 모르면 False.
+
+    일부 페이지만 받은 날짜를 ds_news_days 에 기록하면 앱이 그 날짜를 계속 아카이브에서 읽으므로,
+    완료로 볼 수 없는 날짜는 적재하지 않고 다음 실행에서 다시 받습니다.
+    """
+    if total is None:
+        return False
+    count = sum(1 for doc in docs if doc.get('uid_str'))
+    return count >= total - max(COMPLETE_TOLERANCE_MIN, total * COMPLETE_TOLERANCE)
+
+
+def ensure_schema(cursor):
+    """테이블/인덱스가 없으면 생성."""
+    cursor.execute(SCHEMA_SQL)
+
+
+def upsert_news(cursor, day, docs, page_size=1000):
+    """
+    하루치 문서를 upsert 하고 ds_news_days 에 적재 완료로 기록. 반환: 적재한 문서 수.
+
+    uid_str 이 같은 문서는 최신 응답으로 덮어쓰므로 같은 날짜를 다시 적재해도 안전합니다.
+    """
+    rows = [
+        (doc['uid_str'], day, _created_at(doc), doc.get('publisher'), doc_symbols(doc), Json(doc))
+        for doc in docs if doc.get('uid_str')
+    ]
+    execute_values(cursor, f"""
+        INSERT INTO {NEWS_TABLE} (uid_str, news_date, created_at, publisher, symbols, doc) VALUES %s
+        ON CONFLICT (uid_str) DO UPDATE SET
+            news_date = EXCLUDED.news_date, created_at = EXCLUDED.created_at, publisher = EXCLUDED.publisher,
+            symbols = EXCLUDED.symbols, doc = EXCLUDED.doc, ingested_at = now()
+    """, rows, page_size=page_size)
+    cursor.execute(f"""
+        INSERT INTO {DAYS_TABLE} (news_date, doc_count) VALUES (%s, %s)
+        ON CONFLICT (news_date) DO UPDATE SET doc_count = EXCLUDED.doc_count, ingested_at = now()
+    """, (day, len(rows)))
+    return len(rows)
+
+
+def pending_days(cursor, days):
+    """days 중 아직 적재를 마치지 않은 (ds_news_days 에 없는) 날짜들 (날짜순)."""
+    days = sorted(set(days))
+    if not days:
+        return []
+    cursor.execute(f'SELECT news_date FROM {DAYS_TABLE} WHERE news_date = ANY(%s)', (days,))
+    ingested = {row[0] for row in cursor.fetchall()}
+    return [day for day in days if day not in ingested]
+
+
+def load_news(connection, days, publishers=None):
+    """
+    적재가 끝난 날짜의 문서를 {날짜: [문서, ...]} 로 반환 (최신 기사 순). 적재되지 않은 날짜는 키가 없음.
+
+    publishers 가 있으면 해당 언론사 문서만 (앱의 publisher.raw OR 조건과 같음).
+    """
+    days = sorted(set(days))
+    if not days:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT news_date FROM {DAYS_TABLE} WHERE news_date = ANY(%s)', (days,))
+        ingested = [row[0] for row in cursor.fetchall()]
+        if not ingested:
+            return {}
+        sql = f'SELECT news_date, doc FROM {NEWS_TABLE} WHERE news_date = ANY(%s)'
+        params = [ingested]
+        if publishers:
+            sql += ' AND publisher = ANY(%s)'
+            params.append(list(publishers))
+        cursor.execute(sql + ' ORDER BY news_date, created_at DESC NULLS LAST, uid_str', params)
+        news = {day: [] for day in ingested}
+        for day, doc in cursor.fetchall():
+            news[day].append(doc)
+    return news
@@ -0,0 +1,134 @@
+"""
+================================================================================
+유사(중복) 기사 묶기 - MinHash + LSH
+================================================================================
+
+[개요]
+통신사 기사를 여러 언론사가 그대로 전재하면 같은 기사가 언론사 수만큼 검색됩니다.
+제목 + 본문 앞부분의 글자 3-gram 집합으로 MinHash 서명을 만들고, 서명을 밴드로 나눈
+LSH 버킷에서 같은 버킷에 들어간 기사끼리만 비교하므로 기사 수가 1만 건을 넘어도
+전체 쌍 비교(O(n²)) 없이 유사 기사를 묶을 수 있습니다.
+
+[결과 컬럼] annotate_near_duplicates(df)
+- dup_cluster: 묶음 번호 (묶음의 대표 기사 행 위치)
+- dup_rep: 묶음의 대표 기사 여부 (DataFrame 순서상 첫 기사)
+- dup_count: 묶음에 속한 기사 수 (단독 기사는 1)
+
+[파라미터]
+- NUM_PERM(64) = BANDS(16) × 밴드당 4행: 추정 유사도 약 0.5 이상이면 후보가 되고,
+  후보는 서명 일치 비율이 threshold(기본 0.7) 이상일 때만 같은 묶음으로 합칩니다.
+================================================================================
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 3
+# 본문은 앞부분만 비교 (전재 기사는 리드 문단이 같고, 긴 본문 전체를 해시할 필요가 없음)
+CONTENT_CHARS = 400
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+_rng = np.random.default_rng(20240601)
+# 순열 해시: multiply-shift ((a·h + b) mod 2^64) >> 32, a 는 홀수. uint64 곱셈의 순환(wrap)을 그대로 이용
+_PERM_A = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+# 밴드의 서명 조각(행 여러 개)을 uint64 키 하나로 접을 때 쓰는 홀수 계수
+_BAND_MIX = _rng.integers(0, 1 << 63, size=NUM_PERM // BANDS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def _shingle_hashes(text):
+    """공백/문장부호를 뺀 글자 SHINGLE-gram 의 32비트 해시 배열 (numpy 벡터 연산, 중복 포함)."""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE:
+        return None
+    h = np.zeros(len(codes) - SHINGLE + 1, dtype=np.uint64)
+    for k, mult in enumerate((0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D)[:SHINGLE]):
+        h ^= codes[k:len(codes) - SHINGLE + 1 + k] * np.uint64(mult)
+    return h & _MAX_HASH
+
+
+def minhash_signatures(texts):
+    """
+    텍스트 목록의 MinHash 서명 (len(texts) × NUM_PERM, uint64).
+
+    모든 기사의 shingle 해시를 한 배열로 이어 붙인 뒤 순열마다 한 번의 벡터 연산과
+    np.minimum.reduceat 으로 기사별 최솟값을 구합니다 (기사별 파이썬 반복 없음).
+    반환: (signatures, valid). 비교할 글자가 SHINGLE 개 미만인 기사는 valid=False.
+    """
+    hashes = [_shingle_hashes(_NON_WORD_RE.sub('', text.lower())) for text in texts]
+    valid = np.array([h is not None for h in hashes], dtype=bool)
+    signatures = np.zeros((len(texts), NUM_PERM), dtype=np.uint64)
+    if not valid.any():
+        return signatures, valid
+    kept = [h for h in hashes if h is not None]
+    flat = np.concatenate(kept)
+    starts = np.concatenate(([0], np.cumsum([len(h) for h in kept])[:-1]))
+    for k in range(NUM_PERM):
+        signatures[valid, k] = np.minimum.reduceat((_PERM_A[k] * flat + _PERM_B[k]) >> np.uint64(32), starts)
+    return signatures, valid
+
+
+def near_duplicate_clusters(texts, threshold=0.7):
+    """
+    유사 기사 묶음 번호 배열. 같은 묶음은 같은 번호(묶음에서 가장 앞선 위치)를 가집니다.
+
+    밴드마다 서명 조각을 키 하나로 접어 정렬하고, 같은 버킷의 기사는 버킷의 첫 기사와만
+    서명 일치 비율을 비교하므로 비교 횟수는 기사 수에 비례합니다 (전체 쌍 비교 없음).
+    통과한 쌍은 작은 번호를 전파하는 방식(연결 요소)으로 묶습니다.
+    """
+    n = len(texts)
+    labels = np.arange(n)
+    if n < 2:
+        return labels
+    signatures, valid = minhash_signatures(texts)
+    rows = NUM_PERM // BANDS
+    index = np.flatnonzero(valid)
+    pairs_a, pairs_b = [], []
+
+    for band in range(BANDS):
+        band_sig = signatures[index, band * rows:(band + 1) * rows]
+        key = np.bitwise_xor.reduce(band_sig * _BAND_MIX[:rows], axis=1)
+        order = np.argsort(key, kind='stable')
+        members = index[order]
+        sorted_key = key[order]
+        is_first = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+        firsts = members[np.maximum.accumulate(np.where(is_first, np.arange(len(members)), 0))]
+        a, b = firsts[~is_first], members[~is_first]
+        similar = (signatures[a] == signatures[b]).mean(axis=1) >= threshold
+        pairs_a.append(a[similar])
+        pairs_b.append(b[similar])
+
+    a, b = np.concatenate(pairs_a), np.concatenate(pairs_b)
+    while len(a):
+        merged = labels.copy()
+        np.minimum.at(merged, b, merged[a])
+        np.minimum.at(merged, a, merged[b])
+        merged = merged[merged]
+        if (merged == labels).all():
+            break
+        labels = merged
+    return labels
+
+
+def annotate_near_duplicates(df, threshold=0.7):
+    """
+    제목 + 본문 앞부분 기준으로 유사 기사를 묶어 dup_cluster / dup_rep / dup_count 컬럼을 추가한 사본을 반환.
+    """
+    df = df.copy()
+    if df.empty:
+        df['dup_cluster'] = pd.Series(dtype='int64')
+        df['dup_rep'] = pd.Series(dtype='bool')
+        df['dup_count'] = pd.Series(dtype='int64')
+        return df
+    title = df['title'].fillna('').astype(str) if 'title' in df.columns else pd.Series('', index=df.index)
+    content = df['content'].fillna('').astype(str).str[:CONTENT_CHARS] if 'content' in df.columns else ''
+    clusters = near_duplicate_clusters((title + ' ' + content).tolist(), threshold)
+    df['dup_cluster'] = clusters
+    df['dup_rep'] = clusters == np.arange(len(df))
+    df['dup_count'] = df.groupby('dup_cluster')['dup_cluster'].transform('size')
+    return df
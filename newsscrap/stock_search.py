@@ -0,0 +1,137 @@
+"""
+================================================================================
+종목 검색 색인 - 종목명 자동완성 (접두/부분/초성/종목코드)
+================================================================================
+
+[개요]
+상장사 목록(ds_entitysummary)으로 한 번 만든 색인에서 종목명 입력값에 맞는 종목을
+순위대로 찾습니다. 입력할 때마다 전체 목록에 str.contains 를 돌리지 않고, 정렬된 접미사 목록을
+이진 탐색하므로 수천 종목에서도 1ms 안에 응답합니다.
+
+[검색 방식]
+- 종목명: 공백과 '(주)', '㈜', '주식회사' 를 뺀 소문자 이름의 접두/부분 일치 ("sk하이" → SK하이닉스)
+- 초성: 입력이 초성(ㄱ~ㅎ)만이면 이름의 초성열에서 검색 ("ㅅㅅㅈㅈ" → 삼성전자)
+- 종목코드: 숫자(또는 A/KRX: 접두)로 시작하면 6자리 코드, NICE 코드의 접두 일치 ("0059" → 005930)
+
+[순위]
+정확히 일치 → 앞부분 일치 → 부분 일치 (일치 위치가 앞일수록, 이름이 짧을수록 먼저)
+
+회사 id 는 companies 의 행 위치로 CompanyIndex(entity_match.py)와 같은 id 공간입니다.
+================================================================================
+"""
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+_CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSEONG_SET = set(_CHOSEONG)
+# 이름 비교 시 무시하는 법인 표기와 공백
+_CORP_RE = re.compile(r'\(주\)|㈜|주식회사|\s+')
+_CODE_QUERY_RE = re.compile(r'(?:krx:|a)?(\d+)')
+
+
+def normalize_name(name):
+    """비교용 종목명: 소문자, 공백/법인 표기 제거."""
+    return _CORP_RE.sub('', str(name)).lower()
+
+
+def choseong(text):
+    """한글 음절을 초성으로 바꾼 문자열 (한글 외 문자는 그대로)."""
+    return ''.join(_CHOSEONG[(ord(ch) - 0xAC00) // 588] if '가' <= ch <= '힣' else ch for ch in text)
+
+
+def stock_code(symbol):
+    """'KRX:005930' / '005930' / 5930 → '005930' (6자리 숫자 코드)."""
+    return str(symbol).split(':')[-1].split('.')[0].strip().zfill(6)
+
+
+def stock_codes(symbols):
+    """stock_code 의 벡터 버전: 종목코드 배열 → 6자리 코드 Series (엑셀 숫자 셀 5930.0 → '005930')."""
+    codes = pd.Series(symbols, dtype='object').astype(str)
+    return codes.str.split(':').str[-1].str.split('.').str[0].str.strip().str.zfill(6)
+
+
+def _suffix_tables(keys):
+    """([(이름, 회사 id, 0), ...], [(접미사, 회사 id, 시작 위치), ...]) 접두/부분 일치용 정렬 목록."""
+    keys = [(company_id, key) for company_id, key in keys if key]
+    prefixes = sorted((key, company_id, 0) for company_id, key in keys)
+    infixes = sorted((key[start:], company_id, start) for company_id, key in keys for start in range(1, len(key)))
+    return prefixes, infixes
+
+
+class StockSearchIndex:
+    """
+    상장사 종목명/초성/종목코드 자동완성 색인.
+
+    데이터 갱신(last_update)마다 한 번 만들어 세션 간에 공유하므로 만든 뒤에는 읽기만 합니다.
+    """
+
+    def __init__(self, companies):
+        self.companies = companies.reset_index(drop=True)
+        names = self.companies['entity_name'] if 'entity_name' in self.companies.columns \
+            else pd.Series(dtype='object')
+        name_keys = [(company_id, normalize_name(name)) for company_id, name in names.dropna().items()]
+        self._name_length = {company_id: len(key) for company_id, key in name_keys}
+        self._names = _suffix_tables(name_keys)
+        self._choseong = _suffix_tables((company_id, choseong(key)) for company_id, key in name_keys)
+
+        # 종목코드(6자리)와 NICE 코드(A 제외 숫자) 접두 검색용 정렬 목록, 정확히 일치 조회용 Index
+        codes = []
+        for col in ['symbol', 'symbol_nice']:
+            if col in self.companies.columns:
+                values = self.companies[col].dropna().astype(str)
+                codes.extend((stock_code(value.lstrip('A')), company_id, 0) for company_id, value in values.items())
+        self._codes = sorted(codes)
+        symbols = self.companies['symbol'].dropna().astype(str) if 'symbol' in self.companies.columns \
+            else pd.Series(dtype='object')
+        symbol_codes = stock_codes(symbols).set_axis(symbols.index)
+        symbol_codes = symbol_codes[~symbol_codes.duplicated()]
+        self._symbol_codes = pd.Index(symbol_codes.to_numpy())
+        self._symbol_ids = np.r_[symbol_codes.index.to_numpy(dtype=np.int64), -1]
+        self._name_ids = {}
+        for company_id, name in names.dropna().items():
+            self._name_ids.setdefault(name, company_id)
+
+    @staticmethod
+    def _scan(table, query, hits):
+        """정렬 목록에서 query 로 시작하는 항목을 찾아 hits[회사 id] 에 가장 좋은 순위 키를 기록."""
+        i = bisect_left(table, (query,))
+        while i < len(table) and table[i][0].startswith(query):
+            key, company_id, start = table[i]
+            rank = (0 if start == 0 and len(key) == len(query) else 1 if start == 0 else 2, start)
+            if company_id not in hits or rank < hits[company_id]:
+                hits[company_id] = rank
+            i += 1
+
+    def search_ids(self, query, limit=10):
+        """입력값에 맞는 회사 id 목록 (순위순, 최대 limit 개)."""
+        query = normalize_name(query)
+        if not query:
+            return []
+        hits = {}
+        prefixes, infixes = self._choseong if all(ch in _CHOSEONG_SET for ch in query) else self._names
+        self._scan(prefixes, query, hits)
+        code_query = _CODE_QUERY_RE.fullmatch(query)
+        if code_query:
+            self._scan(self._codes, code_query.group(1), hits)
+        # 부분 일치는 항상 앞부분 일치보다 순위가 낮으므로, 앞부분 일치만으로 limit 개가 차면 건너뜀
+        if len(hits) < limit:
+            self._scan(infixes, query, hits)
+        ranked = sorted(hits, key=lambda company_id: (hits[company_id], self._name_length.get(company_id, 0), company_id))
+        return ranked[:limit]
+
+    def search(self, query, limit=10):
+        """입력값에 맞는 종목 행 (companies 의 행, 순위순)."""
+        return self.companies.iloc[self.search_ids(query, limit)]
+
+    def ids_of_codes(self, codes):
+        """종목코드 배열 → 회사 id 배열 (6자리로 맞춰 비교, 없는 코드는 -1)."""
+        return self._symbol_ids[self._symbol_codes.get_indexer(stock_codes(codes))]
+
+    def symbol_of(self, name):
+        """종목명 → 종목 symbol (없으면 None)."""
+        company_id = self._name_ids.get(name)
+        return None if company_id is None else self.companies.at[company_id, 'symbol']
@@ -0,0 +1,137 @@
+"""entity_match: EntityIndex.match 결과가 기존 행 단위 filter_df 와 같은지 확인."""
+import random
+
+import numpy as np
+import pandas as pd
+
+from entity_match import CompanyIndex, EntityIndex
+
+COMPANIES = pd.DataFrame({
+    'entity_name': ['삼성전자', 'SK하이닉스', 'NAVER', '카카오', 'LG화학', '현대차'],
+    'symbol': ['KRX:005930', 'KRX:000660', 'KRX:035420', 'KRX:035720', 'KRX:051910', None],
+    'symbol_nice': ['NICE:380725', 'NICE:100001', None, 'NICE:100003', 'NICE:100004', 'NICE:100005'],
+    'business_rid': ['1248100998', '1268100003', '2208162517', None, '1078100004', '1018100005'],
+    'company_rid': ['1301110006246', '1348110000001', None, '1101110000003', '1101110000004', '1101110000005'],
+    'mkt': ['KOSPI', 'KOSPI', 'KOSPI', 'KOSPI', 'KOSPI', 'KOSPI'],
+})
+
+
+def old_filter_df(df, search_list_df):
+    """기존 앱의 행 단위 filter_df (df.apply) 복사본: [(matched, {기업명}), ...]."""
+    def mapping(col):
+        present = search_list_df[col].notna()
+        return dict(zip(search_list_df.loc[present, col], search_list_df.loc[present, 'entity_name']))
+
+    symbol_to_name, symbol_nice_to_name = mapping('symbol'), mapping('symbol_nice')
+    business_rid_to_name, company_rid_to_name = mapping('business_rid'), mapping('company_rid')
+    entity_name_set = set(search_list_df['entity_name'].dropna())
+
+    results = []
+    for _, row in df.iterrows():
+        identified_list, matched = [], False
+        for col in ['securities', 'entities', 'named_entities']:
+            if col not in row or row[col] is None:
+                continue
+            for entry in row[col]:
+                identified = None
+                if 'symbol' in entry:
+                    symbol = entry['symbol']
+                    if symbol in symbol_to_name:
+                        matched, identified = True, symbol_to_name[symbol]
+                    elif symbol in symbol_nice_to_name:
+                        matched, identified = True, symbol_nice_to_name[symbol]
+                elif 'name' in entry:
+                    if entry['name'] in entity_name_set:
+                        matched, identified = True, entry['name']
+                elif 'business_rid' in entry:
+                    brid = entry['business_rid'].replace('-', '')
+                    if brid in business_rid_to_name:
+                        matched, identified = True, business_rid_to_name[brid]
+                elif 'company_rid' in entry:
+                    crid = entry['company_rid'].replace('-', '')
+                    if crid in company_rid_to_name:
+                        matched, identified = True, company_rid_to_name[crid]
+                if identified:
+                    identified_list.append(identified)
+        results.append((matched, set(identified_list)))
+    return results
+
+
+def new_filter(df, company_index, ids):
+    out = EntityIndex(df).match(company_index, ids)
+    assert list(out.index) == list(df.index)
+    return [(bool(m), set(names)) for m, names in zip(out['matched'], out['identified_symbols'])]
+
+
+def _dashed(rid):
+    return rid[:3] + '-' + rid[3:5] + '-' + rid[5:]
+
+
+def random_entries(rng):
+    row = COMPANIES.iloc[rng.randrange(len(COMPANIES))]
+    choice = rng.randrange(9)
+    if choice == 0 and pd.notna(row['symbol']):
+        return {'symbol': row['symbol'], 'name': row['entity_name']}
+    if choice == 1 and pd.notna(row['symbol_nice']):
+        return {'symbol': row['symbol_nice']}
+    if choice == 2:
+        return {'name': row['entity_name'], 'business_rid': '0000000000'}
+    if choice == 3 and pd.notna(row['business_rid']):
+        return {'business_rid': _dashed(row['business_rid'])}
+    if choice == 4 and pd.notna(row['company_rid']):
+        return {'company_rid': row['company_rid'], 'type': 'company'}
+    if choice == 5:
+        return {'symbol': 'KRX:999999', 'name': row['entity_name']}  # symbol 에서 멈춤 (이름 안 봄)
+    if choice == 6:
+        return {'name': '비상장사'}
+    return {'type': 'person', 'label': '홍길동'}
+
+
+def random_docs(n, seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {}
+        for col in ['securities', 'entities', 'named_entities']:
+            r = rng.random()
+            row[col] = None if r < 0.15 else [] if r < 0.25 else [random_entries(rng) for _ in range(rng.randint(1, 4))]
+        rows.append(row)
+    return pd.DataFrame(rows, index=range(100, 100 + n))
+
+
+def test_matches_old_filter_df_for_every_selection():
+    df = random_docs(600)
+    company_index = CompanyIndex(COMPANIES)
+    rng = random.Random(1)
+    selections = [list(range(len(COMPANIES))), [0], [5], []] + \
+        [rng.sample(range(len(COMPANIES)), rng.randint(1, 5)) for _ in range(10)]
+    for ids in selections:
+        expected = old_filter_df(df, COMPANIES.iloc[sorted(ids)])
+        assert new_filter(df, company_index, ids) == expected, ids
+
+
+def test_none_symbol_stops_at_symbol_like_filter_df():
+    df = pd.DataFrame({'securities': [[{'symbol': None, 'name': '삼성전자'}], [{'name': '삼성전자'}]]})
+    company_index = CompanyIndex(COMPANIES)
+    ids = range(len(COMPANIES))
+    assert new_filter(df, company_index, ids) == old_filter_df(df, COMPANIES) == [(False, set()), (True, {'삼성전자'})]
+
+
+def test_rid_dashes():
+    df = pd.DataFrame({'entities': [[{'business_rid': '124-81-00998'}], [{'company_rid': '1101110000004'}]]})
+    ids = range(len(COMPANIES))
+    # 문서 쪽 하이픈은 기존과 같이 빼고 비교
+    assert new_filter(df, CompanyIndex(COMPANIES), ids) == old_filter_df(df, COMPANIES) \
+        == [(True, {'삼성전자'}), (True, {'LG화학'})]
+    # DB 쪽에 하이픈이 든 RID 는 기존에는 놓쳤지만 이제 매칭 (의도한 변경, entity_match 독스트링 참고)
+    dashed = COMPANIES.assign(business_rid=COMPANIES['business_rid'].map(lambda v: _dashed(v) if pd.notna(v) else v),
+                              company_rid=COMPANIES['company_rid'].map(lambda v: v[:6] + '-' + v[6:] if pd.notna(v) else v))
+    assert old_filter_df(df, dashed) == [(False, set()), (False, set())]
+    assert new_filter(df, CompanyIndex(dashed), ids) == [(True, {'삼성전자'}), (True, {'LG화학'})]
+
+
+def test_identified_symbols_keep_first_mention_order():
+    df = pd.DataFrame({'securities': [[{'symbol': 'KRX:035420'}, {'symbol': 'KRX:005930'}]],
+                       'entities': [[{'name': 'NAVER'}, {'name': '카카오'}]]})
+    out = EntityIndex(df).match(CompanyIndex(COMPANIES), np.arange(len(COMPANIES)))
+    assert out['identified_symbols'].tolist() == [['NAVER', '삼성전자', '카카오']]
@@ -0,0 +1,149 @@
+"""issue_index: IssueIndex 결과가 기존 행 단위 substring 이슈 필터와 같은지 확인."""
+import ast
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+from issue_index import IssueIndex, TEXT_FIELDS, parse_condition, split_conditions
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'newsscrap', 'deepsearch_query.py')
+
+
+def issue_categories():
+    """앱(deepsearch_query.py)의 ISSUE_CATEGORIES 상수 (streamlit 없이 소스에서 읽음)."""
+    with open(APP, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'ISSUE_CATEGORIES' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise AssertionError('ISSUE_CATEGORIES not found')
+
+
+def _old_text(row):
+    return ' '.join(str(row[field]) for field in TEXT_FIELDS if field in row and row[field] is not None).lower()
+
+
+def _old_condition_hit(condition, text):
+    """기존 check_issue_category / find_matched_issue_keywords 의 조건 하나 판정."""
+    condition = condition.strip()
+    if condition.startswith('(') and condition.endswith(')'):
+        inner = condition[1:-1]
+        if ' and ' in inner:
+            return all(p.strip().lower() in text for p in inner.split(' and '))
+        return inner.lower() in text
+    return condition.lower() in text
+
+
+def old_issue_filter(df, keywords):
+    """기존 앱의 df.apply 이슈 필터: (통과 여부 리스트, 행별 매칭 키워드 리스트)."""
+    verdict, matched = [], []
+    for _, row in df.iterrows():
+        text = _old_text(row)
+        hits = [kw.strip() for kw in keywords if _old_condition_hit(kw, text)]
+        verdict.append(bool(hits) if keywords else True)
+        matched.append(hits)
+    return verdict, matched
+
+
+WORDS = ['수주', '체결', '공급', '계약', '인수', '합병', '분할', '매출', '발표', '실적', '이익', '배당', '공시',
+         '증자', '감자', '상장폐지', '비적정', '감사', '회계법인', '소송', '횡령', '배임', '대표이사', '이사', '임원',
+         '기소', '혐의', '삼성전자', '반도체', 'M&A', 'HBM', '시장', '전망', '수출', '주가']
+
+
+def random_docs(n, seed=7):
+    rng = random.Random(seed)
+
+    def sentence():
+        words = rng.choices(WORDS, k=rng.randint(0, 8))
+        glue = rng.choice(['', ' ', ', ', '·', '\n'])
+        return glue.join(words) + rng.choice(['.', '', '!'])
+
+    rows = []
+    for _ in range(n):
+        rows.append({
+            'title': sentence(),
+            'content': ' '.join(sentence() for _ in range(rng.randint(0, 4))) if rng.random() > 0.1 else None,
+            'summary': sentence() if rng.random() > 0.7 else None,
+        })
+    return pd.DataFrame(rows, index=[f'd{i}' for i in range(n)])
+
+
+def test_categories_match_old_substring_filter():
+    df = random_docs(1500)
+    index = IssueIndex(df)
+    for name, expression in issue_categories().items():
+        if expression is None:
+            continue
+        keywords = split_conditions(expression)
+        assert keywords == [kw.strip() for kw in expression.split(' or ')], name
+        verdict, matched = index.match(keywords, df.index)
+        old_verdict, old_matched = old_issue_filter(df, keywords)
+        assert verdict.tolist() == old_verdict, name
+        assert matched == old_matched, name
+
+
+def test_keyword_subsets_and_row_subsets():
+    df = random_docs(800, seed=11)
+    index = IssueIndex(df)
+    rng = random.Random(3)
+    all_keywords = [kw for expr in issue_categories().values() if expr for kw in split_conditions(expr)]
+    labels = df.index[::3]
+    for _ in range(30):
+        keywords = rng.sample(all_keywords, rng.randint(1, 6))
+        verdict, matched = index.match(keywords, labels)
+        old_verdict, old_matched = old_issue_filter(df.loc[labels], keywords)
+        assert verdict.tolist() == old_verdict
+        assert matched == old_matched
+
+
+def test_substring_inside_words_and_case():
+    df = pd.DataFrame({'title': ['대규모수주계약 체결', 'M&A 추진', '무관한 기사'], 'content': ['', 'm&a', None]})
+    index = IssueIndex(df)
+    verdict, matched = index.match(['(수주 and 체결)', 'm&a', '수'], df.index)
+    assert verdict.tolist() == [True, True, False]
+    assert matched == [['(수주 and 체결)', '수'], ['m&a'], []]
+
+
+def test_no_conditions_pass_everything():
+    df = random_docs(5)
+    verdict, matched = IssueIndex(df).match([], df.index)
+    assert verdict.all() and matched == [[]] * 5
+    assert IssueIndex(df.iloc[:0]).match(['수주'], [])[0].dtype == np.bool_
+
+
+# 피연산자 없는 and/or, 짝이 안 맞는 괄호 — 문법으로 파싱할 수 없어 기존 필터와 같이 해석해야 하는 조건
+UNPARSEABLE = ['and', 'or', 'AND', '수주 and', 'and 체결', 'or 수주', '수주 or', '(수주 and )', '( and 체결)',
+               '(and)', '(or)', '((수주)', '수주 )', '(수주 and and 체결)', '()']
+
+
+def test_parse_condition_grammar():
+    assert parse_condition('수주') == ('term', '수주')
+    assert parse_condition(' (수주 AND 체결) ') == ('and', (('term', '수주'), ('term', '체결')))
+    assert parse_condition('(횡령 or 배임) and 대표이사') == \
+        ('and', (('or', (('term', '횡령'), ('term', '배임'))), ('term', '대표이사')))
+    assert parse_condition('영업 양도 or 분할') == ('or', (('term', '영업 양도'), ('term', '분할')))
+
+
+def test_parse_condition_bare_and_or_falls_back_to_old_rules():
+    assert parse_condition('and') == ('term', 'and')
+    assert parse_condition('수주 or') == ('term', '수주 or')
+    assert parse_condition('(수주 and )') == ('and', (('term', '수주'), ('term', '')))
+    assert parse_condition('(and)') == ('term', 'and')
+    df = pd.DataFrame({'title': ['수주 and 체결', 'or 수주 계약', 'brand 수주', '체결', '(수주)', None],
+                       'content': ['', '수주 or', 'android', '(and)', '', '( and 체결)']})
+    index = IssueIndex(df)
+    for condition in UNPARSEABLE:
+        verdict, matched = index.match([condition], df.index)
+        old_verdict, old_matched = old_issue_filter(df, [condition])
+        assert verdict.tolist() == old_verdict, condition
+        assert matched == old_matched, condition
+
+
+def test_bare_expressions_use_the_grammar():
+    # 괄호 없는 'a and b' 는 기존에는 문자 그대로 찾았지만 이제 두 키워드 모두 포함으로 평가 (user-022)
+    df = pd.DataFrame({'title': ['수주 계약 체결', '수주 and 체결', '수주만']})
+    verdict, _ = IssueIndex(df).match(['수주 and 체결'], df.index)
+    assert verdict.tolist() == [True, True, False]
+    assert old_issue_filter(df, ['수주 and 체결'])[0] == [False, True, False]
@@ -0,0 +1,103 @@
+"""
+fetch_market_caps 배치 조회를 카세트로 재생해 배치 결과가 전 종목을 덮는지 확인.
+
+카세트는 docs/3_API함수를_통한_데이터_조회_국내기업.md 의 GetStockPrices(columns=["close"]) /
+GetStockSymbols 예시 응답 형식을 따르는 스텁 세션으로 record 한 뒤 replay 한다.
+실제 API 로 다시 녹화하려면 DEEPSEARCH_CASSETTE=<폴더> DEEPSEARCH_CASSETTE_MODE=record 로
+market_top_movers.py 를 한 번 실행하면 된다.
+"""
+import re
+
+import pytest
+import requests
+
+import deepsearch_client as dc
+import market_top_movers
+
+DATES = ['2025-02-26', '2025-02-27']
+SYMBOLS = [f'KRX:{i:06d}' for i in range(1, 1701)]
+DELISTED = {'KRX:000777'}
+
+
+def _columns(query):
+    symbols = [s for s in re.findall(r'KRX:\d{6}', query) if s not in DELISTED]
+    n = int(symbols[0][4:]) if symbols else 0
+    if query.startswith('GetStockPrices('):
+        assert 'columns=["close"]' in query
+        return {
+            'date': [d for _ in symbols for d in DATES],
+            'symbol': [s for s in symbols for _ in DATES],
+            'entity_name': [s for s in symbols for _ in DATES],
+            'close': [1000 + int(s[4:]) + k for s in symbols for k in range(len(DATES))],
+        }
+    if query.startswith('GetStockSymbols('):
+        return {
+            'date': ['2025-02-27'] * len(symbols),
+            'symbol': symbols,
+            'entity_name': symbols,
+            'market': ['KOSDAQ'] * len(symbols),
+            'shares_outstanding': [10_000_000 + n for _ in symbols],
+        }
+    return None
+
+
+class _StubSession:
+    def __init__(self):
+        self.queries = []
+
+    def get(self, url, headers=None, timeout=None):
+        query = dc._query_of(url)
+        self.queries.append(query)
+        columns = _columns(query)
+        resp = requests.Response()
+        resp.url = url
+        if columns is None:
+            resp.status_code, resp.reason, resp._content = 400, 'Bad Request', b''
+            return resp
+        body = {'success': True, 'data': {'pods': [{}, {'content': {'data': columns}}]}}
+        resp.status_code, resp.reason = 200, 'OK'
+        resp._content = dc.json.dumps(body).encode('utf-8')
+        resp.headers['Content-Type'] = 'application/json'
+        return resp
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    companies = [(s, s) for s in SYMBOLS]
+    stub = _StubSession()
+    monkeypatch.setattr(dc, 'aiohttp', None)
+    monkeypatch.setattr(dc, 'get_session', lambda: stub)
+    dc.configure_cassette(path=str(tmp_path), mode='record')
+    try:
+        market_top_movers.fetch_all_stock_data('KEY', companies, DATES[-1])
+        dc.configure_cassette(mode='replay')
+        yield companies, stub
+    finally:
+        dc.configure_cassette(path='')
+
+
+def test_batch_covers_nearly_all_symbols(cassette):
+    companies, stub = cassette
+    recorded = len(stub.queries)
+    prices = dc.fetch_market_caps('KEY', SYMBOLS, '2025-02-20', DATES[-1])
+
+    assert len(stub.queries) == recorded  # replay 는 네트워크를 쓰지 않는다
+    assert len(prices) >= len(SYMBOLS) * 0.99
+    assert all(cols['market_cap'][-1] > 0 for cols in prices.values())
+    batch_calls = [q for q in stub.queries if q.startswith(('GetStockPrices(', 'GetStockSymbols('))]
+    assert len(batch_calls) < len(SYMBOLS) / 20
+
+
+def test_market_cap_is_close_times_shares(cassette):
+    prices = dc.fetch_market_caps('KEY', SYMBOLS, '2025-02-20', DATES[-1])
+    cols = prices['KRX:000001']
+    assert cols['close'] == [1001, 1002]
+    assert cols['market_cap'] == [1001 * 10_000_001, 1002 * 10_000_001]
+    assert 'KRX:000777' not in prices
+
+
+def test_fetch_all_stock_data_falls_back_only_for_missing(cassette):
+    companies, _ = cassette
+    results, failed = market_top_movers.fetch_all_stock_data('KEY', companies, DATES[-1])
+    assert len(results) == len(SYMBOLS) - len(DELISTED)
+    assert failed == len(DELISTED)
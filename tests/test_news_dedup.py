@@ -0,0 +1,66 @@
+"""news_dedup: 전재 기사 쌍은 한 묶음으로, 다른 기사는 따로 남는지 확인."""
+import pandas as pd
+
+from news_dedup import annotate_near_duplicates, minhash_signatures, near_duplicate_clusters, NUM_PERM
+
+WIRE = ('삼성전자가 3분기 연결 기준 영업이익이 9조1천억원으로 지난해 같은 기간보다 274% 증가했다고 31일 공시했다. '
+        '매출은 79조1천억원으로 17% 늘었다. 반도체 부문은 고대역폭메모리(HBM) 판매 확대에 힘입어 '
+        '영업이익 3조9천억원을 기록했고, 모바일 부문은 신형 폴더블 스마트폰 출시 효과로 실적이 개선됐다.')
+OTHER = ('SK하이닉스는 청주 신규 공장 건설에 20조원을 투자한다고 밝혔다. 회사는 인공지능 수요 증가에 맞춰 '
+         '차세대 메모리 생산 능력을 확대하고 2027년부터 양산에 들어갈 계획이라고 설명했다.')
+
+# (원문, 전재본) — 통신사 기사를 언론사가 바이라인/문장부호/끝문장만 바꿔 실은 경우
+KNOWN_PAIRS = [
+    (WIRE, '[연합뉴스] ' + WIRE),
+    (WIRE, WIRE.replace('. ', '.\n').replace('(HBM)', ' HBM ')),
+    (WIRE, WIRE + ' 회사 측은 4분기에도 메모리 가격 상승세가 이어질 것으로 내다봤다.'),
+    (OTHER, OTHER.replace('SK하이닉스는', 'SK하이닉스가') + ' (서울=뉴스1)'),
+]
+
+
+def _jaccard(a, b, k=3):
+    def grams(text):
+        text = ''.join(ch for ch in text.lower() if ch.isalnum())
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+    ga, gb = grams(a), grams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def test_known_duplicate_pairs_share_a_cluster():
+    for original, reprint in KNOWN_PAIRS:
+        labels = near_duplicate_clusters([original, reprint])
+        assert labels[0] == labels[1], reprint[:40]
+
+
+def test_unrelated_articles_stay_apart():
+    labels = near_duplicate_clusters([WIRE, OTHER, '코스피가 외국인 매도에 2% 넘게 하락 마감했다.'])
+    assert len(set(labels)) == 3
+
+
+def test_signature_agreement_tracks_jaccard():
+    for original, reprint in KNOWN_PAIRS:
+        sigs, valid = minhash_signatures([original, reprint])
+        assert valid.all()
+        estimate = (sigs[0] == sigs[1]).mean()
+        # 64개 순열 추정치의 표준오차는 약 0.06
+        assert abs(estimate - _jaccard(original, reprint)) < 0.2
+
+
+def test_annotate_marks_first_article_as_representative():
+    df = pd.DataFrame({
+        'title': ['삼성전자 3분기 영업익 9.1조', '코스피 2% 하락', '삼성전자 3분기 영업익 9.1조', '삼성전자 3분기 영업익 9.1조'],
+        'content': [WIRE, '외국인 매도에 코스피가 2% 넘게 하락했다. 기관도 순매도했다.', '[연합뉴스] ' + WIRE, WIRE + ' 끝.'],
+    }, index=[10, 11, 12, 13])
+    out = annotate_near_duplicates(df)
+    assert out['dup_cluster'].tolist() == [0, 1, 0, 0]
+    assert out['dup_rep'].tolist() == [True, True, False, False]
+    assert out['dup_count'].tolist() == [3, 1, 3, 3]
+    assert list(out.index) == [10, 11, 12, 13]
+
+
+def test_short_or_empty_texts_are_left_alone():
+    labels = near_duplicate_clusters(['', 'ab', '', WIRE])
+    assert labels.tolist() == [0, 1, 2, 3]
+    sigs, valid = minhash_signatures(['ab'])
+    assert sigs.shape == (1, NUM_PERM) and not valid.any()
+    assert annotate_near_duplicates(pd.DataFrame({'title': [], 'content': []})).empty
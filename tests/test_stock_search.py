@@ -0,0 +1,65 @@
+"""stock_search: StockSearchIndex.search_ids 순위 (접두/초성/종목코드/부분 일치)."""
+import pandas as pd
+
+from stock_search import StockSearchIndex, choseong, normalize_name, stock_codes
+
+COMPANIES = pd.DataFrame({
+    'entity_name': ['삼성전자', '삼성전자우', '삼성SDI', 'SK하이닉스', 'LG전자', '대한전선', '(주)카카오', '카카오뱅크',
+                    '전자부품연구', '삼성물산'],
+    'symbol': ['KRX:005930', 'KRX:005935', 'KRX:006400', 'KRX:000660', 'KRX:066570', 'KRX:001440',
+               'KRX:035720', 'KRX:323410', None, 'KRX:028260'],
+    'symbol_nice': ['A005930', None, None, None, None, None, None, None, 'A900001', None],
+})
+INDEX = StockSearchIndex(COMPANIES)
+
+
+def names(query, limit=10):
+    return [COMPANIES.at[i, 'entity_name'] for i in INDEX.search_ids(query, limit)]
+
+
+def test_exact_match_then_prefix_by_length():
+    assert names('삼성전자') == ['삼성전자', '삼성전자우']
+    assert names('삼성') == ['삼성전자', '삼성물산', '삼성전자우', '삼성SDI']  # 짧은 이름 먼저, 같으면 목록 순
+
+
+def test_prefix_ignores_case_spaces_and_corp_marks():
+    assert names('sk하이')[0] == 'SK하이닉스'
+    assert names('삼성 전자')[0] == '삼성전자'
+    assert names('카카오') == ['(주)카카오', '카카오뱅크']
+    assert normalize_name('(주) 카카오') == normalize_name('㈜카카오') == '카카오'
+
+
+def test_infix_ranks_after_prefix_by_position():
+    # '전자부품연구' 는 앞부분 일치, 나머지는 부분 일치 (일치 위치가 앞일수록, 이름이 짧을수록 먼저)
+    assert names('전자') == ['전자부품연구', '삼성전자', 'LG전자', '삼성전자우']
+    assert names('닉스') == ['SK하이닉스']
+    assert names('전선') == ['대한전선']
+
+
+def test_choseong_queries():
+    assert choseong('삼성전자') == 'ㅅㅅㅈㅈ'
+    assert names('ㅅㅅㅈㅈ') == ['삼성전자', '삼성전자우']
+    assert names('ㅋㅋㅇ') == ['(주)카카오', '카카오뱅크']
+    assert names('ㅈㅈ') == names('전자')
+
+
+def test_code_queries():
+    assert names('005930') == ['삼성전자']
+    assert names('0059') == ['삼성전자', '삼성전자우']
+    assert names('A005930') == ['삼성전자']
+    assert names('KRX:000660') == ['SK하이닉스']
+    assert names('900001') == ['전자부품연구']  # NICE 코드
+
+
+def test_limit_and_empty_query():
+    assert len(INDEX.search_ids('삼성', limit=2)) == 2
+    assert names('삼성', limit=2) == names('삼성')[:2]
+    assert INDEX.search_ids('  ') == []
+    assert INDEX.search_ids('없는회사') == []
+
+
+def test_code_lookup_helpers():
+    assert stock_codes(['KRX:5930', 5930.0, '000660']).tolist() == ['005930', '005930', '000660']
+    assert INDEX.ids_of_codes(['5930', '999999']).tolist() == [0, -1]
+    assert INDEX.symbol_of('SK하이닉스') == 'KRX:000660'
+    assert INDEX.symbol_of('없는회사') is None